@@ -12,6 +12,7 @@ import re
 import sys
 import zipfile
 
+from email.message import Message
 from pathlib import Path
 from typing import Any
 from typing import Dict
@@ -23,8 +24,8 @@ from typing import cast
 from urllib.error import HTTPError
 from urllib.error import URLError
 from urllib.parse import quote
-from urllib.request import Request
-from urllib.request import urlopen
+
+import requests
 
 from colorama import Fore
 from colorama import Style
@@ -37,6 +38,21 @@ from packaging.version import InvalidVersion
 from packaging.version import Version
 from packaging.version import parse as parse_version
 
+from compiled_markers import CompiledRule
+from compiled_markers import DecisionTable
+from compiled_markers import ExcludeRules
+from compiled_markers import as_exclude_rules
+from pypi_metadata_cache import ProjectMetadata
+from pypi_metadata_cache import PyPIMetadataCache
+from pypi_metadata_cache import ReleaseMetadata
+from pypi_metadata_cache import project_metadata_from_json
+from pypi_metadata_cache import release_metadata_from_json
+from pypi_metadata_cache import simple_metadata_from_json
+from remote_fetch import fetch
+from remote_fetch import map_concurrently
+from remote_snapshot import SnapshotMissError
+from remote_snapshot import get_snapshot
+
 # Packages that should be built from source on Linux to ensure correct library linking
 # These packages often have pre-built wheels on PyPI that link against different library versions
 # NOTE: This only applies to Linux (especially ARM) - Windows and macOS pre-built wheels work fine
@@ -59,6 +75,21 @@ ALL_PLATFORMS = ["linux", "windows", "macos"]
 LINUX_ARCHS = ["linux_x86_64", "linux_arm64", "linux_armv7"]
 MACOS_ARCHS = ["macos_x86_64", "macos_arm64"]
 
+# Root directory of persistent caches (build cache, ...); override with IDF_PYTHON_WHEELS_CACHE_DIR
+CACHE_DIR_ENV = "IDF_PYTHON_WHEELS_CACHE_DIR"
+
+
+def get_cache_dir(name: str) -> Path:
+    """Return (and create) directory ``name`` under the persistent cache root.
+
+    Default root is ``~/.cache/idf-python-wheels``, ``IDF_PYTHON_WHEELS_CACHE_DIR`` overrides it.
+    """
+    root = os.environ.get(CACHE_DIR_ENV, "").strip()
+    base = Path(root) if root else Path.home() / ".cache" / "idf-python-wheels"
+    path = base / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
 
 def get_current_platform() -> str:
     """Return current runner platform:
@@ -103,14 +134,68 @@ def wheel_archive_is_readable(path: Path) -> bool:
 
 # PyPI JSON API: cache (project canonical name, version) -> requires_python or None if unset/unknown
 _PYPI_REQUIRES_PYTHON_CACHE: Dict[Tuple[str, str], Optional[str]] = {}
-# Full project JSON per canonical package name; None means fetch failed (cached)
+# Compact project metadata per canonical package name; None means fetch failed (cached)
 _PYPI_PROJECT_JSON_CACHE: Dict[str, Optional[Dict[str, Any]]] = {}
+# Canonical names whose simple index page was requested in this run (simple backend)
+_PYPI_SIMPLE_PAGES_FETCHED: Set[str] = set()
+# Persistent cache shared between runs and scripts (pypi_metadata_cache.py), installed by the build scripts
+_PYPI_METADATA_CACHE: Optional[PyPIMetadataCache] = None
+
+
+# Where the preflight takes its PyPI metadata from:
+# - "json"   ... JSON API, /pypi/<name>/json plus /pypi/<name>/<version>/json per candidate release (default)
+# - "simple" ... PEP 691 JSON simple index, one /simple/<name>/ page lists all files with their requires-python
+PYPI_BACKEND_ENV = "IDF_PYTHON_WHEELS_PYPI_BACKEND"
+PYPI_SIMPLE_URL_ENV = "IDF_PYTHON_WHEELS_PYPI_SIMPLE_URL"
+DEFAULT_PYPI_SIMPLE_URL = "https://pypi.org/simple/"
+PYPI_SIMPLE_JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+
+
+def _pypi_simple_backend() -> bool:
+    backend = os.environ.get(PYPI_BACKEND_ENV, "json").strip().lower() or "json"
+    if backend not in ("json", "simple"):
+        raise ValueError(f"{PYPI_BACKEND_ENV} must be 'json' or 'simple', not {backend!r}")
+    return backend == "simple"
+
+
+def set_pypi_metadata_cache(cache: Optional[PyPIMetadataCache]) -> None:
+    """Install (or with None remove) the persistent PyPI metadata cache behind the ``fetch_pypi_*`` functions."""
+    global _PYPI_METADATA_CACHE
+    _PYPI_METADATA_CACHE = cache
+
+
+def _persistent_pypi_cache() -> Optional[PyPIMetadataCache]:
+    # recording and replaying a snapshot must see the same requests, the persistent cache is bypassed
+    if get_snapshot() is not None:
+        return None
+    return _PYPI_METADATA_CACHE
 
 
 def _pypi_user_agent() -> str:
     return "idf-python-wheels (https://github.com/espressif/idf-python-wheels)"
 
 
+def _pypi_get_json(url: str, timeout: float, accept: Optional[str] = None) -> Any:
+    """GET and decode PyPI JSON over the shared keep-alive session (remote_fetch.py).
+
+    Errors are raised as from ``urlopen``: HTTPError for an HTTP error status, URLError for a network error.
+    Snapshots (remote_snapshot.py) record and replay these requests like the other remote inputs; a request not
+    recorded in a replayed snapshot fails as a network error (a replay on another interpreter or platform
+    probes other releases in the Requires-Python preflight).
+    """
+    headers = {"User-Agent": _pypi_user_agent()}
+    if accept:
+        headers["Accept"] = accept
+    try:
+        # PyPI JSON is kept compact in the metadata cache, not in the HTTP cache
+        response = fetch(url, headers, timeout, use_http_cache=False)
+    except (requests.RequestException, SnapshotMissError) as e:
+        raise URLError(f"{url}: {e}") from e
+    if response.status_code != 200:
+        raise HTTPError(url, response.status_code, f"HTTP error {response.status_code}", Message(), None)
+    return json.loads(response.content.decode())
+
+
 def current_interpreter_satisfies_requires_python(requires_python: Optional[str]) -> bool:
     """True if this interpreter satisfies PyPI ``Requires-Python`` (PEP 345 / PEP 566), or if unset."""
     if requires_python is None or not requires_python.strip():
@@ -129,44 +214,103 @@ def fetch_pypi_release_requires_python(project_name: str, version: str, timeout:
     if key in _PYPI_REQUIRES_PYTHON_CACHE:
         return _PYPI_REQUIRES_PYTHON_CACHE[key]
     pkg = canonicalize_name(project_name)
+    cache = _persistent_pypi_cache()
+    cached = cache.get_release(pkg, version) if cache is not None else None
+    if cached is not None:
+        _PYPI_REQUIRES_PYTHON_CACHE[key] = cached.requires_python
+        return cached.requires_python
+    if _pypi_simple_backend():
+        # the simple index page of the project holds all releases, a version missing there is unknown
+        if pkg not in _PYPI_SIMPLE_PAGES_FETCHED:
+            _fetch_pypi_simple_project(pkg, timeout, cache)
+        return _PYPI_REQUIRES_PYTHON_CACHE.setdefault(key, None)
     url = f"https://pypi.org/pypi/{quote(pkg)}/{quote(version)}/json"
     try:
-        request = Request(url, headers={"User-Agent": _pypi_user_agent()})
-        with urlopen(request, timeout=timeout) as response:
-            data = json.loads(response.read().decode())
+        data = _pypi_get_json(url, timeout)
     except HTTPError as e:
-        if e.code == 404:
-            _PYPI_REQUIRES_PYTHON_CACHE[key] = None
-            return None
+        if e.code == 404 and cache is not None:
+            cache.put_release(pkg, version, ReleaseMetadata(False, None, False))
         _PYPI_REQUIRES_PYTHON_CACHE[key] = None
         return None
     except (URLError, OSError, TimeoutError, ValueError, json.JSONDecodeError):
         _PYPI_REQUIRES_PYTHON_CACHE[key] = None
         return None
-    rp = data.get("info", {}).get("requires_python")
-    if rp is None or (isinstance(rp, str) and not rp.strip()):
-        _PYPI_REQUIRES_PYTHON_CACHE[key] = None
+    metadata = release_metadata_from_json(data)
+    if cache is not None:
+        cache.put_release(pkg, version, metadata)
+    _PYPI_REQUIRES_PYTHON_CACHE[key] = metadata.requires_python
+    return metadata.requires_python
+
+
+def _fetch_pypi_simple_project(
+    pkg: str, timeout: float, cache: Optional[PyPIMetadataCache]
+) -> Optional[ProjectMetadata]:
+    """Fetch the PEP 691 simple index page of a project and fill all caches with its releases.
+
+    Returns None on error (not found, network error).
+    """
+    _PYPI_SIMPLE_PAGES_FETCHED.add(pkg)
+    base = os.environ.get(PYPI_SIMPLE_URL_ENV, "").strip() or DEFAULT_PYPI_SIMPLE_URL
+    url = f"{base.rstrip('/')}/{quote(pkg)}/"
+    try:
+        data = cast(Dict[str, Any], _pypi_get_json(url, timeout, accept=PYPI_SIMPLE_JSON_CONTENT_TYPE))
+    except HTTPError as e:
+        if e.code == 404 and cache is not None:
+            cache.put_project(pkg, ProjectMetadata(False, {}))
+        _PYPI_PROJECT_JSON_CACHE[pkg] = None
+        return None
+    except (URLError, OSError, TimeoutError, ValueError, json.JSONDecodeError):
+        _PYPI_PROJECT_JSON_CACHE[pkg] = None
         return None
-    _PYPI_REQUIRES_PYTHON_CACHE[key] = str(rp).strip()
-    return _PYPI_REQUIRES_PYTHON_CACHE[key]
+    metadata, releases = simple_metadata_from_json(data)
+    if cache is not None:
+        cache.put_project(pkg, metadata)
+        cache.put_releases(pkg, releases)
+    for version, release in releases.items():
+        _PYPI_REQUIRES_PYTHON_CACHE[(pkg, version)] = release.requires_python
+    _PYPI_PROJECT_JSON_CACHE[pkg] = _compact_project_json(metadata)
+    return metadata
+
+
+def _compact_project_json(metadata: ProjectMetadata) -> Dict[str, Any]:
+    return {"releases": {version: {"yanked": yanked} for version, yanked in metadata.releases.items()}}
 
 
 def fetch_pypi_project_json(project_name: str, timeout: float = 20.0) -> Optional[Dict[str, Any]]:
-    """Return PyPI ``/pypi/{name}/json`` payload, or None on error."""
+    """Return compact PyPI ``/pypi/{name}/json`` metadata, or None on error.
+
+    Only the release versions are kept: ``{"releases": {version: {"yanked": bool}}}``
+    (a release is yanked when all its files are). With the simple backend (``IDF_PYTHON_WHEELS_PYPI_BACKEND``)
+    the same data comes from the PEP 691 index page, which also provides ``requires_python`` of every release.
+    """
     pkg = canonicalize_name(project_name)
     if pkg in _PYPI_PROJECT_JSON_CACHE:
         return _PYPI_PROJECT_JSON_CACHE[pkg]
+    cache = _persistent_pypi_cache()
+    cached = cache.get_project(pkg) if cache is not None else None
+    if cached is not None:
+        _PYPI_PROJECT_JSON_CACHE[pkg] = _compact_project_json(cached) if cached.found else None
+        return _PYPI_PROJECT_JSON_CACHE[pkg]
+    if _pypi_simple_backend():
+        _fetch_pypi_simple_project(pkg, timeout, cache)
+        return _PYPI_PROJECT_JSON_CACHE[pkg]
     url = f"https://pypi.org/pypi/{quote(pkg)}/json"
     try:
-        request = Request(url, headers={"User-Agent": _pypi_user_agent()})
-        with urlopen(request, timeout=timeout) as response:
-            # Use typing.Dict in cast(): dict[str, Any] is evaluated at runtime and breaks on Python 3.8.
-            data = cast(Dict[str, Any], json.loads(response.read().decode()))
-    except (HTTPError, URLError, OSError, TimeoutError, ValueError, json.JSONDecodeError):
+        # Use typing.Dict in cast(): dict[str, Any] is evaluated at runtime and breaks on Python 3.8.
+        data = cast(Dict[str, Any], _pypi_get_json(url, timeout))
+    except HTTPError as e:
+        if e.code == 404 and cache is not None:
+            cache.put_project(pkg, ProjectMetadata(False, {}))
+        _PYPI_PROJECT_JSON_CACHE[pkg] = None
+        return None
+    except (URLError, OSError, TimeoutError, ValueError, json.JSONDecodeError):
         _PYPI_PROJECT_JSON_CACHE[pkg] = None
         return None
-    _PYPI_PROJECT_JSON_CACHE[pkg] = data
-    return data
+    metadata = project_metadata_from_json(data)
+    if cache is not None:
+        cache.put_project(pkg, metadata)
+    _PYPI_PROJECT_JSON_CACHE[pkg] = _compact_project_json(metadata)
+    return _PYPI_PROJECT_JSON_CACHE[pkg]
 
 
 def matching_release_version_strings(req: Requirement) -> Optional[List[str]]:
@@ -191,13 +335,58 @@ def matching_release_version_strings(req: Requirement) -> Optional[List[str]]:
     return [pair[1] for pair in candidates]
 
 
+def _preflight_disabled() -> bool:
+    return os.environ.get("SKIP_PYPI_REQUIRES_PYTHON_CHECK", "").strip().lower() in ("1", "true", "yes")
+
+
+def find_installable_release(project_name: str, candidates: List[str]) -> Optional[str]:
+    """A candidate release (candidates newest first) whose ``Requires-Python`` this interpreter satisfies, or None.
+
+    Requires-Python lower bounds almost never decrease from one release to a newer one, so along the candidates
+    the releases go from not installable to installable once. The boundary is bisected, which fetches the
+    metadata of O(log n) releases instead of all of them. The bisection relies on that monotonic history only
+    to be fast, not for the answer the preflight acts on:
+
+    - a release found is installable; in a non-monotonic history it may not be the newest installable one
+    - None is only returned after every candidate has been checked (the releases not probed by the bisection are
+      scanned linearly), so a requirement is never skipped because of a release the bisection jumped over
+
+    Already fetched metadata is cached.
+    """
+
+    def _installable(index: int) -> bool:
+        requires_python = fetch_pypi_release_requires_python(project_name, candidates[index])
+        probed.add(index)
+        return current_interpreter_satisfies_requires_python(requires_python)
+
+    if not candidates:
+        return None
+    probed: Set[int] = set()
+    if _installable(0):
+        return candidates[0]
+    # invariant: candidates[low] is not installable, candidates[high] is (high == len: none is)
+    low, high = 0, len(candidates)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if _installable(middle):
+            high = middle
+        else:
+            low = middle
+    if high < len(candidates):
+        return candidates[high]
+    for index in range(len(candidates)):
+        if index not in probed and _installable(index):
+            return candidates[index]
+    return None
+
+
 def pypi_requires_python_preflight_skip(req: Requirement) -> Tuple[bool, str]:
     """If True, skip ``pip wheel``: no PyPI release matches the specifier for this interpreter.
 
     Uses project index + per-release ``Requires-Python`` (covers ``==``, ``~=``, ranges, etc.).
     Set ``SKIP_PYPI_REQUIRES_PYTHON_CHECK`` to disable.
     """
-    if os.environ.get("SKIP_PYPI_REQUIRES_PYTHON_CHECK", "").strip().lower() in ("1", "true", "yes"):
+    if _preflight_disabled():
         return False, ""
     candidates = matching_release_version_strings(req)
     if candidates is None:
@@ -205,10 +394,8 @@ def pypi_requires_python_preflight_skip(req: Requirement) -> Tuple[bool, str]:
     if not candidates:
         return True, "no PyPI releases match this requirement specifier"
 
-    for ver_str in candidates:
-        rp = fetch_pypi_release_requires_python(req.name, ver_str)
-        if current_interpreter_satisfies_requires_python(rp):
-            return False, ""
+    if find_installable_release(req.name, candidates) is not None:
+        return False, ""
 
     newest = candidates[0]
     newest_rp = fetch_pypi_release_requires_python(req.name, newest)
@@ -222,17 +409,39 @@ def pypi_requires_python_preflight_skip(req: Requirement) -> Tuple[bool, str]:
     return True, f"no installable release on PyPI for Python {py_mm} ({req})"
 
 
+def pypi_requires_python_preflight(requirements: List[Requirement]) -> Dict[Requirement, Tuple[bool, str]]:
+    """Run ``pypi_requires_python_preflight_skip`` for many requirements concurrently.
+
+    Requirements of one project are checked one after another by the same worker, so its PyPI metadata is
+    fetched once; different projects are checked in parallel (``IDF_PYTHON_WHEELS_FETCH_JOBS`` workers,
+    requests limited per host and sharing the connections of remote_fetch.py).
+    """
+    by_project: Dict[str, List[Requirement]] = {}
+    for req in requirements:
+        by_project.setdefault(canonicalize_name(req.name), []).append(req)
+
+    def _check(project_requirements: List[Requirement]) -> List[Tuple[Requirement, Tuple[bool, str]]]:
+        return [(req, pypi_requires_python_preflight_skip(req)) for req in project_requirements]
+
+    results: Dict[Requirement, Tuple[bool, str]] = {}
+    for project_results in map_concurrently(_check, [by_project[name] for name in sorted(by_project)]):
+        results.update(project_results)
+    return results
+
+
 def filter_requirements_by_pypi_requires_python(requirements: Set) -> Set:
-    """Drop requirements with no PyPI release installable on this interpreter (``Requires-Python``)."""
-    if os.environ.get("SKIP_PYPI_REQUIRES_PYTHON_CHECK", "").strip().lower() in ("1", "true", "yes"):
+    """Drop requirements with no PyPI release installable on this interpreter (``Requires-Python``).
+
+    The checks run concurrently, skipped requirements are printed sorted.
+    """
+    if _preflight_disabled():
         return set(requirements)
-    kept: Set = set()
+    kept: Set = {req for req in requirements if not isinstance(req, Requirement)}
     print_color("---------- PYPI Requires-Python PREFLIGHT ----------", Fore.CYAN)
-    for req in requirements:
-        if not isinstance(req, Requirement):
-            kept.add(req)
-            continue
-        skip, reason = pypi_requires_python_preflight_skip(req)
+    checked = sorted((req for req in requirements if isinstance(req, Requirement)), key=str)
+    results = pypi_requires_python_preflight(checked)
+    for req in checked:
+        skip, reason = results[req]
         if skip:
             print_color(f"-- skip {req} ({reason})", Fore.YELLOW)
             continue
@@ -350,7 +559,7 @@ def parse_wheel_name(wheel_name: str) -> tuple[str, str] | None:
         return None
 
 
-def should_exclude_wheel(wheel_name: str, exclude_requirements: set) -> tuple[bool, str]:
+def should_exclude_wheel(wheel_name: str, exclude_requirements: set | ExcludeRules | DecisionTable) -> tuple[bool, str]:
     """
     Check if a wheel should be excluded based on exclude_list.yaml rules.
 
@@ -363,7 +572,9 @@ def should_exclude_wheel(wheel_name: str, exclude_requirements: set) -> tuple[bo
 
     Args:
         wheel_name: The wheel filename (e.g., "requests-2.31.0-py3-none-any.whl")
-        exclude_requirements: Set of Requirement objects from YAMLListAdapter
+        exclude_requirements: Set of Requirement objects from YAMLListAdapter, or ExcludeRules compiled
+            from them (compiled_markers.py; compile once when checking many wheels), or a DecisionTable
+            (YAMLListAdapter.compile_decision_table) which answers the marker part by a table lookup
 
     Returns:
         tuple: (should_exclude: bool, reason: str)
@@ -374,27 +585,28 @@ def should_exclude_wheel(wheel_name: str, exclude_requirements: set) -> tuple[bo
 
     pkg_name, wheel_version = parsed
     canonical_name = canonicalize_name(pkg_name)
-
-    for req in exclude_requirements:
-        # Check if package name matches (using canonical names)
-        if canonicalize_name(req.name) != canonical_name:
-            continue
-
+    # the running interpreter is the (None, None) cell of a DecisionTable
+    rules = _decision_table_rules(exclude_requirements, True, canonical_name, [None], [None])
+    if rules is None:
         # With exclude=True, if marker evaluates to True -> KEEP the wheel
-        if req.marker and req.marker.evaluate():
-            continue
+        rules = [
+            rule
+            for rule in as_exclude_rules(exclude_requirements).for_name(canonical_name)
+            if not (rule.marker and rule.marker.evaluate())
+        ]
 
+    for rule in rules:
         # With exclude=True, if version is in the (inverted) specifier -> KEEP the wheel
-        if req.specifier and wheel_version:
+        if rule.specifier and wheel_version:
             try:
-                if Version(wheel_version) in req.specifier:
+                if Version(wheel_version) in rule.specifier:
                     continue
             except Exception:
                 pass
 
         # Name matches, and marker is False (or absent), and version not in specifier (or absent)
         # -> EXCLUDE the wheel
-        return True, f"matches exclude rule: {req}"
+        return True, f"matches exclude rule: {rule.requirement}"
 
     return False, ""
 
@@ -450,9 +662,49 @@ def get_wheel_sys_platforms(wheel_name: str) -> list[str] | None:
     return list(platforms) if platforms else None
 
 
+def _decision_table_rules(
+    exclude_requirements: Any,
+    inverted: bool,
+    canonical_name: str,
+    sys_platforms: List[Optional[str]],
+    python_versions: List[Optional[str]],
+) -> Optional[List[CompiledRule]]:
+    """Rules whose marker applies to the wheel, looked up in a DecisionTable of the same logic (exclude=...).
+
+    None when exclude_requirements is not such a table or the wheel is outside of its grid.
+    """
+    if not isinstance(exclude_requirements, DecisionTable) or exclude_requirements.inverted != inverted:
+        return None
+    return exclude_requirements.lookup(canonical_name, sys_platforms, python_versions)
+
+
+def _s3_rule_marker_matches(
+    rule: CompiledRule, wheel_sys_platforms: list[str] | None, python_versions_to_try: list[str | None]
+) -> bool:
+    """Whether the (direct logic) marker of a rule is True for any platform / Python of the wheel."""
+    if not rule.marker:
+        return True
+    # Evaluate markers (including sys_platform) using wheel's target platform and Python
+    if rule.marker.references("sys_platform"):
+        if not wheel_sys_platforms:
+            return False  # Cannot derive platform from filename → skip rule
+        for sys_plat in wheel_sys_platforms:
+            for pv in python_versions_to_try:
+                env = {"sys_platform": sys_plat}
+                if pv is not None:
+                    env["python_version"] = pv
+                if rule.marker.evaluate(env):
+                    return True
+        return False  # Exclusion condition not met for this wheel's platform(s)
+    for pv in python_versions_to_try:
+        if rule.marker.evaluate({"python_version": pv} if pv is not None else None):
+            return True
+    return False  # Exclusion condition not met → keep
+
+
 def should_exclude_wheel_s3(
     wheel_name: str,
-    exclude_requirements: set,
+    exclude_requirements: set | ExcludeRules | DecisionTable,
     supported_python_versions: list[str] | None = None,
 ) -> tuple[bool, str]:
     """
@@ -474,7 +726,9 @@ def should_exclude_wheel_s3(
 
     Args:
         wheel_name: The wheel filename
-        exclude_requirements: Set of Requirement objects from YAMLListAdapter (exclude=False)
+        exclude_requirements: Set of Requirement objects from YAMLListAdapter (exclude=False), or ExcludeRules
+            compiled from them (compiled_markers.py; compile once when checking many wheels), or a DecisionTable
+            (YAMLListAdapter.compile_decision_table) which answers the marker part by a table lookup
         supported_python_versions: When the wheel has no cpXY tag, evaluate
             python_version markers against these versions (e.g. ["3.8", "3.9", "3.10", ...]).
             If None, falls back to the runner's Python (may miss version-specific exclusions).
@@ -500,47 +754,27 @@ def should_exclude_wheel_s3(
     else:
         python_versions_to_try.append(None)
 
-    for req in exclude_requirements:
-        if canonicalize_name(req.name) != canonical_name:
-            continue
-
-        # Evaluate markers (including sys_platform) using wheel's target platform and Python
-        if req.marker:
-            if "sys_platform" in str(req.marker):
-                if not wheel_sys_platforms:
-                    continue  # Cannot derive platform from filename → skip rule
-                marker_matches = False
-                for sys_plat in wheel_sys_platforms:
-                    for pv in python_versions_to_try:
-                        env = {"sys_platform": sys_plat}
-                        if pv is not None:
-                            env["python_version"] = pv
-                        if req.marker.evaluate(environment=env):
-                            marker_matches = True
-                            break
-                    if marker_matches:
-                        break
-                if not marker_matches:
-                    continue  # Exclusion condition not met for this wheel's platform(s)
-            else:
-                marker_matches = False
-                for pv in python_versions_to_try:
-                    env = {"python_version": pv} if pv is not None else {}
-                    if req.marker.evaluate(environment=env if env else None):
-                        marker_matches = True
-                        break
-                if not marker_matches:
-                    continue  # Exclusion condition not met → keep
-
+    sys_platforms_to_try: list[str | None] = list(wheel_sys_platforms) if wheel_sys_platforms else [None]
+    rules = _decision_table_rules(
+        exclude_requirements, False, canonical_name, sys_platforms_to_try, python_versions_to_try
+    )
+    if rules is None:
+        rules = [
+            rule
+            for rule in as_exclude_rules(exclude_requirements).for_name(canonical_name)
+            if _s3_rule_marker_matches(rule, wheel_sys_platforms, python_versions_to_try)
+        ]
+
+    for rule in rules:
         # If we get here, marker is True (or no marker)
         # Check version specifier - if version matches, EXCLUDE
-        if req.specifier and wheel_version:
+        if rule.specifier and wheel_version:
             try:
-                if Version(wheel_version) not in req.specifier:
+                if Version(wheel_version) not in rule.specifier:
                     continue  # Version doesn't match exclusion → keep
             except Exception:
                 pass
 
-        return True, f"matches exclude rule: {req}"
+        return True, f"matches exclude rule: {rule.requirement}"
 
     return False, ""
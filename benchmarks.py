@@ -0,0 +1,321 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Micro-benchmarks of the requirement processing steps (not run in CI).
+
+    python benchmarks.py                 # all benchmarks
+    python benchmarks.py exclude         # selected benchmarks
+    python benchmarks.py --list
+
+Every benchmark compares the current implementation against the former one, which is mirrored in
+test_build_wheels.py for the equivalence tests.
+"""
+
+import argparse
+import random
+import time
+
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Set
+from typing import Tuple
+from typing import TypeVar
+from unittest.mock import patch
+
+from packaging.requirements import Requirement
+
+from _helper_functions import print_color
+
+T = TypeVar("T")
+
+
+def _timed(function: Callable[..., T], *args, repeat: int = 1, **kwargs) -> Tuple[float, T]:
+    """Best wall time of ``repeat`` (at least one) runs and the result of the last run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _report(name: str, legacy: float, current: float) -> None:
+    print(f"{name:<48} legacy {legacy * 1000:10.1f} ms   current {current * 1000:10.1f} ms   x{legacy / current:8.1f}")
+
+
+def _random_requirements(rng: random.Random, names: List[str], count: int) -> set:
+    specifiers = ["", ">=1.0", "<2", "==1.5", "!=1.2", ">=1,<3"]
+    markers = ["", "sys_platform != 'win32'", "python_version >= '3.9'", "platform_machine == 'x86_64'"]
+    requirements: Set[Requirement] = set()
+    while len(requirements) < count:
+        marker = rng.choice(markers)
+        requirements.add(
+            Requirement(f"{rng.choice(names)}{rng.choice(specifiers)}" + (f"; {marker}" if marker else ""))
+        )
+    return requirements
+
+
+def bench_exclude(requirements_count: int = 5000, rules_count: int = 1000) -> None:
+    """exclude_from_requirements: ~5k requirements x ~1k exclude rules"""
+    from build_wheels import exclude_from_requirements
+    from test_build_wheels import legacy_exclude_from_requirements
+
+    rng = random.Random(0)
+    names = [f"package-{i}" for i in range(requirements_count)]
+    requirements = _random_requirements(rng, names, requirements_count)
+    exclude_list = _random_requirements(rng, names[: rules_count * 2], rules_count)
+
+    legacy_time, legacy = _timed(legacy_exclude_from_requirements, requirements, exclude_list, False)
+    current_time, current = _timed(exclude_from_requirements, requirements, exclude_list, False, repeat=3)
+    assert current == legacy, "results differ"
+    _report(f"exclude_from_requirements {len(requirements)}x{len(exclude_list)}", legacy_time, current_time)
+
+
+def bench_dependent(wheels_count: int = 1000, requirements_count: int = 300) -> None:
+    """get_python_dependent_wheels: ~1k wheels in downloaded_wheels x ~300 requirements"""
+    import tempfile
+
+    from pathlib import Path
+
+    from build_wheels import get_python_dependent_wheels
+    from test_build_wheels import legacy_get_python_dependent_wheels
+
+    rng = random.Random(0)
+    names = [f"package_{i}" for i in range(wheels_count)]
+    requirements = _random_requirements(rng, [name.replace("_", "-") for name in names], requirements_count)
+    with tempfile.TemporaryDirectory() as wheel_dir:
+        for i, name in enumerate(names):
+            tag = "cp311-cp311-manylinux_2_17_x86_64" if i % 3 else "py3-none-any"
+            Path(wheel_dir, f"{name}-1.{i % 7}.0-{tag}.whl").write_bytes(b"")
+        legacy_time, _ = _timed(legacy_get_python_dependent_wheels, wheel_dir, requirements)
+        current_time, _ = _timed(get_python_dependent_wheels, wheel_dir, requirements, repeat=3)
+    _report(f"get_python_dependent_wheels {wheels_count}x{len(requirements)}", legacy_time, current_time)
+
+
+def bench_preflight(releases_count: int = 400, latency: float = 0.005) -> None:
+    """Requires-Python candidate search: ~400 releases (numpy-like history), 5 ms per metadata fetch"""
+    from _helper_functions import find_installable_release
+    from test_build_wheels import legacy_find_installable_release
+    from test_build_wheels import release_history
+
+    # only the oldest releases install on this interpreter: the worst case of the linear scan
+    history = release_history(releases_count, 5)
+    candidates = [f"1.{i}" for i in reversed(range(releases_count))]
+    fetches = {"legacy": 0, "current": 0}
+
+    def _fetch(counter: str) -> Callable[[str, str], str]:
+        def _fetch_release(project_name: str, version: str) -> str:
+            fetches[counter] += 1
+            time.sleep(latency)
+            return history[version]
+
+        return _fetch_release
+
+    with patch("_helper_functions.fetch_pypi_release_requires_python", side_effect=_fetch("legacy")):
+        legacy_time, legacy = _timed(legacy_find_installable_release, "numpy", candidates)
+    with patch("_helper_functions.fetch_pypi_release_requires_python", side_effect=_fetch("current")):
+        current_time, current = _timed(find_installable_release, "numpy", candidates)
+    assert current == legacy, "results differ"
+    _report(
+        f"find_installable_release {releases_count} ({fetches['legacy']} -> {fetches['current']} fetches)",
+        legacy_time,
+        current_time,
+    )
+
+
+def bench_s3(rounds: int = 3) -> None:
+    """should_exclude_wheel_s3: every exclude_list.yaml package x ~25 tags x versions, checked like verify_s3_wheels"""
+    from _helper_functions import should_exclude_wheel_s3
+    from compiled_markers import ExcludeRules
+    from test_build_wheels import SUPPORTED_PYTHONS
+    from test_build_wheels import exclude_list_wheel_names
+    from test_build_wheels import legacy_should_exclude_wheel_s3
+    from yaml_list_adapter import YAMLListAdapter
+
+    requirements = YAMLListAdapter("exclude_list.yaml", exclude=False).requirements
+    wheels = exclude_list_wheel_names(requirements) * rounds
+
+    def _check(function: Callable, rules) -> List[bool]:
+        return [function(wheel, rules, SUPPORTED_PYTHONS)[0] for wheel in wheels]
+
+    legacy_time, legacy = _timed(_check, legacy_should_exclude_wheel_s3, requirements)
+    current_time, current = _timed(lambda: _check(should_exclude_wheel_s3, ExcludeRules(requirements)), repeat=3)
+    assert current == legacy, "results differ"
+    _report(f"should_exclude_wheel_s3 {len(wheels)} wheels x {len(requirements)} rules", legacy_time, current_time)
+
+
+def bench_table(rounds: int = 3) -> None:
+    """should_exclude_wheel_s3 with the DecisionTable of exclude_list.yaml, as checked by verify_s3_wheels"""
+    from _helper_functions import should_exclude_wheel_s3
+    from test_build_wheels import SUPPORTED_PYTHONS
+    from test_build_wheels import exclude_list_wheel_names
+    from test_build_wheels import legacy_should_exclude_wheel_s3
+    from yaml_list_adapter import YAMLListAdapter
+
+    adapter = YAMLListAdapter("exclude_list.yaml", exclude=False)
+    wheels = exclude_list_wheel_names(adapter.requirements) * rounds
+
+    def _check(function: Callable, rules) -> List[bool]:
+        return [function(wheel, rules, SUPPORTED_PYTHONS)[0] for wheel in wheels]
+
+    legacy_time, legacy = _timed(_check, legacy_should_exclude_wheel_s3, adapter.requirements)
+    # the table is compiled from scratch in every run, as verify_s3_wheels does once
+    current_time, current = _timed(
+        lambda: _check(should_exclude_wheel_s3, adapter.compile_decision_table(SUPPORTED_PYTHONS)), repeat=3
+    )
+    assert current == legacy, "results differ"
+    _report(f"decision table {len(wheels)} wheels x {len(adapter.requirements)} rules", legacy_time, current_time)
+
+
+def bench_duplicates(sizes: Tuple[int, ...] = (500, 2000, 8000)) -> None:
+    """YAMLListAdapter duplicate assembly: random exclude lists of growing size, ~4 entries per package"""
+    import tempfile
+
+    from pathlib import Path
+
+    import yaml
+
+    from test_build_wheels import legacy_assemble_requirements_duplicates
+    from test_build_wheels import random_yaml_list
+    from yaml_list_adapter import YAMLListAdapter
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        yaml_file = str(Path(tmp, "exclude_list.yaml"))
+        for size in sizes:
+            yaml_list = random_yaml_list(rng, size, size // 4)
+            Path(yaml_file).write_text(yaml.safe_dump(yaml_list))
+            adapter = YAMLListAdapter(yaml_file, exclude=True)
+
+            # the assembly step alone (YAML loading and requirement parsing are the same in both)
+            def _assemble(function: Callable[[YAMLListAdapter], dict]) -> dict:
+                adapter._yaml_list = list(yaml_list)
+                return function(adapter)
+
+            legacy_time, legacy = _timed(_assemble, legacy_assemble_requirements_duplicates)
+            current_time, current = _timed(_assemble, YAMLListAdapter._assemble_requirements_duplicates, repeat=3)
+            # the former one collects the duplicates in sets, the current one in lists in YAML order
+            assert {name: set(entries) for name, entries in current.items()} == legacy, "results differ"
+            _report(f"_assemble_requirements_duplicates {size} entries", legacy_time, current_time)
+
+
+def bench_yaml(rounds: int = 20) -> None:
+    """YAMLListAdapter construction of exclude_list.yaml and include_list.yaml: cold and warm list cache"""
+    import os
+    import tempfile
+
+    import yaml
+
+    from _helper_functions import CACHE_DIR_ENV
+    from yaml_list_adapter import YAMLListAdapter
+
+    def _load(use_cache: bool) -> list:
+        return [
+            YAMLListAdapter(yaml_file, exclude=exclude, current_platform=platform, use_cache=use_cache).requirements
+            for _ in range(rounds)
+            for yaml_file, exclude, platform in (
+                ("exclude_list.yaml", True, "linux_x86_64"),
+                ("exclude_list.yaml", False, None),
+                ("include_list.yaml", False, None),
+            )
+        ]
+
+    # former construction: pure Python yaml.Loader, compiled on every run
+    with patch("yaml_list_adapter._YAML_LOADER", yaml.Loader):
+        legacy_time, legacy = _timed(_load, False)
+    with tempfile.TemporaryDirectory() as cache_root, patch.dict(os.environ, {CACHE_DIR_ENV: cache_root}):
+        # cold: every lookup misses (CSafeLoader, compile and store)
+        with patch.object(YAMLListAdapter, "_load_cached", return_value=False):
+            cold_time, cold = _timed(_load, True, repeat=3)
+        warm_time, warm = _timed(_load, True, repeat=3)
+    assert cold == legacy and warm == legacy, "results differ"
+    _report(f"YAMLListAdapter {len(legacy)} lists, cold cache", legacy_time, cold_time)
+    _report(f"YAMLListAdapter {len(legacy)} lists, warm cache", legacy_time, warm_time)
+
+
+def bench_upload(wheels_count: int = 48, large_count: int = 2, latency: float = 0.02) -> None:
+    """upload_wheels.py against moto: ~48 small and 2 multipart wheels, 20 ms per S3 request; serial vs --jobs 8"""
+    import os
+    import tempfile
+
+    from pathlib import Path
+
+    try:
+        import moto
+    except ImportError:
+        print("upload: skipped, moto (local S3 stand-in) is not installed")
+        return
+
+    from upload_wheels import collect_wheel_paths
+    from upload_wheels import make_client
+    from upload_wheels import transfer_config
+    from upload_wheels import upload_wheels
+
+    credentials = {"AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench", "AWS_DEFAULT_REGION": "us-east-1"}
+    with tempfile.TemporaryDirectory() as wheels_dir, patch.dict(os.environ, credentials), moto.mock_aws():
+        for i in range(wheels_count):
+            Path(wheels_dir, f"small{i}-1.0-py3-none-any.whl").write_bytes(os.urandom(256 * 1024))
+        for i in range(large_count):
+            Path(wheels_dir, f"large{i}-1.0-py3-none-any.whl").write_bytes(os.urandom(20 * 1024 * 1024))
+        wheel_paths = collect_wheel_paths(wheels_dir)
+
+        def _upload(bucket: str, jobs: int, max_concurrency: int):
+            client = make_client(jobs, max_concurrency)
+            # network round trip of every request (moto answers in-process)
+            client.meta.events.register("before-send.s3", lambda **kwargs: time.sleep(latency))
+            client.create_bucket(Bucket=bucket)
+            config = transfer_config(max_concurrency=max_concurrency)
+            with patch("upload_wheels._report"):
+                return upload_wheels(client, bucket, wheel_paths, {}, jobs=jobs, config=config, retries=0)
+
+        # former upload: one wheel after another with the default transfer settings (10 parts at once)
+        legacy_time, legacy = _timed(_upload, "serial", 1, 10)
+        current_time, current = _timed(_upload, "concurrent", 8, 4)
+    assert (current.new, current.bytes_uploaded) == (legacy.new, legacy.bytes_uploaded), "results differ"
+    _report(
+        f"upload_wheels {len(wheel_paths)} wheels ({current.bytes_uploaded / 2**20:.0f} MiB, "
+        f"{current.throughput:.0f} MiB/s)",
+        legacy_time,
+        current_time,
+    )
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {
+    "exclude": bench_exclude,
+    "dependent": bench_dependent,
+    "preflight": bench_preflight,
+    "s3": bench_s3,
+    "table": bench_table,
+    "duplicates": bench_duplicates,
+    "yaml": bench_yaml,
+    "upload": bench_upload,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks of the requirement processing steps.")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK", help="benchmarks to run (default all)")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, benchmark in BENCHMARKS.items():
+            print(f"{name:<16} {(benchmark.__doc__ or '').strip()}")
+        return
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)} (see --list)")
+
+    print_color("---------- BENCHMARKS ----------")
+    # benchmarked functions print their progress, keep the report readable
+    with patch("build_wheels.print_color"), patch("yaml_list_adapter.print_color"):
+        for name in args.benchmarks or list(BENCHMARKS):
+            BENCHMARKS[name]()
+    print_color("---------- END OF BENCHMARKS ----------")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Persistent, content-addressed cache of built wheels.
+
+An entry is keyed by the canonical name and resolved version of the built distribution, the interpreter
+and platform tag, a hash of the build toolchain (build_requirements.txt, compiler, ``get_no_binary_args``)
+and the pip arguments of the build. A hit hardlinks (or copies) the cached wheels instead of running
+``pip wheel``. The cache is capped in size, least recently used entries are evicted first (cache_entries.py).
+
+- cache directory ... ``build`` under ``get_cache_dir()`` (``IDF_PYTHON_WHEELS_CACHE_DIR``)
+- size cap        ... ``IDF_PYTHON_WHEELS_BUILD_CACHE_SIZE`` in MiB (default 10240)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from colorama import Fore
+from packaging import tags
+
+from _helper_functions import get_cache_dir
+from _helper_functions import get_no_binary_args
+from _helper_functions import print_color
+from cache_entries import ENTRY_FILE
+from cache_entries import EntryCache
+from cache_entries import link_or_copy
+
+if TYPE_CHECKING:
+    from build_scheduler import WheelBuildTask
+
+BUILD_REQUIREMENTS_PATH = Path(__file__).parent / "build_requirements.txt"
+CACHE_SIZE_ENV = "IDF_PYTHON_WHEELS_BUILD_CACHE_SIZE"
+DEFAULT_CACHE_SIZE_MIB = 10 * 1024
+# Bump when the layout or key composition changes
+CACHE_FORMAT_VERSION = 1
+
+
+def _compiler_identity() -> Dict[str, str]:
+    """Compiler and flags which influence the produced binaries."""
+    identity = {
+        "cc": os.environ.get("CC") or str(sysconfig.get_config_var("CC") or ""),
+        "cxx": os.environ.get("CXX") or str(sysconfig.get_config_var("CXX") or ""),
+        "archflags": os.environ.get("ARCHFLAGS", ""),
+        "cflags": os.environ.get("CFLAGS", ""),
+    }
+    compiler = identity["cc"].split()
+    if compiler:
+        try:
+            out = subprocess.run(compiler[:1] + ["--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            identity["cc_version"] = out.stdout.decode("utf-8", errors="replace").splitlines()[0]
+        except (OSError, IndexError):
+            pass
+    return identity
+
+
+def toolchain_hash() -> str:
+    """Hash of everything in the build environment which is the same for all packages."""
+    try:
+        build_requirements = BUILD_REQUIREMENTS_PATH.read_text()
+    except OSError:
+        build_requirements = ""
+    toolchain = {
+        "build_requirements": build_requirements,
+        "compiler": _compiler_identity(),
+        "python": sys.version,
+    }
+    return hashlib.sha256(json.dumps(toolchain, sort_keys=True).encode()).hexdigest()
+
+
+class BuildCacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.bytes_saved = 0
+
+
+class BuildCache(EntryCache):
+    """Cache of built wheels shared between runs (see module docstring)."""
+
+    def __init__(self, directory: Optional[Path] = None, max_size: Optional[int] = None) -> None:
+        if max_size is None:
+            max_size = int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE_MIB)) * 1024 * 1024
+        super().__init__(directory if directory is not None else get_cache_dir("build"), max_size)
+        self.stats = BuildCacheStats()
+        self._toolchain = toolchain_hash()
+        self._interpreter = f"{tags.interpreter_name()}{tags.interpreter_version()}"
+        self._platform = sysconfig.get_platform().replace("-", "_").replace(".", "_")
+        self._lock = threading.Lock()
+
+    # --- keys ---
+    def key_for(self, task: WheelBuildTask) -> Optional[str]:
+        """Cache key of a task, None when the task was not resolved (version unknown)."""
+        if not task.resolution:
+            return None
+        requested = [dist for dist in task.resolution if dist.requested]
+        if len(requested) != 1:
+            return None
+        name, version = requested[0].name, requested[0].version
+        key = {
+            "format": CACHE_FORMAT_VERSION,
+            "name": name,
+            "version": version,
+            "interpreter": self._interpreter,
+            "platform": self._platform,
+            "toolchain": self._toolchain,
+            "no_binary": get_no_binary_args(name),
+            "pip_args": task.pip_args,
+            # all resolved pins, the build produces wheels for the whole resolution
+            "resolution": sorted(f"{dist.name}=={dist.version}" for dist in task.resolution),
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    # --- lookup / store ---
+    def restore(self, key: str, target_dir: str) -> Optional[List[str]]:
+        """Link cached wheels of ``key`` into target_dir; returns wheel names or None on miss."""
+        entry_dir = self._entry_dir(key)
+        try:
+            entry = self._read_entry(key)
+            restored: List[str] = []
+            for name in entry["wheels"]:
+                link_or_copy(entry_dir / name, Path(target_dir) / name)
+                restored.append(name)
+            self._mark_used(key)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.bytes_saved += int(entry.get("size", 0))
+        return restored
+
+    def store(self, key: str, source_dir: str, wheels: List[str]) -> None:
+        """Store built wheels; the entry becomes visible atomically (rename of a complete directory)."""
+        if not wheels:
+            return
+        entry_dir = self._entry_dir(key)
+        if entry_dir.exists():
+            return
+        entry_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry_dir.parent))
+        try:
+            size = 0
+            for name in wheels:
+                shutil.copy2(Path(source_dir) / name, tmp_dir / name)
+                size += (tmp_dir / name).stat().st_size
+            (tmp_dir / ENTRY_FILE).write_text(json.dumps({"wheels": wheels, "size": size, "created": time.time()}))
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        with self._lock:
+            self.stats.stored += 1
+
+    # --- eviction ---
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits into max_size; returns their number."""
+        evicted = super().evict()
+        self.stats.evicted += evicted
+        return evicted
+
+    def print_stats(self) -> None:
+        print_color("---------- BUILD CACHE ----------")
+        print(f"Cache directory: {self.directory}")
+        print_color(f"Hits: {self.stats.hits}", Fore.GREEN)
+        print(f"Misses: {self.stats.misses}")
+        print(f"Stored: {self.stats.stored}, evicted: {self.stats.evicted}")
+        print(f"Saved: {self.stats.bytes_saved / (1024 * 1024):.1f} MiB of wheels not rebuilt")
+        print_color("---------- END OF BUILD CACHE ----------")
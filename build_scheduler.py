@@ -0,0 +1,512 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Worker-pool engine running ``pip wheel`` builds concurrently.
+
+Every build writes into its own staging directory next to the shared wheel directory, so concurrent
+pip processes never write the same file. Finished wheels are moved into the shared directory with an
+atomic rename and the captured pip output is printed as one block per build.
+Used by build_wheels.py and build_wheels_from_file.py.
+
+Optionally the requirements are first resolved into a dependency graph (``pip install --dry-run --report``).
+Dependencies shared by several requirements are then built exactly once, before everything that needs them,
+and the dependent builds pick the finished wheels up through ``--find-links``.
+
+In batched mode all requirements with the same pip arguments are built by one ``pip wheel -r``; a failing
+batch is bisected until the failing requirements are isolated.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import TYPE_CHECKING
+from typing import Callable
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from colorama import Fore
+from packaging.requirements import InvalidRequirement
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+
+from _helper_functions import print_color
+from build_telemetry import get_telemetry
+from build_telemetry import run_measured
+from build_telemetry import wheels_size
+
+if TYPE_CHECKING:
+    from build_cache import BuildCache
+
+# Serializes moving wheels into the shared wheel directory and printing of per-build output
+_OUTPUT_LOCK = threading.Lock()
+
+
+def default_jobs() -> int:
+    """Default number of parallel builds (number of CPU cores)."""
+    return os.cpu_count() or 1
+
+
+class WheelBuildTask:
+    """One ``pip wheel`` invocation.
+
+    - requirement ... requirement string (used as a label in the output)
+    - pip_args    ... arguments passed after ``pip wheel`` (``--wheel-dir`` is added by the engine)
+    - tracked     ... False when the result should not be counted into succeeded/failed statistics
+    - dependencies ... tasks which have to finish before this one starts
+    - resolution  ... distributions the requirement resolves to (set by the dependency planning)
+    """
+
+    def __init__(self, requirement: str, pip_args: List[str], tracked: bool = True) -> None:
+        self.requirement = requirement
+        self.pip_args = pip_args
+        self.tracked = tracked
+        self.dependencies: List[WheelBuildTask] = []
+        self.resolution: Optional[List[ResolvedDistribution]] = None
+
+    def __repr__(self) -> str:
+        return f"WheelBuildTask({self.requirement!r})"
+
+
+class WheelBuildResult(NamedTuple):
+    task: WheelBuildTask
+    returncode: int
+    stdout: str
+    stderr: str
+    wheels: List[str]  # file names of the wheels produced by this build
+
+
+def count_results(results: List[WheelBuildResult]) -> dict:
+    """Succeeded/failed counters of tracked builds (same shape as build_wheels.build_wheels())."""
+    failed = sum(1 for r in results if r.task.tracked and r.returncode != 0)
+    succeeded = sum(1 for r in results if r.task.tracked and r.returncode == 0)
+    return {"failed": failed, "succeeded": succeeded}
+
+
+def _publish_wheels(staging_dir: str, wheel_dir: str) -> List[str]:
+    """Move built wheels from the private staging directory into the shared wheel directory."""
+    published: List[str] = []
+    with _OUTPUT_LOCK:
+        os.makedirs(wheel_dir, exist_ok=True)
+        for name in sorted(os.listdir(staging_dir)):
+            if not name.endswith(".whl"):
+                continue
+            # Same filesystem (staging dir is a sibling), so this is an atomic rename
+            os.replace(os.path.join(staging_dir, name), os.path.join(wheel_dir, name))
+            published.append(name)
+    return published
+
+
+def _print_result(result: WheelBuildResult) -> None:
+    with _OUTPUT_LOCK:
+        print(result.stdout)
+        if result.stderr:
+            print_color(result.stderr, Fore.RED)
+
+
+def _restore_from_cache(
+    task: WheelBuildTask, wheel_dir: str, cache: BuildCache, key: str
+) -> Optional[WheelBuildResult]:
+    staging_parent = os.path.dirname(os.path.abspath(wheel_dir))
+    staging_dir = tempfile.mkdtemp(prefix=".wheel-build-", dir=staging_parent)
+    try:
+        restored = cache.restore(key, staging_dir)
+        if restored is None:
+            return None
+        wheels = _publish_wheels(staging_dir, wheel_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    result = WheelBuildResult(
+        task=task,
+        returncode=0,
+        stdout=f"{task.requirement}: restored from build cache: {', '.join(wheels)}",
+        stderr="",
+        wheels=wheels,
+    )
+    _print_result(result)
+    return result
+
+
+def _run_build(task: WheelBuildTask, wheel_dir: str, cache: Optional[BuildCache] = None) -> WheelBuildResult:
+    key = cache.key_for(task) if cache is not None else None
+    if cache is not None and key is not None:
+        cached = _restore_from_cache(task, wheel_dir, cache, key)
+        if cached is not None:
+            return cached
+
+    staging_parent = os.path.dirname(os.path.abspath(wheel_dir))
+    staging_dir = tempfile.mkdtemp(prefix=".wheel-build-", dir=staging_parent)
+    try:
+        out, measurement = run_measured(
+            [f"{sys.executable}", "-m", "pip", "wheel"] + task.pip_args + ["--wheel-dir", staging_dir]
+        )
+        if cache is not None and key is not None and out.returncode == 0:
+            cache.store(key, staging_dir, sorted(n for n in os.listdir(staging_dir) if n.endswith(".whl")))
+        wheels = _publish_wheels(staging_dir, wheel_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    get_telemetry().record("pip wheel", task.requirement, measurement, wheels, wheels_size(wheel_dir, wheels))
+
+    result = WheelBuildResult(
+        task=task,
+        returncode=out.returncode,
+        stdout=out.stdout.decode("utf-8", errors="replace"),
+        stderr=out.stderr.decode("utf-8", errors="replace") if out.stderr else "",
+        wheels=wheels,
+    )
+    _print_result(result)
+    return result
+
+
+def run_wheel_builds(
+    tasks: List[WheelBuildTask], wheel_dir: str, jobs: Optional[int] = None, cache: Optional[BuildCache] = None
+) -> List[WheelBuildResult]:
+    """Run ``pip wheel`` for all tasks on a pool of ``jobs`` workers (default: number of CPU cores).
+
+    A task is started only when all its ``dependencies`` are finished (successfully or not);
+    dependencies which are not part of ``tasks`` are ignored.
+    With a build ``cache``, resolved tasks are restored from it when possible and stored into it after a build.
+    Results are returned in the order of ``tasks``; output of every build is printed when it finishes.
+    """
+    if not tasks:
+        return []
+    jobs = max(1, jobs or default_jobs())
+    scheduled = {id(task) for task in tasks}
+    finished: Set[int] = set()
+    results: Dict[int, WheelBuildResult] = {}
+    pending = list(tasks)
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        running: Dict[Future, WheelBuildTask] = {}
+        while pending or running:
+            ready = [
+                task
+                for task in pending
+                if all(id(dep) in finished or id(dep) not in scheduled for dep in task.dependencies)
+            ]
+            if not ready and not running:
+                # Dependency cycle - do not deadlock, continue in the original order
+                ready = pending[:1]
+            for task in ready:
+                pending.remove(task)
+                running[executor.submit(_run_build, task, wheel_dir, cache)] = task
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                results[id(task)] = future.result()
+                finished.add(id(task))
+
+    return [results[id(task)] for task in tasks]
+
+
+# --- Batched builds ---
+def _batch_key(task: WheelBuildTask) -> Optional[Tuple[str, ...]]:
+    """pip arguments of a task without its requirement; tasks with equal keys can share one ``pip wheel -r``."""
+    if task.requirement not in task.pip_args:
+        return None
+    args = list(task.pip_args)
+    # only the requirement itself, the name may be repeated in options (e.g. --no-binary <name>)
+    args.remove(task.requirement)
+    return tuple(args)
+
+
+def _requirement_name(task: WheelBuildTask) -> Optional[str]:
+    try:
+        return canonicalize_name(Requirement(task.requirement).name)
+    except InvalidRequirement:
+        return None
+
+
+def _run_batch(batch: List[WheelBuildTask], common_args: Tuple[str, ...], wheel_dir: str) -> List[WheelBuildResult]:
+    """One ``pip wheel -r`` over all requirements of the batch; every task gets the returncode of the batch.
+
+    Wheels are published even when the batch fails, bisected batches pick them up through ``--find-links``.
+    """
+    staging_parent = os.path.dirname(os.path.abspath(wheel_dir))
+    staging_dir = tempfile.mkdtemp(prefix=".wheel-build-", dir=staging_parent)
+    try:
+        requirements_file = os.path.join(staging_dir, "requirements.txt")
+        with open(requirements_file, "w") as f:
+            f.write("".join(f"{task.requirement}\n" for task in batch))
+        out, measurement = run_measured(
+            [f"{sys.executable}", "-m", "pip", "wheel", "-r", requirements_file]
+            + list(common_args)
+            + ["--wheel-dir", staging_dir]
+        )
+        wheels = _publish_wheels(staging_dir, wheel_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    get_telemetry().record(
+        "pip wheel -r",
+        f"batch of {len(batch)}: {', '.join(task.requirement for task in batch)}",
+        measurement,
+        wheels,
+        wheels_size(wheel_dir, wheels),
+    )
+
+    stdout = out.stdout.decode("utf-8", errors="replace")
+    stderr = out.stderr.decode("utf-8", errors="replace") if out.stderr else ""
+    results = []
+    for task in batch:
+        name = _requirement_name(task)
+        task_wheels = [wheel for wheel in wheels if name is not None and canonicalize_name(wheel.split("-")[0]) == name]
+        results.append(WheelBuildResult(task, out.returncode, stdout, stderr, task_wheels))
+    return results
+
+
+def run_batched_wheel_builds(
+    tasks: List[WheelBuildTask], wheel_dir: str, jobs: Optional[int] = None
+) -> List[WheelBuildResult]:
+    """Build tasks with one ``pip wheel -r`` per group of tasks sharing the same pip arguments.
+
+    pip resolves every batch once and the interpreter starts once. A failing batch is bisected (halves run
+    as new batches) until the failing requirements are isolated, so the result of every task is the result
+    of the smallest batch it was built in. Up to ``jobs`` batches run concurrently.
+    Results are returned in the order of ``tasks`` (same shape as ``run_wheel_builds``).
+    """
+    if not tasks:
+        return []
+    jobs = max(1, jobs or default_jobs())
+    # common pip arguments of a batch; None for a task which is not expressible as a requirements file line
+    batches: List[Tuple[List[WheelBuildTask], Optional[Tuple[str, ...]]]] = []
+    groups: Dict[Tuple[str, ...], List[WheelBuildTask]] = {}
+    for task in tasks:
+        key = _batch_key(task)
+        if key is None:
+            batches.append(([task], None))
+        else:
+            groups.setdefault(key, []).append(task)
+    batches.extend((group, key) for key, group in groups.items())
+
+    results: Dict[int, WheelBuildResult] = {}
+    with ThreadPoolExecutor(max_workers=min(jobs, len(batches))) as executor:
+        running: Dict[Future, Tuple[List[WheelBuildTask], Optional[Tuple[str, ...]]]] = {}
+
+        def _submit(batch: List[WheelBuildTask], common_args: Optional[Tuple[str, ...]]) -> None:
+            if common_args is None:
+                future = executor.submit(lambda: [_run_build(batch[0], wheel_dir)])
+            else:
+                future = executor.submit(_run_batch, batch, common_args, wheel_dir)
+            running[future] = (batch, common_args)
+
+        for batch, common_args in batches:
+            _submit(batch, common_args)
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, common_args = running.pop(future)
+                batch_results = future.result()
+                if batch_results[0].returncode != 0 and len(batch) > 1:
+                    middle = len(batch) // 2
+                    with _OUTPUT_LOCK:
+                        print_color(f"Batch of {len(batch)} requirements failed, bisecting", Fore.YELLOW)
+                    _submit(batch[:middle], common_args)
+                    _submit(batch[middle:], common_args)
+                    continue
+                if common_args is not None:
+                    _print_batch(batch_results)
+                for result in batch_results:
+                    results[id(result.task)] = result
+
+    return [results[id(task)] for task in tasks]
+
+
+def _print_batch(batch_results: List[WheelBuildResult]) -> None:
+    first = batch_results[0]
+    with _OUTPUT_LOCK:
+        print_color(
+            f"Batch of {len(batch_results)} requirements: {', '.join(r.task.requirement for r in batch_results)}"
+        )
+        print(first.stdout)
+        if first.stderr:
+            print_color(first.stderr, Fore.RED)
+
+
+# --- Dependency graph planning ---
+class ResolvedDistribution(NamedTuple):
+    """One distribution from a ``pip install --dry-run --report`` resolution"""
+
+    name: str  # canonical name
+    version: str
+    requires: FrozenSet[str]  # canonical names of dependencies resolved in the same report
+    requested: bool  # True for the requirement the resolution was made for
+
+
+def parse_install_report(report: dict) -> List[ResolvedDistribution]:
+    """Convert pip installation report (https://pip.pypa.io/en/stable/reference/installation-report/)"""
+    items = report.get("install", [])
+    resolved_names = {canonicalize_name(item["metadata"]["name"]) for item in items}
+    distributions: List[ResolvedDistribution] = []
+    for item in items:
+        metadata = item["metadata"]
+        requires: Set[str] = set()
+        for requires_dist in metadata.get("requires_dist") or []:
+            try:
+                dependency = Requirement(requires_dist)
+            except InvalidRequirement:
+                continue
+            dependency_name = canonicalize_name(dependency.name)
+            if dependency_name in resolved_names:
+                requires.add(dependency_name)
+        distributions.append(
+            ResolvedDistribution(
+                name=canonicalize_name(metadata["name"]),
+                version=str(metadata["version"]),
+                requires=frozenset(requires),
+                requested=bool(item.get("requested")),
+            )
+        )
+    return distributions
+
+
+def resolve_dependencies(task: WheelBuildTask) -> Optional[List[ResolvedDistribution]]:
+    """Resolve the task's requirement without building it; None when pip cannot resolve it."""
+    report_fd, report_path = tempfile.mkstemp(prefix=".pip-report-", suffix=".json")
+    os.close(report_fd)
+    try:
+        out, measurement = run_measured(
+            [f"{sys.executable}", "-m", "pip", "install", "--dry-run", "--ignore-installed", "--quiet"]
+            + ["--report", report_path]
+            + task.pip_args
+        )
+        get_telemetry().record("pip install --dry-run", task.requirement, measurement)
+        if out.returncode != 0:
+            return None
+        with open(report_path, "r") as f:
+            return parse_install_report(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+    finally:
+        os.unlink(report_path)
+
+
+def _reachable(node: str, edges: Dict[str, FrozenSet[str]]) -> Set[str]:
+    """All distributions reachable from node (node excluded)"""
+    seen: Set[str] = set()
+    stack = list(edges.get(node, ()))
+    while stack:
+        current = stack.pop()
+        if current in seen or current == node:
+            continue
+        seen.add(current)
+        stack.extend(edges.get(current, ()))
+    return seen
+
+
+def _break_dependency_cycles(tasks: List[WheelBuildTask]) -> None:
+    """Drop dependency edges closing a cycle (depth first search in task order)"""
+    state: Dict[int, int] = {}  # 1 ... visiting, 2 ... done
+
+    def visit(task: WheelBuildTask) -> None:
+        state[id(task)] = 1
+        for dep in list(task.dependencies):
+            if state.get(id(dep)) == 1:
+                task.dependencies.remove(dep)
+            elif id(dep) not in state:
+                visit(dep)
+        state[id(task)] = 2
+
+    for task in tasks:
+        if id(task) not in state:
+            visit(task)
+
+
+def plan_dependency_builds(
+    tasks: List[WheelBuildTask],
+    resolutions: Dict[int, List[ResolvedDistribution]],
+    make_dependency_task: Callable[[str, str], WheelBuildTask],
+) -> List[WheelBuildTask]:
+    """Turn independent build tasks into a dependency graph
+
+    - resolutions ... resolved distributions per task (``id(task)``); tasks without resolution stay independent
+    - make_dependency_task ... creates the build task for a shared dependency (name, version)
+
+    A distribution needed by two or more requirements which is not itself one of the requested
+    requirements gets its own build task. Every task then depends on the tasks providing its resolved
+    dependencies, so leaves are built first and each shared dependency is built once.
+    Returns dependency build tasks (leaves first) followed by the original tasks.
+    """
+    providers: Dict[Tuple[str, str], WheelBuildTask] = {}
+    users: Dict[Tuple[str, str], int] = {}
+    edges: Dict[Tuple[str, str], Set[Tuple[str, str]]] = {}
+
+    for task in tasks:
+        distributions = resolutions.get(id(task))
+        if not distributions:
+            continue
+        task.resolution = distributions
+        versions = {dist.name: dist.version for dist in distributions}
+        requires = {dist.name: dist.requires for dist in distributions}
+        for dist in distributions:
+            node = (dist.name, dist.version)
+            reachable = {(name, versions[name]) for name in _reachable(dist.name, requires)}
+            edges.setdefault(node, set()).update(reachable)
+            if dist.requested:
+                providers.setdefault(node, task)
+            else:
+                users[node] = users.get(node, 0) + 1
+
+    dependency_tasks: List[WheelBuildTask] = []
+    for node in sorted(users, key=lambda n: (len(edges.get(n, ())), n)):
+        if users[node] >= 2 and node not in providers:
+            providers[node] = make_dependency_task(*node)
+            providers[node].resolution = [ResolvedDistribution(node[0], node[1], frozenset(), True)]
+            dependency_tasks.append(providers[node])
+
+    for node, provider in providers.items():
+        for dependency in sorted(edges.get(node, ())):
+            dependency_provider = providers.get(dependency)
+            if dependency_provider is not None and dependency_provider is not provider:
+                if dependency_provider not in provider.dependencies:
+                    provider.dependencies.append(dependency_provider)
+
+    for task in tasks:
+        for dist in resolutions.get(id(task)) or []:
+            dependency_provider = providers.get((dist.name, dist.version))
+            if dependency_provider is None or dependency_provider is task:
+                continue
+            if dependency_provider not in task.dependencies:
+                task.dependencies.append(dependency_provider)
+
+    planned = dependency_tasks + list(tasks)
+    _break_dependency_cycles(planned)
+    return planned
+
+
+def resolve_build_plan(
+    tasks: List[WheelBuildTask],
+    make_dependency_task: Callable[[str, str], WheelBuildTask],
+    jobs: Optional[int] = None,
+) -> List[WheelBuildTask]:
+    """Resolve all tasks in parallel and return the planned task graph (see plan_dependency_builds())"""
+    print_color("---------- DEPENDENCY PLAN ----------")
+    jobs = max(1, jobs or default_jobs())
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        resolved = list(executor.map(resolve_dependencies, tasks))
+    resolutions = {id(task): dists for task, dists in zip(tasks, resolved) if dists}
+
+    planned = plan_dependency_builds(tasks, resolutions, make_dependency_task)
+    shared = planned[: len(planned) - len(tasks)]
+    print(f"Resolved {len(resolutions)} of {len(tasks)} requirements")
+    for task in shared:
+        print_color(f"== {task.requirement} (shared dependency, built once)", Fore.CYAN)
+    print_color("---------- END OF DEPENDENCY PLAN ----------")
+    return planned
@@ -0,0 +1,195 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Measurement of the subprocesses launched by the build scripts.
+
+Every ``pip wheel``, ``pip install --dry-run`` and wheel repair tool run is measured: wall time, user and system
+CPU time and peak RSS of the child (``os.wait4``, not available on Windows where only wall time is measured),
+exit code and the size of the produced wheels. At the end of a script the measurements are appended to
+``build_report.json`` and the slowest processes are printed as a table.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+from pathlib import Path
+from typing import IO
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from colorama import Fore
+
+from _helper_functions import print_color
+
+REPORT_FILE = "build_report.json"
+REPORT_FORMAT_VERSION = 1
+SLOWEST_COUNT = 20
+
+
+class ProcessMeasurement(NamedTuple):
+    wall_time: float  # seconds
+    user_time: Optional[float]  # seconds of CPU in user mode (None when not measurable)
+    system_time: Optional[float]  # seconds of CPU in kernel mode
+    max_rss: Optional[int]  # peak resident set size in bytes
+    returncode: int
+
+
+def _exit_code(status: int) -> int:
+    """Wait status to return code as in subprocess (negative signal number when killed)."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _read_pipe(pipe: IO, chunks: List) -> None:
+    chunks.append(pipe.read())
+    pipe.close()
+
+
+def run_measured(cmd: List[str], text: bool = False) -> Tuple[subprocess.CompletedProcess, ProcessMeasurement]:
+    """Run ``cmd`` with captured stdout/stderr (like ``subprocess.run``) and measure it."""
+    start = time.monotonic()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text)
+    if not hasattr(os, "wait4"):
+        stdout, stderr = process.communicate()
+        measurement = ProcessMeasurement(time.monotonic() - start, None, None, None, process.returncode)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr), measurement
+
+    # Pipes are drained in threads, the child is reaped with wait4 to get its resource usage
+    stdout_chunks: List = []
+    stderr_chunks: List = []
+    readers = [
+        threading.Thread(target=_read_pipe, args=(process.stdout, stdout_chunks)),
+        threading.Thread(target=_read_pipe, args=(process.stderr, stderr_chunks)),
+    ]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_time = time.monotonic() - start
+    process.returncode = _exit_code(status)
+
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    max_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    measurement = ProcessMeasurement(wall_time, usage.ru_utime, usage.ru_stime, max_rss, process.returncode)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout_chunks[0], stderr_chunks[0]), measurement
+
+
+def wheels_size(wheel_dir: str, wheels: List[str]) -> int:
+    """Total size in bytes of wheels (file names) in wheel_dir; missing files count as 0."""
+    size = 0
+    for wheel in wheels:
+        try:
+            size += os.path.getsize(os.path.join(wheel_dir, wheel))
+        except OSError:
+            continue
+    return size
+
+
+class BuildTelemetry:
+    """Thread-safe collection of process measurements of one script run."""
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        kind: str,
+        label: str,
+        measurement: ProcessMeasurement,
+        wheels: Optional[List[str]] = None,
+        wheel_bytes: int = 0,
+    ) -> None:
+        """Add one measured process; kind is e.g. 'pip wheel', label the requirement or wheel."""
+        with self._lock:
+            self.records.append(
+                {
+                    "kind": kind,
+                    "label": label,
+                    "wall_time": round(measurement.wall_time, 3),
+                    "user_time": None if measurement.user_time is None else round(measurement.user_time, 3),
+                    "system_time": None if measurement.system_time is None else round(measurement.system_time, 3),
+                    "max_rss": measurement.max_rss,
+                    "returncode": measurement.returncode,
+                    "wheels": list(wheels or []),
+                    "wheel_bytes": wheel_bytes,
+                }
+            )
+
+    def add_records(self, records: List[Dict[str, Any]]) -> None:
+        """Add measurements recorded by another process (e.g. a worker of a process pool)."""
+        with self._lock:
+            self.records.extend(records)
+
+    def slowest(self, count: int = SLOWEST_COUNT) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted(self.records, key=lambda record: record["wall_time"], reverse=True)[:count]
+
+    def write_report(self, script: str, path: str = REPORT_FILE) -> None:
+        """Append the measurements of this run to the JSON report (created if missing or unreadable)."""
+        report: Dict[str, Any] = {"format": REPORT_FORMAT_VERSION, "runs": []}
+        try:
+            existing = json.loads(Path(path).read_text())
+            if existing.get("format") == REPORT_FORMAT_VERSION and isinstance(existing.get("runs"), list):
+                report = existing
+        except (OSError, ValueError, AttributeError):
+            pass
+        with self._lock:
+            records = list(self.records)
+        report["runs"].append(
+            {
+                "script": script,
+                "python": platform.python_version(),
+                "platform": sys.platform,
+                "machine": platform.machine(),
+                "finished": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "totals": {
+                    "processes": len(records),
+                    "wall_time": round(sum(r["wall_time"] for r in records), 3),
+                    "cpu_time": round(sum((r["user_time"] or 0) + (r["system_time"] or 0) for r in records), 3),
+                    "wheel_bytes": sum(r["wheel_bytes"] for r in records),
+                },
+                "processes": records,
+            }
+        )
+        Path(path).write_text(json.dumps(report, indent=2))
+
+    def print_slowest(self, count: int = SLOWEST_COUNT) -> None:
+        slowest = self.slowest(count)
+        if not slowest:
+            return
+        print_color(f"---------- SLOWEST {len(slowest)} ----------")
+        print(f"{'wall s':>9} {'cpu s':>9} {'peak RSS MiB':>12} {'rc':>4} {'wheels KiB':>10}  process")
+        for record in slowest:
+            cpu = "-" if record["user_time"] is None else f"{record['user_time'] + (record['system_time'] or 0):.1f}"
+            rss = "-" if record["max_rss"] is None else f"{record['max_rss'] / (1024 * 1024):.0f}"
+            line = (
+                f"{record['wall_time']:9.1f} {cpu:>9} {rss:>12} {record['returncode']:>4} "
+                f"{record['wheel_bytes'] / 1024:10.0f}  {record['kind']} {record['label']}"
+            )
+            if record["returncode"]:
+                print_color(line, Fore.RED)
+            else:
+                print(line)
+        print_color(f"---------- END OF SLOWEST {len(slowest)} ----------")
+
+
+_TELEMETRY = BuildTelemetry()
+
+
+def get_telemetry() -> BuildTelemetry:
+    """Process-wide collection of measurements."""
+    return _TELEMETRY
@@ -3,13 +3,13 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 #
+import argparse
 import json
 import os
 import re
-import subprocess
-import sys
 
 from typing import Dict
+from typing import FrozenSet
 from typing import List
 from typing import Optional
 from typing import Union
@@ -24,12 +24,34 @@ except ImportError:  # Python < 3.11 does not have tomllib built-in module
 from colorama import Fore
 from packaging.requirements import InvalidRequirement
 from packaging.requirements import Requirement
+from packaging.tags import Tag
+from packaging.utils import InvalidWheelFilename
+from packaging.utils import canonicalize_name
+from packaging.utils import parse_wheel_filename
 
 from _helper_functions import filter_requirements_by_pypi_requires_python
+from _helper_functions import get_cache_dir
 from _helper_functions import get_current_platform
 from _helper_functions import get_no_binary_args
 from _helper_functions import merge_requirements
 from _helper_functions import print_color
+from _helper_functions import set_pypi_metadata_cache
+from build_cache import BuildCache
+from build_scheduler import WheelBuildTask
+from build_scheduler import count_results
+from build_scheduler import default_jobs
+from build_scheduler import resolve_build_plan
+from build_scheduler import run_batched_wheel_builds
+from build_scheduler import run_wheel_builds
+from build_telemetry import get_telemetry
+from marker_minimizer import simplify_requirement
+from pypi_metadata_cache import PyPIMetadataCache
+from remote_fetch import HTTPCache
+from remote_fetch import fetch
+from remote_fetch import fetch_many
+from remote_fetch import set_http_cache
+from remote_snapshot import Snapshot
+from remote_snapshot import set_snapshot
 from yaml_list_adapter import YAMLListAdapter
 
 # GLOBAL VARIABLES
@@ -44,6 +66,11 @@ IDF_MASTER_VERSION_URL = f"{IDF_RESOURCES_URL}master/tools/cmake/version.cmake"
 # URL for esptool pyproject.toml file
 ESPTOOL_PYPROJECT_URL = "https://raw.githubusercontent.com/espressif/esptool/master/pyproject.toml"
 
+# Interpreter or ABI tag of a wheel built for one CPython version (cp38, cp311, ...)
+CPYTHON_TAG = re.compile(r"cp\d+")
+# Markers selecting requirements by the Python version
+PYTHON_VERSION_MARKER = re.compile(r"\bpython_(full_)?version\b")
+
 # Minimal IDF release version to take requirements from (v{MAJOR}.{MINOR})
 # Requirements from all release branches and master equal or above this will be considered
 # Specified in Github variables
@@ -75,7 +102,7 @@ def check_response(response: requests.Response, warning: str, exit_on_wrong: boo
 # ESP-IDF branches list
 def fetch_idf_branches() -> List[str]:
     """Fetch IDF branches from URL specified in global variables"""
-    res = requests.get(IDF_BRANCHES_URL, headers=AUTH_HEADER, timeout=10)
+    res = fetch(IDF_BRANCHES_URL, headers=AUTH_HEADER)
     if check_response(res, "Failed to fetch ESP-IDF branches.", True):
         return [branch["name"] for branch in res.json()]
     return []
@@ -104,7 +131,7 @@ def get_used_idf_branches(idf_repo_branches: List[str]) -> List[str]:
 # Constraints files versions list
 def _idf_version_from_cmake() -> Optional[dict]:
     """Get IDF master branch version from version.cmake"""
-    res = requests.get(IDF_MASTER_VERSION_URL, headers=AUTH_HEADER, timeout=10)
+    res = fetch(IDF_MASTER_VERSION_URL, headers=AUTH_HEADER)
     if check_response(res, "Failed to get master version of IDF from CMAKE."):
         regex = re.compile(r"^\s*set\s*\(\s*IDF_VERSION_([A-Z]{5})\s+(\d+)")
         lines = res.text.splitlines()
@@ -147,15 +174,26 @@ def get_constraints_versions(idf_branches: List[str]) -> List[str]:
 
 
 # --- Download all requirements from all the branches requirements and constraints files --- #
-def _download_branch_requirements(branch: str, idf_requirements_json: dict) -> List[str]:
-    """Download requirements files for all groups specified in IDF requirements.JSON"""
+def _feature_urls(branch: str, idf_requirements_json: dict) -> List[str]:
+    """URLs of requirements files for all groups specified in IDF requirements.JSON"""
+    return [
+        f"{IDF_RESOURCES_URL}{branch}/{feature['requirement_path']}" for feature in idf_requirements_json["features"]
+    ]
+
+
+def _download_branch_requirements(
+    branch: str, idf_requirements_json: dict, responses: Optional[List[requests.Response]] = None
+) -> List[str]:
+    """Download requirements files for all groups specified in IDF requirements.JSON
+    - responses - already fetched responses of the feature files (in order of features)
+    """
     print_color(f"---------- ESP-IDF BRANCH {branch} ----------")
     requirements_txt: List[str] = []
 
-    for feature in idf_requirements_json["features"]:
-        res = requests.get(
-            f"{IDF_RESOURCES_URL}{branch}/{feature['requirement_path']}", headers=AUTH_HEADER, timeout=10
-        )
+    if responses is None:
+        responses = fetch_many(_feature_urls(branch, idf_requirements_json), headers=AUTH_HEADER)
+
+    for feature, res in zip(idf_requirements_json["features"], responses):
         if check_response(res, f"Failed to download feature (requirement group) '{feature['name']}'"):
             requirements_txt += res.text.splitlines()
             print(f"Added ESP-IDF {feature['name']} requirements")
@@ -163,10 +201,11 @@ def _download_branch_requirements(branch: str, idf_requirements_json: dict) -> L
     return requirements_txt
 
 
-def _download_esptool_requirements() -> List[str]:
+def _download_esptool_requirements(res: Optional[requests.Response] = None) -> List[str]:
     """Download esptool requirements from pyproject.toml file"""
     requirements_txt: List[str] = []
-    res = requests.get(ESPTOOL_PYPROJECT_URL, headers=AUTH_HEADER, timeout=10)
+    if res is None:
+        res = fetch(ESPTOOL_PYPROJECT_URL, headers=AUTH_HEADER)
     if check_response(res, "Failed to download esptool pyproject.toml file"):
         pyproject_content = tomllib.loads(res.text)
         esptool_deps = pyproject_content.get("project", {}).get("dependencies", [])
@@ -175,9 +214,12 @@ def _download_esptool_requirements() -> List[str]:
     return requirements_txt
 
 
-def _download_branch_constraints(constraint_file_url: str, branch, idf_constraint: str) -> List[str]:
+def _download_branch_constraints(
+    constraint_file_url: str, branch, idf_constraint: str, res: Optional[requests.Response] = None
+) -> List[str]:
     """Download constraints file for specific branch"""
-    res = requests.get(constraint_file_url, headers=AUTH_HEADER, timeout=10)
+    if res is None:
+        res = fetch(constraint_file_url, headers=AUTH_HEADER)
     if check_response(res, f"Failed to download ESP-IDF constraints file {idf_constraint} for branch {branch}"):
         requirements_txt = res.text.splitlines()
         print(f"Added ESP-IDF constraints file {idf_constraint} for branch {branch}")
@@ -209,20 +251,41 @@ def assemble_requirements(idf_branches: List[str], idf_constraints: List[str], m
     """Assemble IDF requirements into set to prevent duplicates"""
     requirements_txt: List[str] = []
 
-    for i, branch in enumerate(idf_branches):
-        idf_requirements_json_url = f"{IDF_RESOURCES_URL}{branch}/tools/requirements.json"
-        constraint_file_url = f"https://dl.espressif.com/dl/esp-idf/espidf.constraints.{idf_constraints[i]}.txt"
-
-        res = requests.get(idf_requirements_json_url, headers=AUTH_HEADER, timeout=10)
+    # All files are fetched concurrently in two rounds (the feature files are listed in requirements.json),
+    # the requirement lines are then assembled in the order of branches and features as before
+    json_urls = [f"{IDF_RESOURCES_URL}{branch}/tools/requirements.json" for branch in idf_branches]
+    constraint_urls = [f"{IDF_CONSTRAINTS_URL}{idf_constraint}.txt" for idf_constraint in idf_constraints]
+    responses = fetch_many(json_urls + constraint_urls + [ESPTOOL_PYPROJECT_URL], headers=AUTH_HEADER)
+    json_responses = responses[: len(json_urls)]
+    constraint_responses = responses[len(json_urls) : len(json_urls) + len(constraint_urls)]
+    esptool_response = responses[-1]
+
+    idf_requirements_jsons: List[Optional[dict]] = []
+    for branch, res in zip(idf_branches, json_responses):
         if not check_response(res, f"\nFailed to download requirements JSON for branch {branch}"):
+            idf_requirements_jsons.append(None)
             continue
+        idf_requirements_jsons.append(json.loads(res.content))
 
-        idf_requirements_json = json.loads(res.content)
+    feature_urls = [
+        _feature_urls(branch, idf_requirements_json) if idf_requirements_json is not None else []
+        for branch, idf_requirements_json in zip(idf_branches, idf_requirements_jsons)
+    ]
+    feature_responses = fetch_many([url for urls in feature_urls for url in urls], headers=AUTH_HEADER)
+
+    for i, branch in enumerate(idf_branches):
+        branch_feature_responses = feature_responses[: len(feature_urls[i])]
+        feature_responses = feature_responses[len(feature_urls[i]) :]
+        idf_requirements_json = idf_requirements_jsons[i]
+        if idf_requirements_json is None:
+            continue
 
-        requirements_txt += _download_branch_requirements(branch, idf_requirements_json)
-        requirements_txt += _download_branch_constraints(constraint_file_url, branch, idf_constraints[i])
+        requirements_txt += _download_branch_requirements(branch, idf_requirements_json, branch_feature_responses)
+        requirements_txt += _download_branch_constraints(
+            constraint_urls[i], branch, idf_constraints[i], constraint_responses[i]
+        )
 
-    requirements_txt += _download_esptool_requirements()
+    requirements_txt += _download_esptool_requirements(esptool_response)
 
     if make_txt_file:
         # TXT file from all downloaded requirements and constraints files
@@ -233,47 +296,51 @@ def assemble_requirements(idf_branches: List[str], idf_constraints: List[str], m
     return _add_into_requirements(requirements_txt)
 
 
+def index_exclude_list(exclude_list: set) -> Dict[str, List[Requirement]]:
+    """Exclude rules grouped by canonical package name (in iteration order of exclude_list)"""
+    rules_by_name: Dict[str, List[Requirement]] = {}
+    for req_to_exclude in exclude_list:
+        rules_by_name.setdefault(canonicalize_name(req_to_exclude.name), []).append(req_to_exclude)
+    return rules_by_name
+
+
 def exclude_from_requirements(assembled_requirements: set, exclude_list: set, print_requirements: bool = True) -> set:
     """Exclude packages defined in exclude_list from assembled requirements
     - print_requirements = true will print the changes
     """
-    from packaging.utils import canonicalize_name
+    # Use canonical name comparison to handle dots vs underscores (ruamel.yaml.clib vs ruamel_yaml_clib)
+    rules_by_name = index_exclude_list(exclude_list)
 
     new_assembled_requirements = set()
-    not_in_exclude = []
     if print_requirements:
         print_color("---------- REQUIREMENTS ----------")
 
     for requirement in assembled_requirements:
-        printed = False
-        for req_to_exclude in exclude_list:
-            # Use canonical name comparison to handle dots vs underscores (ruamel.yaml.clib vs ruamel_yaml_clib)
-            if canonicalize_name(req_to_exclude.name) != canonicalize_name(requirement.name):
-                not_in_exclude.append(True)
-            else:
-                if not req_to_exclude.specifier and not req_to_exclude.marker:
-                    # Delete requirement
-                    if print_requirements:
-                        print_color(f"-- {requirement}", Fore.RED)
-                    continue
-
-                # Merge requirement and requirement_from_exclude list
-                new_requirement = merge_requirements(requirement, req_to_exclude)
-                new_assembled_requirements.add(new_requirement)
-
-                if print_requirements:
-                    if not printed:
-                        print_color(f"-- {requirement}", Fore.RED)
-                        printed = True
-                    print_color(f"++ {new_requirement}", Fore.GREEN)
-
-        # Add back unchanged requirement
-        if len(not_in_exclude) == len(exclude_list):
+        rules = rules_by_name.get(canonicalize_name(requirement.name))
+        if not rules:
+            # Add back unchanged requirement
             if print_requirements:
                 print(str(requirement))
             new_assembled_requirements.add(requirement)
+            continue
+
+        printed = False
+        for req_to_exclude in rules:
+            if not req_to_exclude.specifier and not req_to_exclude.marker:
+                # Delete requirement
+                if print_requirements:
+                    print_color(f"-- {requirement}", Fore.RED)
+                continue
+
+            # Merge requirement and requirement_from_exclude list
+            new_requirement = simplify_requirement(merge_requirements(requirement, req_to_exclude))
+            new_assembled_requirements.add(new_requirement)
 
-        not_in_exclude.clear()
+            if print_requirements:
+                if not printed:
+                    print_color(f"-- {requirement}", Fore.RED)
+                    printed = True
+                print_color(f"++ {new_requirement}", Fore.GREEN)
 
     if print_requirements:
         print_color("---------- END OF REQUIREMENTS ----------")
@@ -282,15 +349,45 @@ def exclude_from_requirements(assembled_requirements: set, exclude_list: set, pr
 
 
 # --- Build wheels ---
-def build_wheels(requirements: set, local_links: bool = True) -> dict:
+def _pip_wheel_args(requirement: Requirement, wheel_dir: str) -> List[str]:
+    """Common ``pip wheel`` arguments for one requirement (``--wheel-dir`` is added by the build engine)"""
+    return [
+        f"{requirement}",
+        "--find-links",
+        f"{wheel_dir}",
+        "--find-links",
+        "https://pypi.org/simple/",
+        "--no-cache-dir",
+        "--no-build-isolation",
+    ]
+
+
+def build_wheels(
+    requirements: set,
+    local_links: bool = True,
+    jobs: Optional[int] = None,
+    plan_dependencies: bool = False,
+    cache: Optional[BuildCache] = None,
+    batch: bool = False,
+) -> dict:
     """Build Python wheels
     - 'failed' - failed wheels counter
     - 'succeeded' - succeeded wheels counter
+    - jobs - number of parallel pip builds (default: number of CPU cores)
+    - plan_dependencies - resolve the dependency graph first and build shared dependencies once, leaves first
+    - cache - build cache for resolved requirements (requires plan_dependencies)
+    - batch - one ``pip wheel -r`` per group of requirements with equal arguments, failing batches are bisected
+      (pip resolves the batch itself, so plan_dependencies and cache are not used)
     """
-    failed_wheels = 0
-    succeeded_wheels = 0
-
     dir = f"{os.path.curdir}{(os.sep)}downloaded_wheels"
+
+    def _dependency_task(name: str, version: str) -> WheelBuildTask:
+        dependency = Requirement(f"{name}=={version}")
+        return WheelBuildTask(
+            str(dependency), _pip_wheel_args(dependency, dir) + ["--no-deps"] + get_no_binary_args(name), tracked=False
+        )
+
+    tasks: List[WheelBuildTask] = []
     for requirement in requirements:
         # non classic requirement wheel build
         if non_classic_requirement:
@@ -300,109 +397,147 @@ def build_wheels(requirements: set, local_links: bool = True) -> dict:
                 argument = match.group(1).strip()
                 arg_param = match.group(2).strip()
             if arg_param in requirement.name:
-                out = subprocess.run(
-                    [
-                        f"{sys.executable}",
-                        "-m",
-                        "pip",
-                        "wheel",
-                        f"{requirement}",
-                        "--find-links",
-                        f"{dir}",
-                        "--find-links",
-                        "https://pypi.org/simple/",
-                        "--wheel-dir",
-                        f"{dir}",
-                        "--no-cache-dir",
-                        "--no-build-isolation",
-                        f"{argument}",
-                        f"{arg_param}",
-                    ],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
+                # not counted into statistics (same as sequential build)
+                tasks.append(
+                    WheelBuildTask(
+                        str(requirement),
+                        _pip_wheel_args(requirement, dir) + [f"{argument}", f"{arg_param}"],
+                        tracked=False,
+                    )
                 )
-                print(out.stdout.decode("utf-8", errors="replace"))
-                if out.stderr:
-                    print_color(out.stderr.decode("utf-8", errors="replace"), Fore.RED)
                 non_classic_requirement.remove(non_classic_requirement[0])
                 continue
 
         # requirement wheel build
         # Get no-binary args for packages that should be built from source
         no_binary_args = get_no_binary_args(requirement.name)
+        tasks.append(WheelBuildTask(str(requirement), _pip_wheel_args(requirement, dir) + no_binary_args))
 
-        out = subprocess.run(
-            [
-                f"{sys.executable}",
-                "-m",
-                "pip",
-                "wheel",
-                f"{requirement}",
-                "--find-links",
-                f"{dir}",
-                "--find-links",
-                "https://pypi.org/simple/",
-                "--wheel-dir",
-                f"{dir}",
-                "--no-cache-dir",
-                "--no-build-isolation",
-            ]
-            + no_binary_args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+    if batch:
+        return count_results(run_batched_wheel_builds(tasks, dir, jobs))
 
-        print(out.stdout.decode("utf-8", errors="replace"))
-        if out.stderr:
-            print_color(out.stderr.decode("utf-8", errors="replace"), Fore.RED)
+    if plan_dependencies:
+        tasks = resolve_build_plan(tasks, _dependency_task, jobs)
 
-        if out.returncode != 0:
-            failed_wheels += 1
-        else:
-            succeeded_wheels += 1
+    results = run_wheel_builds(tasks, dir, jobs, cache)
+    return count_results(results)
 
-    return {"failed": failed_wheels, "succeeded": succeeded_wheels}
 
+def _is_python_dependent_wheel(wheel_tags: FrozenSet[Tag]) -> bool:
+    """Wheel built for a specific CPython version (cpXY interpreter or ABI tag, including abi3 wheels)"""
+    return any(CPYTHON_TAG.fullmatch(tag.interpreter) or CPYTHON_TAG.fullmatch(tag.abi) for tag in wheel_tags)
 
-def get_python_dependent_wheels(wheel_dir: str, requirements: set) -> set:
-    """Get Python dependent requirements from downloaded wheel directory"""
-    dependent_wheels_set = set()
-    dependent_requirements_set = set()
 
-    file_names = os.listdir(wheel_dir)
+def get_python_dependent_wheels_with_reasons(wheel_dir: str, requirements: set) -> Dict[Requirement, str]:
+    """Get Python dependent requirements from downloaded wheel directory, with the reason of every requirement
+    - requirements naming a CPython-specific wheel are taken as they are
+    - other CPython-specific wheels (dependencies) are pinned to the built version
+    - requirements with a python_version marker are taken when any wheel is CPython-specific
+    """
+    requirements_by_name: Dict[str, List[Requirement]] = {}
+    for requirement in requirements:
+        requirements_by_name.setdefault(canonicalize_name(requirement.name), []).append(requirement)
 
-    # find dependent wheels in wheel directory
-    for wheel in file_names:
-        pattern = re.compile(r"([^ -]*)-(\d+(\.\d+)*).*?(cp\d+)")
-        match = pattern.search(wheel)
-        if match is not None:
-            wheel_name = match.group(1)
-            wheel_version = match.group(2)
-            build = match.group(3)
+    dependent: Dict[Requirement, str] = {}
+    # sorted for stable reasons when several wheels lead to the same requirement
+    for wheel in sorted(os.listdir(wheel_dir)):
+        if not wheel.endswith(".whl"):
+            continue
+        try:
+            name, version, _, wheel_tags = parse_wheel_filename(wheel)
+        except InvalidWheelFilename:
+            continue
+        if not _is_python_dependent_wheel(wheel_tags):
+            continue
 
-            dependent_wheels_set.add((wheel_name, wheel_version, build))
+        named_requirements = requirements_by_name.get(name)
+        if named_requirements:
+            for requirement in named_requirements:
+                dependent.setdefault(requirement, f"CPython-specific wheel {wheel}")
+        else:
+            # downloaded and already built requirements (all dependencies)
+            dependent.setdefault(Requirement(f"{name}=={version}"), f"CPython-specific dependency wheel {wheel}")
 
-    # find dependent wheel in requirements
-    for name, version, _ in dependent_wheels_set:
+    if dependent:
+        # python version specific requirements from all branches
         for requirement in requirements:
-            if requirement.marker:
-                if "python_version" in str(requirement.marker):
-                    # add python version specific requirements from all branches
-                    dependent_requirements_set.add(requirement)
+            if requirement.marker and PYTHON_VERSION_MARKER.search(str(requirement.marker)):
+                dependent.setdefault(requirement, f"python version marker '{requirement.marker}'")
+
+    return dependent
 
-            if name.lower() == requirement.name.lower():
-                # add requirements with markers
-                dependent_requirements_set.add(requirement)
-            else:
-                # add downloaded and already built requirements (all dependencies)
-                dependent_requirements_set.add(Requirement(f"{name}=={version}"))
 
-    return dependent_requirements_set
+def get_python_dependent_wheels(wheel_dir: str, requirements: set) -> set:
+    """Get Python dependent requirements from downloaded wheel directory"""
+    return set(get_python_dependent_wheels_with_reasons(wheel_dir, requirements))
 
 
-def main() -> int:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build Python wheels for ESP-IDF requirements.")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=default_jobs(),
+        help="number of wheels built in parallel (default: number of CPU cores)",
+    )
+    parser.add_argument(
+        "--no-dependency-plan",
+        action="store_true",
+        help="do not resolve the dependency graph before building (shared dependencies are built by every user)",
+    )
+    parser.add_argument(
+        "--no-build-cache",
+        action="store_true",
+        help="do not restore wheels from or store wheels into the persistent build cache",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="build requirements with one 'pip wheel -r' per group and bisect failing groups",
+    )
+    parser.add_argument(
+        "--no-http-cache",
+        action="store_true",
+        help="download all remote inputs unconditionally (no ETag/Last-Modified revalidation)",
+    )
+    parser.add_argument(
+        "--no-pypi-cache",
+        action="store_true",
+        help="query PyPI for every preflight lookup (do not use the persistent PyPI metadata cache)",
+    )
+    snapshot = parser.add_mutually_exclusive_group()
+    snapshot.add_argument(
+        "--record",
+        metavar="SNAPSHOT",
+        help="record all remote inputs (IDF and esptool files, PyPI JSON) into a snapshot tar file",
+    )
+    snapshot.add_argument(
+        "--replay",
+        metavar="SNAPSHOT",
+        help="serve all remote inputs from a snapshot tar file recorded with --record (no network access)",
+    )
+    parser.add_argument(
+        "--skip-build",
+        action="store_true",
+        help="stop after the requirement assembly and the PyPI preflight, do not build any wheel",
+    )
+    return parser.parse_args(argv)
+
+
+def run(args: argparse.Namespace) -> int:
     """Builds Python wheels for ESP-IDF dependencies for master and release branches
     grater or equal to specified"""
+    # replayed inputs never reach the network, no need to revalidate them
+    http_cache = None if args.no_http_cache or args.replay else HTTPCache(get_cache_dir("http"))
+    set_http_cache(http_cache)
+    # a snapshot has to capture (or serve) every PyPI lookup, so the metadata cache is not used with it
+    pypi_cache = (
+        None
+        if args.no_pypi_cache or args.replay or args.record
+        else PyPIMetadataCache(get_cache_dir("pypi") / "metadata.sqlite3")
+    )
+    set_pypi_metadata_cache(pypi_cache)
 
     idf_repo_branches = fetch_idf_branches()
     idf_branches = get_used_idf_branches(idf_repo_branches)
@@ -413,6 +548,12 @@ def main() -> int:
 
     requirements = assemble_requirements(idf_branches, idf_constraints, True)
 
+    if http_cache is not None:
+        print(
+            f"HTTP cache: {http_cache.stats.not_modified} not modified (304), "
+            f"{http_cache.stats.downloaded} downloaded, {http_cache.stats.uncached} without validators"
+        )
+
     exclude_list = YAMLListAdapter(
         "exclude_list.yaml", exclude=True, current_platform=get_current_platform()
     ).requirements
@@ -427,27 +568,55 @@ def main() -> int:
         print(req)
     print_color("---------- END OF ADDITIONAL REQUIREMENTS ----------")
 
+    if pypi_cache is not None:
+        print(f"PyPI metadata cache: {pypi_cache.hits} hits, {pypi_cache.misses} misses")
+        pypi_cache.evict()
+
+    if args.skip_build:
+        return 0
+
+    build_cache = None if args.no_build_cache else BuildCache()
+    plan_dependencies = not args.no_dependency_plan
+
     print_color("---------- BUILD ADDITIONAL WHEELS ----------")
-    additional_whl = build_wheels(include_list)
+    additional_whl = build_wheels(
+        include_list, jobs=args.jobs, plan_dependencies=plan_dependencies, cache=build_cache, batch=args.batch
+    )
     failed_wheels = additional_whl["failed"]
     succeeded_wheels = additional_whl["succeeded"]
 
     print_color("---------- BUILD WHEELS ----------")
-    standard_whl = build_wheels(after_exclude_requirements)
+    standard_whl = build_wheels(
+        after_exclude_requirements,
+        jobs=args.jobs,
+        plan_dependencies=plan_dependencies,
+        cache=build_cache,
+        batch=args.batch,
+    )
     failed_wheels += standard_whl["failed"]
     succeeded_wheels += standard_whl["succeeded"]
 
+    if build_cache is not None:
+        build_cache.evict()
+        build_cache.print_stats()
+
     print_color("---------- STATISTICS ----------")
     print_color(f"Succeeded {succeeded_wheels} wheels", Fore.GREEN)
     print_color(f"Failed {failed_wheels} wheels", Fore.RED)
 
+    get_telemetry().print_slowest()
+    get_telemetry().write_report("build_wheels.py")
+
     if failed_wheels != 0:
         raise SystemExit("One or more wheels failed to build")
 
     print_color("---------- PYTHON VERSION DEPENDENT ----------")
-    dependent_wheels = get_python_dependent_wheels(
+    dependent_reasons = get_python_dependent_wheels_with_reasons(
         f"{os.path.curdir}{(os.sep)}downloaded_wheels", after_exclude_requirements
     )
+    for wheel, reason in sorted(dependent_reasons.items(), key=lambda item: str(item[0])):
+        print(f"{wheel} ({reason})")
+    dependent_wheels = set(dependent_reasons)
     after_exclude_dependent_wheels = exclude_from_requirements(dependent_wheels, exclude_list)
     after_exclude_dependent_wheels = filter_requirements_by_pypi_requires_python(after_exclude_dependent_wheels)
 
@@ -458,5 +627,25 @@ def main() -> int:
     return 0
 
 
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    snapshot: Optional[Snapshot] = None
+    if args.replay:
+        snapshot = Snapshot.load(args.replay)
+        print(f"Replaying remote inputs from snapshot {args.replay} ({len(snapshot.entries)} responses)")
+    elif args.record:
+        snapshot = Snapshot()
+    set_snapshot(snapshot)
+
+    try:
+        return run(args)
+    finally:
+        set_snapshot(None)
+        if args.record and snapshot is not None:
+            snapshot.save(args.record)
+            print(f"Recorded {len(snapshot.entries)} responses of remote inputs into snapshot {args.record}")
+
+
 if __name__ == "__main__":
     main()
@@ -8,17 +8,24 @@ from __future__ import annotations
 import argparse
 import os
 import platform
-import subprocess
-import sys
 
 from colorama import Fore
 from packaging.requirements import InvalidRequirement
 from packaging.requirements import Requirement
 from packaging.utils import canonicalize_name
 
+from _helper_functions import get_cache_dir
 from _helper_functions import get_no_binary_args
 from _helper_functions import print_color
-from _helper_functions import pypi_requires_python_preflight_skip
+from _helper_functions import pypi_requires_python_preflight
+from _helper_functions import set_pypi_metadata_cache
+from build_scheduler import WheelBuildTask
+from build_scheduler import count_results
+from build_scheduler import default_jobs
+from build_scheduler import run_batched_wheel_builds
+from build_scheduler import run_wheel_builds
+from build_telemetry import get_telemetry
+from pypi_metadata_cache import PyPIMetadataCache
 
 # Do not pass --no-binary for these in --force-interpreter-binary mode:
 # - sdists whose legacy setup breaks under PEP 517 isolation (pkg_resources in isolated env).
@@ -63,16 +70,22 @@ def _apply_force_interpreter_binary(cli_flag: bool) -> bool:
     return cli_flag and platform.system() != "Windows"
 
 
-def _pypi_preflight_skip_line(requirement_line: str) -> bool:
-    """Print and return True if this line should be skipped (PyPI Requires-Python)."""
-    try:
-        req = Requirement(requirement_line)
-    except InvalidRequirement:
-        return False
-    skip, reason = pypi_requires_python_preflight_skip(req)
-    if skip:
-        print_color(f"-- skip {requirement_line} ({reason})", Fore.YELLOW)
-    return skip
+def _pypi_preflight_skipped_lines(requirement_lines: list[str]) -> set[str]:
+    """Print and return the lines which should be skipped (PyPI Requires-Python), checked concurrently."""
+    parsed: dict[str, Requirement] = {}
+    for line in requirement_lines:
+        try:
+            parsed[line] = Requirement(line)
+        except InvalidRequirement:
+            continue
+    results = pypi_requires_python_preflight(list(dict.fromkeys(parsed.values())))
+    skipped: set[str] = set()
+    for line, req in parsed.items():
+        skip, reason = results[req]
+        if skip:
+            print_color(f"-- skip {line} ({reason})", Fore.YELLOW)
+            skipped.add(line)
+    return skipped
 
 
 parser = argparse.ArgumentParser(description="Process build arguments.")
@@ -108,15 +121,33 @@ parser.add_argument(
         "Some packages are always skipped (e.g. cryptography, pydantic-core, protobuf, PyObjC, ruamel.yaml.clib)."
     ),
 )
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=default_jobs(),
+    help="number of wheels built in parallel (default: number of CPU cores)",
+)
+parser.add_argument(
+    "--batch",
+    action="store_true",
+    help="build requirements with one 'pip wheel -r' per group of equal arguments and bisect failing groups",
+)
+parser.add_argument(
+    "--no-pypi-cache",
+    action="store_true",
+    help="query PyPI for every preflight lookup (do not use the persistent PyPI metadata cache)",
+)
 
 args = parser.parse_args()
 
+pypi_cache = None if args.no_pypi_cache else PyPIMetadataCache(get_cache_dir("pypi") / "metadata.sqlite3")
+set_pypi_metadata_cache(pypi_cache)
+
 
 requirements_dir = args.requirements_path
 in_requirements = args.requirements
 
-failed_wheels = 0
-succeeded_wheels = 0
 skipped_wheels = 0
 
 # Build wheels for requirements in file
@@ -126,110 +157,54 @@ if requirements_dir:
             requirements = f.readlines()
     except FileNotFoundError as e:
         raise SystemExit(f"Python version dependent requirements directory or file not found ({e})")
-
-    for requirement in requirements:
-        requirement = requirement.strip()
-        if not requirement or requirement.startswith("#"):
-            continue
-        if _pypi_preflight_skip_line(requirement):
-            skipped_wheels += 1
-            continue
-        # Get no-binary args for packages that should be built from source
-        no_binary_args = get_no_binary_args(requirement)
-        force_interpreter_args = (
-            _force_interpreter_no_binary_args(requirement)
-            if _apply_force_interpreter_binary(args.force_interpreter_binary)
-            else []
-        )
-
-        out = subprocess.run(
-            [
-                f"{sys.executable}",
-                "-m",
-                "pip",
-                "wheel",
-                requirement,
-                "--find-links",
-                "downloaded_wheels",
-                "--wheel-dir",
-                "downloaded_wheels",
-            ]
-            + no_binary_args
-            + force_interpreter_args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-
-        print(out.stdout.decode("utf-8", errors="replace"))
-        if out.stderr:
-            print_color(out.stderr.decode("utf-8", errors="replace"), Fore.RED)
-
-        if out.returncode != 0:
-            failed_wheels += 1
-        else:
-            succeeded_wheels += 1
-
-    print_color("---------- STATISTICS ----------")
-    print_color(f"Succeeded {succeeded_wheels} wheels", Fore.GREEN)
-    print_color(f"Failed {failed_wheels} wheels", Fore.RED)
-    if skipped_wheels:
-        print_color(f"Skipped {skipped_wheels} wheels (PyPI Requires-Python)", Fore.YELLOW)
-
-    if args.ci_tests:
-        if succeeded_wheels > 0 and failed_wheels == 0:
-            raise SystemExit("CI: expected some builds to fail (excluded packages)")
-    elif failed_wheels != 0:
-        raise SystemExit("One or more wheels failed to build")
-
 # Build wheels from passed requirements
 else:
-    for requirement in in_requirements:
-        if _pypi_preflight_skip_line(requirement):
-            skipped_wheels += 1
-            continue
-        # Get no-binary args for packages that should be built from source
-        no_binary_args = get_no_binary_args(requirement)
-        force_interpreter_args = (
-            _force_interpreter_no_binary_args(requirement)
-            if _apply_force_interpreter_binary(args.force_interpreter_binary)
-            else []
+    requirements = in_requirements or []
+
+requirement_lines = [line.strip() for line in requirements if line.strip() and not line.strip().startswith("#")]
+skipped_lines = _pypi_preflight_skipped_lines(requirement_lines)
+
+tasks: list[WheelBuildTask] = []
+for requirement in requirement_lines:
+    if requirement in skipped_lines:
+        skipped_wheels += 1
+        continue
+    # Get no-binary args for packages that should be built from source
+    no_binary_args = get_no_binary_args(requirement)
+    force_interpreter_args = (
+        _force_interpreter_no_binary_args(requirement)
+        if _apply_force_interpreter_binary(args.force_interpreter_binary)
+        else []
+    )
+    tasks.append(
+        WheelBuildTask(
+            requirement,
+            [requirement, "--find-links", "downloaded_wheels"] + no_binary_args + force_interpreter_args,
         )
+    )
 
-        out = subprocess.run(
-            [
-                f"{sys.executable}",
-                "-m",
-                "pip",
-                "wheel",
-                f"{requirement}",
-                "--find-links",
-                "downloaded_wheels",
-                "--wheel-dir",
-                "downloaded_wheels",
-            ]
-            + no_binary_args
-            + force_interpreter_args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+if pypi_cache is not None:
+    print(f"PyPI metadata cache: {pypi_cache.hits} hits, {pypi_cache.misses} misses")
+    pypi_cache.evict()
 
-        print(out.stdout.decode("utf-8", errors="replace"))
-        if out.stderr:
-            print_color(out.stderr.decode("utf-8", errors="replace"), Fore.RED)
-
-        if out.returncode != 0:
-            failed_wheels += 1
-        else:
-            succeeded_wheels += 1
-
-    print_color("---------- STATISTICS ----------")
-    print_color(f"Succeeded {succeeded_wheels} wheels", Fore.GREEN)
-    print_color(f"Failed {failed_wheels} wheels", Fore.RED)
-    if skipped_wheels:
-        print_color(f"Skipped {skipped_wheels} wheels (PyPI Requires-Python)", Fore.YELLOW)
-
-    if args.ci_tests:
-        if succeeded_wheels > 0 and failed_wheels == 0:
-            raise SystemExit("CI: expected some builds to fail (excluded packages)")
-    elif failed_wheels != 0:
-        raise SystemExit("One or more wheels failed to build")
+if args.batch:
+    statistics = count_results(run_batched_wheel_builds(tasks, "downloaded_wheels", args.jobs))
+else:
+    statistics = count_results(run_wheel_builds(tasks, "downloaded_wheels", args.jobs))
+failed_wheels = statistics["failed"]
+succeeded_wheels = statistics["succeeded"]
+
+print_color("---------- STATISTICS ----------")
+print_color(f"Succeeded {succeeded_wheels} wheels", Fore.GREEN)
+print_color(f"Failed {failed_wheels} wheels", Fore.RED)
+if skipped_wheels:
+    print_color(f"Skipped {skipped_wheels} wheels (PyPI Requires-Python)", Fore.YELLOW)
+
+get_telemetry().print_slowest()
+get_telemetry().write_report("build_wheels_from_file.py")
+
+if args.ci_tests:
+    if succeeded_wheels > 0 and failed_wheels == 0:
+        raise SystemExit("CI: expected some builds to fail (excluded packages)")
+elif failed_wheels != 0:
+    raise SystemExit("One or more wheels failed to build")
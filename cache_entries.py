@@ -0,0 +1,77 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Content-addressed cache entries with least recently used eviction (build_cache.py, repair_cache.py).
+
+An entry is the directory ``<key[:2]>/<key>`` holding the cached files and ``entry.json`` which describes them
+(with their ``size``). The modification time of ``entry.json`` is the last use of the entry. When the entries
+exceed the size cap, the least recently used ones are removed first.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+
+from pathlib import Path
+from typing import List
+from typing import Tuple
+
+ENTRY_FILE = "entry.json"
+
+
+class EntryCache:
+    """Directory of content-addressed entries capped to ``max_size`` bytes (see module docstring)."""
+
+    def __init__(self, directory: Path, max_size: int) -> None:
+        self.directory = directory
+        self.max_size = max_size
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _read_entry(self, key: str) -> dict:
+        """Description of the entry ``key``; raises OSError or ValueError when there is no (complete) entry."""
+        entry: dict = json.loads((self._entry_dir(key) / ENTRY_FILE).read_text())
+        return entry
+
+    def _mark_used(self, key: str) -> None:
+        """LRU: modification time of the entry file is the last use."""
+        os.utime(self._entry_dir(key) / ENTRY_FILE)
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """(last use, size, entry directory) of all entries"""
+        entries = []
+        for entry_file in self.directory.glob(f"*/*/{ENTRY_FILE}"):
+            try:
+                size = int(json.loads(entry_file.read_text()).get("size", 0))
+                entries.append((entry_file.stat().st_mtime, size, entry_file.parent))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits into max_size; returns their number."""
+        entries = sorted(self._entries(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry_dir in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Hardlink a cached file to ``target`` (replaced when it exists), copy it on another file system."""
+    if target.exists():
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
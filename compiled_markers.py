@@ -0,0 +1,211 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Compiled environment markers of the exclude rules.
+
+Checking wheels against exclude_list.yaml (``should_exclude_wheel`` at install time, ``should_exclude_wheel_s3``
+for the whole bucket) evaluates the same few markers for every wheel, platform and Python version. A compiled
+marker knows the variables it references (``sys_platform``, ``python_version``, ...) and memoizes its result per
+values of those variables, so each distinct combination is evaluated by packaging only once.
+
+``ExcludeRules`` indexes the rules by canonical package name and compiles their markers once per rule list.
+
+``DecisionTable`` goes one step further: the rule markers of exclude_list.yaml only use ``sys_platform`` and
+``python_version`` (the YAML ``platform`` architectures map to ``sys_platform``, architecture specific rules are
+selected when the list is loaded), so for each package the rules which apply can be tabulated over the finite
+grid of platforms x supported Python versions. Checking a wheel is then a table lookup plus the version
+specifier check, without any marker evaluation.
+"""
+
+from __future__ import annotations
+
+import threading
+
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from packaging.markers import Marker
+from packaging.requirements import Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+
+# sys_platform values of the YAML platforms (win32, linux, darwin)
+SYS_PLATFORMS = ("linux", "win32", "darwin")
+# marker variables a DecisionTable can tabulate
+GRID_VARIABLES = frozenset({"sys_platform", "python_version"})
+
+# value of a variable which is not given in the environment (the default environment of the interpreter is used)
+_DEFAULT = None
+
+
+def _marker_variables(markers: list) -> FrozenSet[str]:
+    """Names of the variables in a parsed marker (nested lists of ``(lhs, op, rhs)`` tuples and 'and'/'or')."""
+    variables: Set[str] = set()
+    for item in markers:
+        if isinstance(item, list):
+            variables |= _marker_variables(item)
+        elif isinstance(item, tuple):
+            variables.update(side.value for side in (item[0], item[2]) if type(side).__name__ == "Variable")
+    return frozenset(variables)
+
+
+class CompiledMarker:
+    """Marker with the variables it references and memoized results of its evaluation."""
+
+    def __init__(self, marker: Marker) -> None:
+        self.marker = marker
+        self.variables: Tuple[str, ...] = tuple(sorted(_marker_variables(marker._markers)))
+        self._results: Dict[Tuple[Optional[str], ...], bool] = {}
+
+    def references(self, variable: str) -> bool:
+        return variable in self.variables
+
+    def evaluate(self, environment: Optional[Dict[str, str]] = None) -> bool:
+        """Same as ``Marker.evaluate``; only the referenced variables of ``environment`` make the cache key."""
+        environment = environment or {}
+        key = tuple(environment.get(variable, _DEFAULT) for variable in self.variables)
+        result = self._results.get(key)
+        if result is None:
+            result = self.marker.evaluate(environment=environment or None)
+            self._results[key] = result
+        return result
+
+
+_COMPILED: Dict[str, CompiledMarker] = {}
+_COMPILED_LOCK = threading.Lock()
+
+
+def compile_marker(marker: Marker) -> CompiledMarker:
+    """Compiled form of ``marker``; equal markers share one compiled marker (and its results)."""
+    text = str(marker)
+    with _COMPILED_LOCK:
+        compiled = _COMPILED.get(text)
+        if compiled is None:
+            compiled = _COMPILED[text] = CompiledMarker(marker)
+        return compiled
+
+
+class CompiledRule(NamedTuple):
+    requirement: Requirement
+    specifier: SpecifierSet
+    marker: Optional[CompiledMarker]
+
+
+class ExcludeRules:
+    """Exclude rules (requirements from YAMLListAdapter) indexed by canonical name with compiled markers.
+
+    Rules of one package are kept sorted by their text, so the reported rule does not depend on set ordering.
+    """
+
+    def __init__(self, requirements: Iterable[Requirement]) -> None:
+        self.requirements = set(requirements)
+        self._by_name: Dict[str, List[CompiledRule]] = {}
+        for requirement in sorted(self.requirements, key=str):
+            marker = compile_marker(requirement.marker) if requirement.marker else None
+            rule = CompiledRule(requirement, requirement.specifier, marker)
+            self._by_name.setdefault(canonicalize_name(requirement.name), []).append(rule)
+
+    def __len__(self) -> int:
+        return len(self.requirements)
+
+    def names(self) -> List[str]:
+        return list(self._by_name)
+
+    def for_name(self, canonical_name: str) -> List[CompiledRule]:
+        return self._by_name.get(canonical_name, [])
+
+    def by_name(self) -> Dict[str, List[Requirement]]:
+        """Rule requirements grouped by canonical package name."""
+        return {name: [rule.requirement for rule in rules] for name, rules in self._by_name.items()}
+
+
+# grid cell: (sys_platform, python_version); None is a variable not given in the environment
+Cell = Tuple[Optional[str], Optional[str]]
+
+
+class DecisionTable:
+    """Rules of every package which apply in each (sys_platform, python_version) cell of a finite grid.
+
+    - ``inverted=False`` (YAMLListAdapter exclude=False, S3 verification): a rule applies where its marker is
+      True; a ``None`` platform is a wheel with an unknown platform, only rules without ``sys_platform`` apply.
+    - ``inverted=True`` (exclude=True, install test): a rule applies (can exclude) where its marker is False;
+      ``None`` in a cell stands for the running interpreter's value.
+
+    Packages whose rules use other marker variables are not tabulated, ``lookup`` returns None for them like
+    for cells outside of the grid; callers then evaluate ``rules`` directly.
+    """
+
+    def __init__(
+        self,
+        rules: ExcludeRules,
+        python_versions: Sequence[str],
+        sys_platforms: Sequence[str] = SYS_PLATFORMS,
+        inverted: bool = False,
+    ) -> None:
+        self.rules = rules
+        self.inverted = inverted
+        self.python_versions = frozenset(python_versions)
+        self.sys_platforms = frozenset(sys_platforms)
+        self._cells: Dict[str, Dict[Cell, Tuple[int, ...]]] = {}
+        grid = [(platform, python) for platform in (*sys_platforms, None) for python in (*python_versions, None)]
+        for name in rules.names():
+            package_rules = rules.for_name(name)
+            if any(rule.marker and not GRID_VARIABLES.issuperset(rule.marker.variables) for rule in package_rules):
+                continue
+            self._cells[name] = {
+                cell: tuple(index for index, rule in enumerate(package_rules) if self._applies(rule, *cell))
+                for cell in grid
+            }
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _applies(self, rule: CompiledRule, sys_platform: Optional[str], python: Optional[str]) -> bool:
+        if rule.marker is None:
+            return True
+        if sys_platform is None and not self.inverted and rule.marker.references("sys_platform"):
+            return False
+        environment = {}
+        if sys_platform is not None:
+            environment["sys_platform"] = sys_platform
+        if python is not None:
+            environment["python_version"] = python
+        return rule.marker.evaluate(environment) != self.inverted
+
+    def lookup(
+        self, canonical_name: str, sys_platforms: Sequence[Optional[str]], pythons: Sequence[Optional[str]]
+    ) -> Optional[List[CompiledRule]]:
+        """Rules of a package which apply in any of the cells ``sys_platforms x pythons`` (in rule order).
+
+        None when the package or a cell is not in the table.
+        """
+        if canonical_name not in self._cells:
+            return [] if not self.rules.for_name(canonical_name) else None
+        if any(p is not None and p not in self.sys_platforms for p in sys_platforms) or any(
+            v is not None and v not in self.python_versions for v in pythons
+        ):
+            return None
+        cells = self._cells[canonical_name]
+        indices: Set[int] = set()
+        for sys_platform in sys_platforms:
+            for python in pythons:
+                indices.update(cells[(sys_platform, python)])
+        package_rules = self.rules.for_name(canonical_name)
+        return [package_rules[index] for index in sorted(indices)]
+
+
+def as_exclude_rules(requirements: Union[Iterable[Requirement], ExcludeRules, DecisionTable]) -> ExcludeRules:
+    """``requirements`` as ExcludeRules (compiled here unless already compiled)."""
+    if isinstance(requirements, DecisionTable):
+        return requirements.rules
+    return requirements if isinstance(requirements, ExcludeRules) else ExcludeRules(requirements)
@@ -0,0 +1,283 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Minimization of the markers and specifiers of merged requirements.
+
+``merge_requirements`` nests markers textually (``(a) and (b)``); merging all rules of a package from
+exclude_list.yaml grows them into deep, redundant expressions which pip evaluates on every install. The markers
+of these rules only compare ``sys_platform`` and ``python_version`` with constants, so they are functions over a
+finite domain:
+
+- sys_platform   ... every compared value plus one value standing for all others
+- python_version ... every compared ``X.Y`` constant, the next minor after it (standing for all versions up to
+  the next constant) and one version below all constants
+
+``minimize_marker`` evaluates the marker on that domain and writes the truth table back as the shortest of two
+normal forms (grouped by platform or by Python range), keeping the original when it is not longer. The result is
+checked by evaluation on the domain; markers with other variables or operators are returned unchanged.
+
+``simplify_specifier`` drops duplicate and redundant version specifiers (all but the tightest lower and upper
+bound, exclusions outside of the bounds).
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from packaging.markers import Marker
+from packaging.requirements import Requirement
+from packaging.specifiers import Specifier
+from packaging.specifiers import SpecifierSet
+from packaging.version import InvalidVersion
+from packaging.version import Version
+
+# stands for every sys_platform which is not compared in the marker
+OTHER_PLATFORM = "__other__"
+# below every python_version constant
+BOTTOM_PYTHON = "0"
+
+_PYTHON_VERSION = re.compile(r"^\d+\.\d+$")
+_PYTHON_OPS = frozenset({"<", "<=", ">", ">=", "==", "!="})
+_PLATFORM_OPS = frozenset({"==", "!="})
+
+
+def _marker_domain(markers: list, platforms: set, pythons: set) -> bool:
+    """Collect the compared constants of a parsed marker; False when it uses anything but the supported atoms."""
+    for item in markers:
+        if isinstance(item, list):
+            if not _marker_domain(item, platforms, pythons):
+                return False
+        elif isinstance(item, tuple):
+            lhs, op, rhs = item
+            if type(lhs).__name__ == "Variable" and type(rhs).__name__ == "Value":
+                variable, value = lhs.value, rhs.value
+            elif type(rhs).__name__ == "Variable" and type(lhs).__name__ == "Value":
+                variable, value = rhs.value, lhs.value
+            else:
+                return False
+            if variable == "sys_platform" and op.value in _PLATFORM_OPS:
+                platforms.add(value)
+            elif variable == "python_version" and op.value in _PYTHON_OPS and _PYTHON_VERSION.match(value):
+                pythons.add(value)
+            else:
+                return False
+    return True
+
+
+def _next_minor(version: str) -> str:
+    major, minor = version.split(".")
+    return f"{major}.{int(minor) + 1}"
+
+
+class _Domain:
+    """Finite domain of a marker: representative platforms and Python versions (ascending)."""
+
+    def __init__(self, platforms: set, pythons: set) -> None:
+        self.platforms: Tuple[str, ...] = (*sorted(platforms), OTHER_PLATFORM)
+        candidates = {BOTTOM_PYTHON} | pythons | {_next_minor(version) for version in pythons}
+        self.pythons: Tuple[str, ...] = tuple(sorted(candidates, key=Version))
+
+    def truth_table(self, marker: Marker) -> Dict[Tuple[str, str], bool]:
+        return {
+            (platform, python): marker.evaluate({"sys_platform": platform, "python_version": python})
+            for platform in self.platforms
+            for python in self.pythons
+        }
+
+    # --- rendering ---
+    def platform_condition(self, platforms: FrozenSet[str]) -> str:
+        if len(platforms) == len(self.platforms):
+            return ""
+        if OTHER_PLATFORM not in platforms:
+            return " or ".join(f"sys_platform == '{p}'" for p in self.platforms if p in platforms)
+        return " and ".join(f"sys_platform != '{p}'" for p in self.platforms if p not in platforms)
+
+    def python_condition(self, indices: FrozenSet[int]) -> str:
+        last = len(self.pythons) - 1
+        if len(indices) == len(self.pythons):
+            return ""
+        missing = set(range(len(self.pythons))) - indices
+        if len(missing) == 1 and self._is_single_version(next(iter(missing))):
+            return f"python_version != '{self.pythons[next(iter(missing))]}'"
+        runs: List[str] = []
+        for start, end in _runs(sorted(indices)):
+            if start == end and self._is_single_version(start):
+                runs.append(f"python_version == '{self.pythons[start]}'")
+                continue
+            bounds = []
+            if start > 0:
+                bounds.append(f"python_version >= '{self.pythons[start]}'")
+            if end < last:
+                bounds.append(f"python_version < '{self.pythons[end + 1]}'")
+            runs.append(" and ".join(bounds))
+        return " or ".join(runs)
+
+    def _is_single_version(self, index: int) -> bool:
+        """The region of ``index`` holds one minor version (the next candidate is its next minor)."""
+        version = self.pythons[index]
+        return (
+            0 < index < len(self.pythons) - 1
+            and version != BOTTOM_PYTHON
+            and self.pythons[index + 1] == _next_minor(version)
+        )
+
+
+def _runs(indices: List[int]) -> List[Tuple[int, int]]:
+    """Contiguous runs of sorted indices as (first, last)."""
+    runs: List[Tuple[int, int]] = []
+    for index in indices:
+        if runs and runs[-1][1] == index - 1:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+    return runs
+
+
+def _conjunction(parts: List[str]) -> str:
+    parts = [part for part in parts if part]
+    if len(parts) > 1:
+        parts = [f"({part})" if " or " in part else part for part in parts]
+    return " and ".join(parts)
+
+
+def _grouped_by_platform(domain: _Domain, table: Dict[Tuple[str, str], bool]) -> str:
+    groups: Dict[FrozenSet[int], set] = {}
+    for platform in domain.platforms:
+        indices = frozenset(i for i, python in enumerate(domain.pythons) if table[(platform, python)])
+        if indices:
+            groups.setdefault(indices, set()).add(platform)
+    return " or ".join(
+        _conjunction([domain.platform_condition(frozenset(platforms)), domain.python_condition(indices)])
+        for indices, platforms in sorted(groups.items(), key=lambda group: sorted(group[0]))
+    )
+
+
+def _grouped_by_python(domain: _Domain, table: Dict[Tuple[str, str], bool]) -> str:
+    groups: Dict[FrozenSet[str], set] = {}
+    for i, python in enumerate(domain.pythons):
+        platforms = frozenset(platform for platform in domain.platforms if table[(platform, python)])
+        if platforms:
+            groups.setdefault(platforms, set()).add(i)
+    return " or ".join(
+        _conjunction([domain.python_condition(frozenset(indices)), domain.platform_condition(platforms)])
+        for platforms, indices in sorted(groups.items(), key=lambda group: min(group[1]))
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _minimize(text: str) -> Optional[str]:
+    marker = Marker(text)
+    platforms: set = set()
+    pythons: set = set()
+    if not _marker_domain(marker._markers, platforms, pythons):
+        return text
+    domain = _Domain(platforms, pythons)
+    table = domain.truth_table(marker)
+    if all(table.values()):
+        return None
+    if not any(table.values()):
+        # never true; there is no shorter form of it
+        return text
+
+    candidates = sorted({_grouped_by_platform(domain, table), _grouped_by_python(domain, table)}, key=len)
+    for candidate in candidates:
+        if len(candidate) >= len(text):
+            break
+        if domain.truth_table(Marker(candidate)) == table:
+            return candidate
+    return text
+
+
+def minimize_marker(marker: Optional[Marker]) -> Optional[Marker]:
+    """Smallest equivalent marker over the sys_platform / python_version domain; None when always true."""
+    if marker is None:
+        return None
+    minimized = _minimize(str(marker))
+    return None if minimized is None else Marker(minimized)
+
+
+def _version(specifier: Specifier) -> Optional[Version]:
+    if specifier.operator not in ("<", "<=", ">", ">=", "==", "!=") or specifier.version.endswith(".*"):
+        return None
+    try:
+        return Version(specifier.version)
+    except InvalidVersion:
+        return None
+
+
+def _implies_bound(bound: Specifier, other: Specifier) -> bool:
+    """Whether every version allowed by the tighter ``bound`` is allowed by ``other`` (both lower or both upper).
+
+    ``>V`` also excludes the post-releases and local versions of V and ``<V`` the pre-releases of V (PEP 440), so
+    an exclusive ``other`` is only implied by a bound of another release (``>1.0`` is not implied by ``>=1.0.post1``).
+    """
+    if bound == other or other.operator in (">=", "<="):
+        return True
+    bound_version, other_version = _version(bound), _version(other)
+    return bound_version is not None and other_version is not None and bound_version.release != other_version.release
+
+
+def simplify_specifier(specifier: SpecifierSet) -> SpecifierSet:
+    """Equivalent specifier set without redundant specifiers.
+
+    Only the tightest lower (``>``, ``>=``) and upper (``<``, ``<=``) bound is kept together with the bounds it does
+    not imply (see _implies_bound), ``!=`` outside of the bounds is dropped and an exact ``==`` which satisfies all
+    others replaces them. Wildcards, ``~=`` and ``===`` are kept.
+    """
+    if any(spec.prereleases for spec in specifier):
+        # dropping a specifier with a pre-release version would change which pre-releases are allowed
+        return specifier
+    lower: Optional[Specifier] = None
+    upper: Optional[Specifier] = None
+    lowers: List[Specifier] = []
+    uppers: List[Specifier] = []
+    kept: List[Specifier] = []
+    exclusions: List[Specifier] = []
+    exact: List[Specifier] = []
+    for spec in specifier:
+        version = _version(spec)
+        if version is None:
+            kept.append(spec)
+        elif spec.operator in (">", ">="):
+            lowers.append(spec)
+            if lower is None or (version, spec.operator == ">") > (_version(lower), lower.operator == ">"):
+                lower = spec
+        elif spec.operator in ("<", "<="):
+            uppers.append(spec)
+            if upper is None or (version, spec.operator == "<=") < (_version(upper), upper.operator == "<="):
+                upper = spec
+        elif spec.operator == "!=":
+            exclusions.append(spec)
+        else:
+            exact.append(spec)
+
+    bounds = [
+        spec
+        for tightest, specs in ((lower, lowers), (upper, uppers))
+        if tightest is not None
+        for spec in [tightest] + [spec for spec in specs if not _implies_bound(tightest, spec)]
+    ]
+    exclusions = [spec for spec in exclusions if all(bound.contains(spec.version, True) for bound in bounds)]
+    if len(exact) == 1 and not kept and all(spec.contains(exact[0].version, True) for spec in bounds + exclusions):
+        return SpecifierSet(str(exact[0]))
+    return SpecifierSet(",".join(str(spec) for spec in kept + exact + bounds + exclusions))
+
+
+def simplify_requirement(requirement: Requirement) -> Requirement:
+    """``requirement`` with minimized marker and simplified specifier (unchanged for URL requirements)."""
+    if requirement.url:
+        return requirement
+    marker = minimize_marker(requirement.marker)
+    extras = f"[{','.join(sorted(requirement.extras))}]" if requirement.extras else ""
+    return Requirement(
+        f"{requirement.name}{extras}{simplify_specifier(requirement.specifier)}" + (f"; {marker}" if marker else "")
+    )
@@ -0,0 +1,276 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Persistent SQLite cache of the PyPI metadata used by the ``Requires-Python`` preflight.
+
+Only the compact fields the preflight needs are stored, not the PyPI JSON payloads:
+- project ... list of release versions with their yanked status (``/pypi/<name>/json``)
+- release ... ``requires_python`` and yanked status (``/pypi/<name>/<version>/json``)
+
+Both are also derived from one PEP 691 JSON simple index page (``/simple/<name>/``), which lists every file
+with its ``requires-python``.
+
+Entries expire after a TTL. Projects and releases which do not exist on PyPI (404) are cached as negative
+entries with a separate, shorter TTL; network errors are not cached. The cache is capped in size, the oldest
+entries are evicted first.
+
+- cache file   ... ``pypi/metadata.sqlite3`` under ``get_cache_dir()`` (``IDF_PYTHON_WHEELS_CACHE_DIR``)
+- TTL          ... ``IDF_PYTHON_WHEELS_PYPI_CACHE_TTL`` in seconds (default 86400)
+- negative TTL ... ``IDF_PYTHON_WHEELS_PYPI_CACHE_NEGATIVE_TTL`` in seconds (default 3600)
+- size cap     ... ``IDF_PYTHON_WHEELS_PYPI_CACHE_SIZE`` in MiB (default 64)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from pathlib import Path
+from typing import Dict
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from packaging.utils import InvalidSdistFilename
+from packaging.utils import InvalidWheelFilename
+from packaging.utils import parse_sdist_filename
+from packaging.utils import parse_wheel_filename
+from packaging.version import InvalidVersion
+from packaging.version import Version
+
+TTL_ENV = "IDF_PYTHON_WHEELS_PYPI_CACHE_TTL"
+NEGATIVE_TTL_ENV = "IDF_PYTHON_WHEELS_PYPI_CACHE_NEGATIVE_TTL"
+SIZE_ENV = "IDF_PYTHON_WHEELS_PYPI_CACHE_SIZE"
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL = 60 * 60
+DEFAULT_SIZE_MIB = 64
+
+# Bump when the schema changes, older tables are dropped
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    found INTEGER NOT NULL,
+    releases TEXT,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS releases (
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    found INTEGER NOT NULL,
+    requires_python TEXT,
+    yanked INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    PRIMARY KEY (name, version)
+);
+"""
+
+
+class ProjectMetadata(NamedTuple):
+    found: bool  # False for a project which does not exist on PyPI
+    releases: Dict[str, bool]  # version -> yanked
+
+
+class ReleaseMetadata(NamedTuple):
+    found: bool  # False for a release which does not exist on PyPI
+    requires_python: Optional[str]
+    yanked: bool
+
+
+def project_metadata_from_json(data: dict) -> ProjectMetadata:
+    """Compact form of a ``/pypi/<name>/json`` payload; a release is yanked when all its files are."""
+    releases: Dict[str, bool] = {}
+    for version, files in (data.get("releases") or {}).items():
+        releases[version] = bool(files) and all(bool(f.get("yanked")) for f in files)
+    return ProjectMetadata(True, releases)
+
+
+def release_metadata_from_json(data: dict) -> ReleaseMetadata:
+    """Compact form of a ``/pypi/<name>/<version>/json`` payload."""
+    info = data.get("info", {})
+    requires_python = info.get("requires_python")
+    if requires_python is None or (isinstance(requires_python, str) and not requires_python.strip()):
+        requires_python = None
+    else:
+        requires_python = str(requires_python).strip()
+    return ReleaseMetadata(True, requires_python, bool(info.get("yanked")))
+
+
+def _file_version(filename: str) -> Optional[Version]:
+    try:
+        if filename.endswith(".whl"):
+            return parse_wheel_filename(filename)[1]
+        return parse_sdist_filename(filename)[1]
+    except (InvalidWheelFilename, InvalidSdistFilename, InvalidVersion):
+        return None
+
+
+def simple_metadata_from_json(data: dict) -> Tuple[ProjectMetadata, Dict[str, ReleaseMetadata]]:
+    """Compact project and release metadata from a PEP 691 JSON simple index page.
+
+    Files are grouped into releases by the version in their file name (legacy formats like ``.egg`` are ignored);
+    ``requires_python`` of a release is taken from its first file which declares one. Version strings are the
+    ones listed in ``versions`` (API 1.1) when present, as in the ``/pypi/<name>/json`` releases.
+    """
+    names: Dict[Version, str] = {}
+    for version in data.get("versions") or []:
+        try:
+            names.setdefault(Version(version), version)
+        except InvalidVersion:
+            continue
+    files: Dict[str, list] = {name: [] for name in names.values()}
+    for file in data.get("files") or []:
+        parsed = _file_version(file.get("filename", ""))
+        if parsed is not None:
+            files.setdefault(names.get(parsed, str(parsed)), []).append(file)
+
+    releases: Dict[str, ReleaseMetadata] = {}
+    for version, version_files in files.items():
+        requires_python = next(
+            (f["requires-python"].strip() for f in version_files if (f.get("requires-python") or "").strip()), None
+        )
+        yanked = bool(version_files) and all(bool(f.get("yanked")) for f in version_files)
+        releases[version] = ReleaseMetadata(True, requires_python, yanked)
+    return ProjectMetadata(True, {version: release.yanked for version, release in releases.items()}), releases
+
+
+class PyPIMetadataCache:
+    """SQLite cache of PyPI project and release metadata (see module docstring); safe to share between threads."""
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        max_size: Optional[int] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl = float(os.environ.get(TTL_ENV, DEFAULT_TTL)) if ttl is None else ttl
+        self.negative_ttl = (
+            float(os.environ.get(NEGATIVE_TTL_ENV, DEFAULT_NEGATIVE_TTL)) if negative_ttl is None else negative_ttl
+        )
+        if max_size is None:
+            max_size = int(os.environ.get(SIZE_ENV, DEFAULT_SIZE_MIB)) * 1024 * 1024
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # several build scripts may use the same cache file at the same time, wait for their locks
+        self._connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock, self._connection:
+            if self._connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._connection.executescript("DROP TABLE IF EXISTS projects; DROP TABLE IF EXISTS releases;")
+                self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._connection.executescript(_SCHEMA)
+
+    def _fresh(self, found: int, fetched: float) -> bool:
+        return time.time() - fetched < (self.ttl if found else self.negative_ttl)
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    # --- projects ---
+    def get_project(self, name: str) -> Optional[ProjectMetadata]:
+        """Cached metadata of a project (canonical name); None on a miss or an expired entry."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT found, releases, fetched FROM projects WHERE name = ?", (name,)
+            ).fetchone()
+            hit = row is not None and self._fresh(row[0], row[2])
+            self._count(hit)
+        if not hit:
+            return None
+        return ProjectMetadata(bool(row[0]), json.loads(row[1]) if row[1] else {})
+
+    def put_project(self, name: str, metadata: ProjectMetadata) -> None:
+        releases = json.dumps(metadata.releases, separators=(",", ":")) if metadata.found else None
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO projects (name, found, releases, size, fetched) VALUES (?, ?, ?, ?, ?)",
+                (name, int(metadata.found), releases, len(name) + len(releases or ""), time.time()),
+            )
+
+    # --- releases ---
+    def get_release(self, name: str, version: str) -> Optional[ReleaseMetadata]:
+        """Cached metadata of a release; None on a miss or an expired entry."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT found, requires_python, yanked, fetched FROM releases WHERE name = ? AND version = ?",
+                (name, version),
+            ).fetchone()
+            hit = row is not None and self._fresh(row[0], row[3])
+            self._count(hit)
+        if not hit:
+            return None
+        return ReleaseMetadata(bool(row[0]), row[1], bool(row[2]))
+
+    def put_release(self, name: str, version: str, metadata: ReleaseMetadata) -> None:
+        self.put_releases(name, {version: metadata})
+
+    def put_releases(self, name: str, releases: Dict[str, ReleaseMetadata]) -> None:
+        """Store many releases of one project in one transaction."""
+        now = time.time()
+        rows = [
+            (
+                name,
+                version,
+                int(metadata.found),
+                metadata.requires_python,
+                int(metadata.yanked),
+                len(name) + len(version) + len(metadata.requires_python or ""),
+                now,
+            )
+            for version, metadata in releases.items()
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO releases (name, version, found, requires_python, yanked, size, fetched) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    # --- maintenance ---
+    def evict(self) -> int:
+        """Drop expired entries, then the oldest entries until the stored data fits into max_size.
+
+        Returns the number of removed entries.
+        """
+        now = time.time()
+        removed = 0
+        with self._lock, self._connection:
+            for table in ("projects", "releases"):
+                removed += self._connection.execute(
+                    f"DELETE FROM {table} WHERE (found AND fetched < ?) OR (NOT found AND fetched < ?)",
+                    (now - self.ttl, now - self.negative_ttl),
+                ).rowcount
+            total = sum(
+                self._connection.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+                for table in ("projects", "releases")
+            )
+            if total <= self.max_size:
+                return removed
+            rows = self._connection.execute(
+                "SELECT 'projects', rowid, size, fetched FROM projects "
+                "UNION ALL SELECT 'releases', rowid, size, fetched FROM releases ORDER BY fetched"
+            ).fetchall()
+            for table, rowid, size, _ in rows:
+                if total <= self.max_size:
+                    break
+                self._connection.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+                total -= size
+                removed += 1
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
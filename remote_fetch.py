@@ -0,0 +1,300 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Shared HTTP session and concurrent fetching of remote build inputs.
+
+All downloads of the requirement assembly (IDF branches, requirements.json and feature files, constraints
+files, esptool pyproject.toml) go through one keep-alive ``requests.Session``. Transient failures (connection
+errors, 429 and 5xx responses) are retried with exponential backoff. ``fetch_many`` downloads a list of URLs
+with bounded concurrency and returns the responses in the order of the URLs, so everything built from them
+stays deterministic.
+
+With an ``HTTPCache`` installed (``set_http_cache``), bodies are stored on disk together with their ``ETag`` and
+``Last-Modified`` values. Later downloads of the same URL are conditional requests (``If-None-Match`` /
+``If-Modified-Since``); an unchanged file comes back as ``304 Not Modified`` without a body and is served from
+disk. Conditional requests answered with 304 do not count against the GitHub API rate limit.
+
+Responses are recorded into / replayed from an installed snapshot (remote_snapshot.py).
+
+Requests to one host are limited to a number of concurrent requests, no matter how many threads use the
+session (``fetch_many``, the concurrent PyPI preflight in _helper_functions.py).
+
+- number of parallel downloads       ... ``IDF_PYTHON_WHEELS_FETCH_JOBS`` (default 8)
+- concurrent requests to one host   ... ``IDF_PYTHON_WHEELS_FETCH_HOST_JOBS`` (default 8)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+from urllib.parse import urlsplit
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from remote_snapshot import NETWORK_ERROR_STATUS
+from remote_snapshot import get_snapshot
+
+FETCH_JOBS_ENV = "IDF_PYTHON_WHEELS_FETCH_JOBS"
+DEFAULT_FETCH_JOBS = 8
+HOST_JOBS_ENV = "IDF_PYTHON_WHEELS_FETCH_HOST_JOBS"
+DEFAULT_HOST_JOBS = 8
+DEFAULT_TIMEOUT = 10.0
+
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+_HTTP_CACHE: Optional[HTTPCache] = None
+_HOST_SLOTS: Dict[str, threading.BoundedSemaphore] = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+T = TypeVar("T")
+
+
+def fetch_jobs() -> int:
+    """Number of parallel downloads."""
+    return max(1, int(os.environ.get(FETCH_JOBS_ENV, DEFAULT_FETCH_JOBS)))
+
+
+def host_jobs() -> int:
+    """Number of concurrent requests to one host."""
+    return max(1, int(os.environ.get(HOST_JOBS_ENV, DEFAULT_HOST_JOBS)))
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _HOST_SLOTS_LOCK:
+        if host not in _HOST_SLOTS:
+            _HOST_SLOTS[host] = threading.BoundedSemaphore(host_jobs())
+        return _HOST_SLOTS[host]
+
+
+def _make_session() -> requests.Session:
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        # return the last response instead of raising, callers check the status code
+        raise_on_status=False,
+    )
+    # connection pool per host large enough for all concurrent requests to it
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=DEFAULT_FETCH_JOBS, pool_maxsize=host_jobs())
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session with retries (created on first use)."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = _make_session()
+        return _SESSION
+
+
+def _make_response(url: str, status: int, headers: Dict[str, str], body: bytes) -> requests.Response:
+    """Response served from disk (HTTP cache, snapshot) instead of the network."""
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers.update(headers)
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+class HTTPCacheStats:
+    def __init__(self) -> None:
+        self.downloaded = 0
+        self.not_modified = 0
+        self.uncached = 0
+
+
+class HTTPCache:
+    """On-disk cache of response bodies revalidated with conditional requests (see module docstring).
+
+    Layout: ``<directory>/<sha256 of URL>.json`` (URL, validators, headers) and ``.body`` next to it.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.stats = HTTPCacheStats()
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{digest}.json", self.directory / f"{digest}.body"
+
+    def _load(self, url: str) -> Optional[Tuple[dict, bytes]]:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or len(body) != meta.get("size"):
+            return None
+        return meta, body
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Validators of the cached response of ``url`` (empty when not cached)."""
+        cached = self._load(url)
+        if cached is None:
+            return {}
+        meta = cached[0]
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def cached_response(self, url: str, response: requests.Response) -> Optional[requests.Response]:
+        """Rebuild a ``200`` response from the cache for a ``304`` answer; None when the entry is gone."""
+        cached = self._load(url)
+        if cached is None:
+            return None
+        meta, body = cached
+        restored = _make_response(url, 200, meta.get("headers", {}), body)
+        restored.request = response.request
+        return restored
+
+    def store(self, url: str, response: requests.Response) -> None:
+        """Store a ``200`` response which carries a validator; written atomically (rename)."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            with self._lock:
+                self.stats.uncached += 1
+            return
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "size": len(response.content),
+            "headers": {name: response.headers[name] for name in ("Content-Type",) if name in response.headers},
+        }
+        meta_path, body_path = self._paths(url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            for path, data in ((body_path, response.content), (meta_path, json.dumps(meta).encode())):
+                fd, tmp_name = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_name, path)
+        except OSError:
+            return
+        with self._lock:
+            self.stats.downloaded += 1
+
+    def fetch(self, session: requests.Session, url: str, headers: Dict[str, str], timeout: float) -> requests.Response:
+        request_headers = dict(headers)
+        request_headers.update(self.conditional_headers(url))
+        response = session.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304:
+            restored = self.cached_response(url, response)
+            if restored is not None:
+                with self._lock:
+                    self.stats.not_modified += 1
+                return restored
+            # entry vanished between the request and now, download unconditionally
+            response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 200:
+            self.store(url, response)
+        return response
+
+
+def set_http_cache(cache: Optional[HTTPCache]) -> None:
+    """Install (or with None remove) the HTTP cache used by ``fetch``."""
+    global _HTTP_CACHE
+    _HTTP_CACHE = cache
+
+
+def get_http_cache() -> Optional[HTTPCache]:
+    return _HTTP_CACHE
+
+
+def fetch(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    use_http_cache: bool = True,
+) -> requests.Response:
+    """GET ``url`` over the shared session (revalidated through the HTTP cache when installed and enabled).
+
+    With a snapshot installed (remote_snapshot.py) the response is recorded, or served from the snapshot
+    without any network call when replaying.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None and snapshot.replay:
+        entry = snapshot.lookup(url)
+        if entry.status == NETWORK_ERROR_STATUS:
+            raise requests.ConnectionError(f"Recorded network error for {url}")
+        return _make_response(url, entry.status, entry.headers, entry.body)
+
+    try:
+        with _host_slot(url):
+            if _HTTP_CACHE is not None and use_http_cache:
+                response = _HTTP_CACHE.fetch(get_session(), url, headers or {}, timeout)
+            else:
+                response = get_session().get(url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        if snapshot is not None:
+            snapshot.record(url, NETWORK_ERROR_STATUS)
+        raise
+    if snapshot is not None:
+        snapshot.record(url, response.status_code, response.content, dict(response.headers))
+    return response
+
+
+def fetch_many(
+    urls: List[str],
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    jobs: Optional[int] = None,
+) -> List[requests.Response]:
+    """Fetch all URLs concurrently; responses are returned in the order of ``urls``.
+
+    Duplicate URLs are downloaded once. Network errors which remain after the retries are raised.
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    if not unique_urls:
+        return []
+    responses = dict(zip(unique_urls, map_concurrently(lambda url: fetch(url, headers, timeout), unique_urls, jobs)))
+    return [responses[url] for url in urls]
+
+
+def map_concurrently(function: Callable[..., T], items: List, jobs: Optional[int] = None) -> List[T]:
+    """``[function(item) for item in items]`` run on a bounded thread pool; results keep the order of ``items``.
+
+    Exceptions are raised from the first failing item in that order.
+    """
+    if not items:
+        return []
+    workers = min(jobs or fetch_jobs(), len(items))
+    if workers == 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items))
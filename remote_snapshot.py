@@ -0,0 +1,123 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Record/replay snapshots of all remote inputs of the requirement assembly and preflight.
+
+``build_wheels.py --record snapshot.tar`` stores every response fetched over the network: the IDF branch list,
+the master version.cmake, every requirements.json and feature file, the constraints files, esptool
+pyproject.toml (all through remote_fetch.py) and the PyPI JSON queried by _helper_functions.py.
+``--replay snapshot.tar`` serves the same URLs from the snapshot and makes no network calls at all;
+a URL which is not in the snapshot raises ``SnapshotMissError``. The PyPI queries treat a miss as a failed request,
+as a replay on another interpreter or platform checks the Requires-Python of other releases.
+
+Snapshot layout (tar): ``index.json`` (URL -> status, headers, body member) and ``bodies/<sha256 of URL>``.
+Failed requests are recorded too (HTTP status, or status 0 for a network error), so a replay takes the same
+decisions as the recorded run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import tarfile
+import threading
+
+from typing import Dict
+from typing import NamedTuple
+from typing import Optional
+
+INDEX_MEMBER = "index.json"
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Response headers kept in the snapshot
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+# status of a request which failed without an HTTP response
+NETWORK_ERROR_STATUS = 0
+
+
+class SnapshotMissError(RuntimeError):
+    """Replayed run requested a URL which was not recorded."""
+
+
+class SnapshotEntry(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+class Snapshot:
+    """Recorded responses keyed by URL; ``replay`` marks a snapshot loaded to be served instead of the network."""
+
+    def __init__(self, replay: bool = False) -> None:
+        self.replay = replay
+        self.entries: Dict[str, SnapshotEntry] = {}
+        self._lock = threading.Lock()
+
+    def record(self, url: str, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None) -> None:
+        kept = {name: value for name, value in (headers or {}).items() if name in RECORDED_HEADERS}
+        with self._lock:
+            self.entries[url] = SnapshotEntry(status, kept, body)
+
+    def lookup(self, url: str) -> SnapshotEntry:
+        """Recorded response of ``url``; raises SnapshotMissError when it is not in the snapshot."""
+        try:
+            return self.entries[url]
+        except KeyError:
+            raise SnapshotMissError(f"URL not recorded in the snapshot: {url}") from None
+
+    def save(self, path: str) -> None:
+        """Write the snapshot as a tar archive (sorted, fixed mtime, so equal inputs give equal archives)."""
+        responses: Dict[str, Dict[str, object]] = {}
+        index = {"format": SNAPSHOT_FORMAT_VERSION, "responses": responses}
+        with tarfile.open(path, "w") as tar:
+            for url in sorted(self.entries):
+                entry = self.entries[url]
+                member = f"bodies/{hashlib.sha256(url.encode()).hexdigest()}"
+                responses[url] = {"status": entry.status, "headers": entry.headers, "body": member}
+                _add_member(tar, member, entry.body)
+            _add_member(tar, INDEX_MEMBER, json.dumps(index, indent=1, sort_keys=True).encode())
+
+    @classmethod
+    def load(cls, path: str) -> Snapshot:
+        """Read a snapshot written by ``save`` for replay."""
+        snapshot = cls(replay=True)
+        with tarfile.open(path, "r") as tar:
+            index = json.loads(_read_member(tar, INDEX_MEMBER))
+            if index.get("format") != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot format {index.get('format')!r} in {path}")
+            for url, response in index["responses"].items():
+                snapshot.entries[url] = SnapshotEntry(
+                    response["status"], response["headers"], _read_member(tar, response["body"])
+                )
+        return snapshot
+
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _read_member(tar: tarfile.TarFile, name: str) -> bytes:
+    member = tar.extractfile(name)
+    if member is None:
+        raise ValueError(f"Snapshot member {name} is not a file")
+    return member.read()
+
+
+_SNAPSHOT: Optional[Snapshot] = None
+
+
+def set_snapshot(snapshot: Optional[Snapshot]) -> None:
+    """Install (or with None remove) the snapshot used for recording or replaying remote inputs."""
+    global _SNAPSHOT
+    _SNAPSHOT = snapshot
+
+
+def get_snapshot() -> Optional[Snapshot]:
+    return _SNAPSHOT
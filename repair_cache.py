@@ -0,0 +1,158 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Persistent manifest of wheel repairs, so unchanged wheels are not repaired again.
+
+An entry is keyed by the sha256 of the input wheel, its file name, the repair tool (``auditwheel``,
+``delocate-wheel``, ``delvewheel``) and its version, and the runner (OS, architecture, libc). It records the
+outcome of the repair: the repaired (or renamed) wheel with its sha256, the original kept as it is, or the wheel
+deleted with the reason. Failed repairs are not recorded. A later run with the same input replays the outcome
+without starting the repair tool; repaired wheels are hardlinked (or copied) from the cache.
+The cache is capped in size, least recently used entries are evicted first (cache_entries.py).
+
+- cache directory ... ``repair`` under ``get_cache_dir()`` (``IDF_PYTHON_WHEELS_CACHE_DIR``)
+- size cap        ... ``IDF_PYTHON_WHEELS_REPAIR_CACHE_SIZE`` in MiB (default 2048)
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+from importlib import metadata
+from pathlib import Path
+from typing import NamedTuple
+from typing import Optional
+
+from _helper_functions import get_cache_dir
+from cache_entries import ENTRY_FILE
+from cache_entries import EntryCache
+from cache_entries import link_or_copy
+
+CACHE_SIZE_ENV = "IDF_PYTHON_WHEELS_REPAIR_CACHE_SIZE"
+DEFAULT_CACHE_SIZE_MIB = 2 * 1024
+# Bump when the layout, the key composition or the outcomes of repair_wheels.py change
+CACHE_FORMAT_VERSION = 1
+
+# distribution which provides the command of a repair tool
+TOOL_DISTRIBUTIONS = {"auditwheel": "auditwheel", "delocate-wheel": "delocate", "delvewheel": "delvewheel"}
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version(tool: str) -> Optional[str]:
+    """Version of a repair tool; None when it is not installed (nothing is cached then).
+
+    The installed distribution is looked up first, otherwise ``<tool> --version`` is asked (auditwheel in the
+    manylinux containers is installed outside of the running interpreter).
+    """
+    try:
+        return metadata.version(TOOL_DISTRIBUTIONS.get(tool, tool))
+    except metadata.PackageNotFoundError:
+        pass
+    try:
+        out = subprocess.run([tool, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    except OSError:
+        return None
+    version = out.stdout.strip()
+    return version if out.returncode == 0 and version else None
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CachedRepair(NamedTuple):
+    status: str  # outcome recorded by repair_wheels.py (repaired, kept, deleted)
+    reason: Optional[str]  # why the wheel was deleted
+    wheel: Optional[Path]  # resulting wheel, None when it was deleted
+
+
+class RepairCache(EntryCache):
+    """Manifest of repair outcomes shared between runs (see module docstring).
+
+    Keeps no state besides its configuration, so it can be passed to the workers of a process pool.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_size: Optional[int] = None) -> None:
+        if max_size is None:
+            max_size = int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE_MIB)) * 1024 * 1024
+        super().__init__(directory if directory is not None else get_cache_dir("repair"), max_size)
+
+    # --- keys ---
+    def key_for(self, wheel: Path, tool: str) -> Optional[str]:
+        """Cache key of repairing ``wheel`` with ``tool`` on this runner; None when the tool version is unknown."""
+        version = tool_version(tool)
+        if version is None:
+            return None
+        key = {
+            "format": CACHE_FORMAT_VERSION,
+            "wheel": wheel.name,
+            "sha256": file_sha256(wheel),
+            "tool": tool,
+            "tool_version": version,
+            "system": platform.system(),
+            "machine": platform.machine(),
+            "libc": list(platform.libc_ver()),
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    # --- lookup / store ---
+    def restore(self, key: str, wheel: Path) -> Optional[CachedRepair]:
+        """Replay the recorded outcome of ``key`` on ``wheel``; None on a miss.
+
+        A repaired or renamed wheel replaces ``wheel`` in its directory, a deleted wheel is removed.
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            entry = self._read_entry(key)
+            status, reason, name = entry["status"], entry.get("reason"), entry.get("wheel")
+            if name is not None and file_sha256(entry_dir / name) != entry["sha256"]:
+                return None
+            self._mark_used(key)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if entry.get("deleted"):
+            wheel.unlink(missing_ok=True)
+            return CachedRepair(status, reason, None)
+        if name is None:
+            return CachedRepair(status, reason, wheel)
+        result = wheel.parent / name
+        wheel.unlink(missing_ok=True)
+        link_or_copy(entry_dir / name, result)
+        return CachedRepair(status, reason, result)
+
+    def store(self, key: str, status: str, reason: Optional[str], result: Optional[Path], changed: bool) -> None:
+        """Record the outcome of a repair; ``result`` is the resulting wheel (None when deleted).
+
+        A ``changed`` result (repaired or renamed, not the input as it was) is copied into the entry. The entry
+        becomes visible atomically (rename of a complete directory).
+        """
+        entry_dir = self._entry_dir(key)
+        if entry_dir.exists():
+            return
+        entry = {"status": status, "reason": reason, "deleted": result is None, "created": time.time()}
+        entry_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry_dir.parent))
+        try:
+            if result is not None and changed:
+                shutil.copy2(result, tmp_dir / result.name)
+                entry.update(wheel=result.name, sha256=file_sha256(tmp_dir / result.name))
+                entry["size"] = (tmp_dir / result.name).stat().st_size
+            (tmp_dir / ENTRY_FILE).write_text(json.dumps(entry))
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -10,13 +10,37 @@ See: https://github.com/espressif/idf-python-wheels/blob/main/README.md#universa
 - Windows: delvewheel (bundles DLLs)
 - macOS: delocate (bundles dylibs)
 - Linux: auditwheel (bundles SOs)
+
+Every wheel is repaired in its own scratch directory under ./temp_repair, so ``--jobs N`` repairs N wheels at
+once in a process pool (default: number of CPU cores).
+
+Outcomes are recorded in a persistent repair cache (repair_cache.py) keyed by the sha256 of the input wheel and
+the repair tool version; an unchanged wheel gets its recorded outcome without running the tool again
+(``--no-repair-cache`` disables it).
+
+On Linux the native binaries of each wheel are prescanned first (wheel_prescan.py); wheels which auditwheel
+would keep as they are, or refuse for too-recent versioned symbols, are classified without running it
+(``--no-prescan`` disables it).
 """
 
+import argparse
+import contextlib
+import io
 import platform
+import shutil
+import struct
 import subprocess
+import sys
+import tempfile
+import zipfile
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any
+from typing import Dict
 from typing import List
+from typing import NamedTuple
+from typing import Optional
 from typing import Set
 from typing import Tuple
 from typing import Union
@@ -25,6 +49,17 @@ from colorama import Fore
 
 from _helper_functions import print_color
 from _helper_functions import wheel_archive_is_readable
+from build_scheduler import default_jobs
+from build_telemetry import get_telemetry
+from build_telemetry import run_measured
+from build_telemetry import wheels_size
+from repair_cache import CachedRepair
+from repair_cache import RepairCache
+from wheel_prescan import NO_REPAIR_NEEDED
+from wheel_prescan import TOO_RECENT_SYMBOLS
+from wheel_prescan import linux_repair_verdict
+from wheel_prescan import prescan_wheel
+from wheel_prescan import target_policy
 
 
 def _stderr_indicates_bad_zip(error_msg: str) -> bool:
@@ -94,12 +129,18 @@ def get_wheel_arch(wheel_name: str) -> Union[str, None]:
     return None
 
 
+def _run_repair_tool(cmd: List[str], wheel_path: Path, temp_dir: Path) -> subprocess.CompletedProcess[str]:
+    """Run the repair tool measured (build_report.json); the produced wheels are those in temp_dir."""
+    result, measurement = run_measured(cmd, text=True)
+    repaired = sorted(p.name for p in temp_dir.glob("*.whl"))
+    get_telemetry().record(cmd[0], wheel_path.name, measurement, repaired, wheels_size(str(temp_dir), repaired))
+    return result
+
+
 def repair_wheel_windows(wheel_path: Path, temp_dir: Path) -> subprocess.CompletedProcess[str]:
     """Repair Windows wheel using delvewheel."""
-    result = subprocess.run(
-        ["delvewheel", "repair", str(wheel_path), "-w", str(temp_dir), "--no-mangle-all"],
-        capture_output=True,
-        text=True,
+    result = _run_repair_tool(
+        ["delvewheel", "repair", str(wheel_path), "-w", str(temp_dir), "--no-mangle-all"], wheel_path, temp_dir
     )
     return result
 
@@ -148,7 +189,7 @@ def fix_universal2_wheel_name(wheel_path: Path, error_msg: str) -> Union[Path, s
 def repair_wheel_macos(wheel_path: Path, temp_dir: Path) -> subprocess.CompletedProcess[str]:
     """Repair macOS wheel using delocate."""
     cmd = ["delocate-wheel", "-w", str(temp_dir), "-v", str(wheel_path)]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = _run_repair_tool(cmd, wheel_path, temp_dir)
     return result
 
 
@@ -158,233 +199,405 @@ def repair_wheel_linux(wheel_path: Path, temp_dir: Path) -> subprocess.Completed
     Uses --strip option to strip debugging symbols which can help with
     ELF alignment issues on ARM (fixes "ELF load command address/offset not properly aligned" errors).
     """
-    result = subprocess.run(
-        ["auditwheel", "repair", str(wheel_path), "-w", str(temp_dir), "--strip"],
-        capture_output=True,
-        text=True,
+    result = _run_repair_tool(
+        ["auditwheel", "repair", str(wheel_path), "-w", str(temp_dir), "--strip"], wheel_path, temp_dir
     )
     return result
 
 
-def main() -> None:
-    wheels_dir: Path = Path("./downloaded_wheels")
-    temp_dir: Path = Path("./temp_repair")
-    temp_dir.mkdir(exist_ok=True)
+# Status of the repair of one wheel (counted into the statistics)
+REPAIRED = "repaired"
+KEPT = "kept"
+DELETED = "deleted"
+ERROR = "error"
 
-    # Find all wheel files (dedupe: same inode can appear twice via symlinks / layout quirks)
-    wheels: list[Path] = _dedupe_wheel_paths(wheels_dir)
+# repair tool of each platform (the key of its outcomes in the repair cache)
+REPAIR_TOOLS = {"Windows": "delvewheel", "Darwin": "delocate-wheel", "Linux": "auditwheel"}
 
-    if not wheels:
-        print_color(f"No wheels found in {wheels_dir} - nothing to repair", Fore.YELLOW)
-        print("Exiting successfully (no wheels to process)")
-        return
 
-    print_color(f"Found {len(wheels)} wheels\n")
+class RepairOutcome(NamedTuple):
+    status: str  # REPAIRED, KEPT, DELETED or ERROR
+    detail: Optional[str] = None  # error for the list of errors (ERROR), reason (DELETED)
+    wheel: Optional[Path] = None  # resulting wheel of a repair by the tool (REPAIRED, KEPT)
+    cached: bool = False  # outcome replayed from the repair cache
+    prescanned: bool = False  # outcome known from the prescan of the binaries (wheel_prescan.py)
 
-    current_platform: str = get_platform()
-    current_arch: str = platform.machine()
 
-    repaired_count: int = 0
-    skipped_count: int = 0
-    deleted_count: int = 0
-    error_count: int = 0
-    errors: list[str] = []
+def repair_wheel(
+    wheel: Path,
+    temp_dir: Path,
+    current_platform: str,
+    current_arch: str,
+    cache: Optional[RepairCache] = None,
+    prescan: bool = True,
+) -> RepairOutcome:
+    """Repair one wheel in place; temp_dir is its own (empty) scratch directory for the repaired output.
 
-    # Repair each wheel
-    for wheel in wheels:
-        print(f"Processing: {wheel.name}")
+    Linux wheels whose auditwheel outcome is certain from the prescan of their binaries are classified without
+    running it. With a cache, the outcome of an earlier repair of the same input is replayed without the tool.
+    """
+    print(f"Processing: {wheel.name}")
+
+    # Skip pure Python wheels
+    if is_pure_python_wheel(wheel.name):
+        print_color("  -> Skipping pure Python wheel")
+        return RepairOutcome(KEPT)
+
+    # Skip pywin32 wheels on Windows (DLLs are internal to the wheel)
+    if current_platform == "Windows" and wheel.name.startswith("pywin32"):
+        print_color("  -> Skipping pywin32 wheel (DLLs are internal)")
+        return RepairOutcome(KEPT)
+
+    # Skip wheels not for the workflow platform
+    if not is_platform_wheel(wheel.name, current_platform, current_arch):
+        print_color(f"  -> Skipping (not a {current_platform} wheel)")
+        return RepairOutcome(KEPT)
+
+    # For Linux, skip wheels for different architectures
+    if current_platform == "Linux":
+        wheel_arch = get_wheel_arch(wheel.name)
+        if wheel_arch and wheel_arch != current_arch:
+            print_color(f"  -> Skipping incompatible architecture ({wheel_arch} wheel on {current_arch} platform)")
+            return RepairOutcome(KEPT)
+
+    # PEP 427: wheels are zip files; truncated/corrupt CI artifacts may pass is_zipfile
+    # but fail on central directory (delocate: BadZipFile).
+    if not wheel_archive_is_readable(wheel):
+        print_color("  -> Deleting file (not a valid / readable zip wheel archive)", Fore.RED)
+        wheel.unlink(missing_ok=True)
+        return RepairOutcome(DELETED, "not a valid / readable zip wheel archive")
+
+    tool = REPAIR_TOOLS.get(current_platform)
+    if tool is None:
+        print_color(f"  -> ERROR: Unsupported platform {current_platform}", Fore.RED)
+        return RepairOutcome(ERROR)
+
+    if prescan and current_platform == "Linux":
+        outcome = _prescanned(wheel, current_arch)
+        if outcome is not None:
+            return outcome
+
+    key = cache.key_for(wheel, tool) if cache is not None else None
+    if cache is not None and key is not None:
+        cached = cache.restore(key, wheel)
+        if cached is not None:
+            return _replayed(wheel, cached)
+
+    outcome = _repair_with_tool(wheel, temp_dir, current_platform, current_arch)
+    if cache is not None and key is not None and outcome.status != ERROR:
+        changed = outcome.wheel is not None and (outcome.status == REPAIRED or outcome.wheel != wheel)
+        cache.store(key, outcome.status, outcome.detail, outcome.wheel, changed)
+    return outcome
+
+
+def _prescanned(wheel: Path, current_arch: str) -> Optional[RepairOutcome]:
+    """Outcome of auditwheel known from the native binaries of the wheel; None when auditwheel has to run."""
+    policy = target_policy()
+    try:
+        scan = prescan_wheel(wheel)
+    except (OSError, zipfile.BadZipFile, struct.error):
+        return None
+    verdict = linux_repair_verdict(scan, wheel.name, current_arch, policy)
+    # the verdict TOO_RECENT_SYMBOLS implies a required glibc and a target policy
+    if verdict == TOO_RECENT_SYMBOLS and scan.max_glibc is not None and policy is not None:
+        required = ".".join(map(str, scan.max_glibc))
+        allowed = ".".join(map(str, policy[0]))
+        print_color(
+            f"  -> Keeping original wheel (build issue: needs older toolchain; requires GLIBC {required}, "
+            f"target policy allows {allowed})",
+            Fore.YELLOW,
+        )
+    elif verdict == NO_REPAIR_NEEDED:
+        print_color("  -> Keeping original wheel (already compatible, no libraries to bundle)", Fore.GREEN)
+    else:
+        return None
+    return RepairOutcome(KEPT, wheel=wheel, prescanned=True)
 
-        # Skip pure Python wheels
-        if is_pure_python_wheel(wheel.name):
-            print_color("  -> Skipping pure Python wheel")
-            skipped_count += 1
-            continue
 
-        # Skip pywin32 wheels on Windows (DLLs are internal to the wheel)
-        if current_platform == "Windows" and wheel.name.startswith("pywin32"):
-            print_color("  -> Skipping pywin32 wheel (DLLs are internal)")
-            skipped_count += 1
-            continue
+def _replayed(wheel: Path, cached: CachedRepair) -> RepairOutcome:
+    """Report an outcome replayed from the repair cache."""
+    if cached.wheel is None:
+        print_color(f"  -> Deleting file ({cached.reason}; recorded in the repair cache)", Fore.RED)
+    elif cached.wheel != wheel:
+        print_color(f"  -> Replaced with wheel from the repair cache: {cached.wheel.name}", Fore.GREEN)
+    else:
+        print_color("  -> Keeping original wheel (recorded in the repair cache)", Fore.GREEN)
+    return RepairOutcome(cached.status, cached.reason, cached.wheel, cached=True)
 
-        # Skip wheels not for the workflow platform
-        if not is_platform_wheel(wheel.name, current_platform, current_arch):
-            print_color(f"  -> Skipping (not a {current_platform} wheel)")
-            skipped_count += 1
-            continue
 
-        # For Linux, skip wheels for different architectures
-        if current_platform == "Linux":
-            wheel_arch = get_wheel_arch(wheel.name)
-            if wheel_arch and wheel_arch != current_arch:
-                print_color(f"  -> Skipping incompatible architecture ({wheel_arch} wheel on {current_arch} platform)")
-                skipped_count += 1
-                continue
+def _repair_with_tool(wheel: Path, temp_dir: Path, current_platform: str, current_arch: str) -> RepairOutcome:
+    """Run the repair tool of the platform on one wheel and apply its result."""
+    # Repair wheel using platform-specific tool
+    if current_platform == "Windows":
+        result = repair_wheel_windows(wheel, temp_dir)
+    elif current_platform == "Darwin":
+        result = repair_wheel_macos(wheel, temp_dir)
+    else:
+        result = repair_wheel_linux(wheel, temp_dir)
 
-        # PEP 427: wheels are zip files; truncated/corrupt CI artifacts may pass is_zipfile
-        # but fail on central directory (delocate: BadZipFile).
-        if not wheel_archive_is_readable(wheel):
-            print_color("  -> Deleting file (not a valid / readable zip wheel archive)", Fore.RED)
-            wheel.unlink(missing_ok=True)
-            deleted_count += 1
-            continue
+    if result.stdout:
+        print(f"  {result.stdout.strip()}")
+    if result.stderr:
+        print_color(f"  {result.stderr.strip()}", Fore.RED)
 
-        # Clean temp directory
+    # Check for errors
+    error_msg = result.stderr.strip() if result.stderr else ""
+
+    # Corrupt zip / bad central directory (delocate opens the wheel as a zip)
+    if _stderr_indicates_bad_zip(error_msg):
+        print_color("  -> Deleting file (repair tool reported corrupt zip archive)", Fore.RED)
         for old_wheel in temp_dir.glob("*.whl"):
             old_wheel.unlink()
+        wheel.unlink(missing_ok=True)
+        return RepairOutcome(DELETED, "repair tool reported corrupt zip archive")
 
-        # Repair wheel using platform-specific tool
-        if current_platform == "Windows":
-            result = repair_wheel_windows(wheel, temp_dir)
-        elif current_platform == "Darwin":
-            result = repair_wheel_macos(wheel, temp_dir)
-        elif current_platform == "Linux":
-            result = repair_wheel_linux(wheel, temp_dir)
-        else:
-            print_color(f"  -> ERROR: Unsupported platform {current_platform}", Fore.RED)
-            error_count += 1
-            continue
-
-        if result.stdout:
-            print(f"  {result.stdout.strip()}")
-        if result.stderr:
-            print_color(f"  {result.stderr.strip()}", Fore.RED)
-
-        # Check for errors
-        error_msg = result.stderr.strip() if result.stderr else ""
-
-        # Corrupt zip / bad central directory (delocate opens the wheel as a zip)
-        if _stderr_indicates_bad_zip(error_msg):
-            print_color("  -> Deleting file (repair tool reported corrupt zip archive)", Fore.RED)
+    # Special handling for incorrectly tagged universal2 wheels on macOS
+    if (
+        current_platform == "Darwin"
+        and "universal2" in wheel.name
+        and "Failed to find any binary with the required architecture" in error_msg
+    ):
+        # Try to fix by renaming the wheel to the correct architecture
+        renamed_wheel = fix_universal2_wheel_name(wheel, error_msg)
+
+        if renamed_wheel == "delete":
+            # Wheel was corrupted and has been deleted
+            return RepairOutcome(DELETED, "corrupted universal2 wheel")
+        elif renamed_wheel:
+            # Clean temp directory and retry with renamed wheel
             for old_wheel in temp_dir.glob("*.whl"):
                 old_wheel.unlink()
-            wheel.unlink(missing_ok=True)
-            deleted_count += 1
-            continue
 
-        # Special handling for incorrectly tagged universal2 wheels on macOS
-        if (
-            current_platform == "Darwin"
-            and "universal2" in wheel.name
-            and "Failed to find any binary with the required architecture" in error_msg
-        ):
-            # Try to fix by renaming the wheel to the correct architecture
-            renamed_wheel = fix_universal2_wheel_name(wheel, error_msg)
+            print_color("  -> Retrying delocate with corrected wheel name", Fore.CYAN)
+            result = repair_wheel_macos(Path(renamed_wheel), temp_dir)
 
-            if renamed_wheel == "delete":
-                # Wheel was corrupted and has been deleted
-                deleted_count += 1
-                continue
-            elif renamed_wheel:
-                # Clean temp directory and retry with renamed wheel
-                for old_wheel in temp_dir.glob("*.whl"):
-                    old_wheel.unlink()
+            if result.stdout:
+                print(f"  {result.stdout.strip()}")
+            if result.stderr:
+                print_color(f"  {result.stderr.strip()}", Fore.RED)
 
-                print_color("  -> Retrying delocate with corrected wheel name", Fore.CYAN)
-                result = repair_wheel_macos(Path(renamed_wheel), temp_dir)
+            # Update wheel reference and error message for subsequent checks
+            wheel = Path(renamed_wheel)
+            error_msg = result.stderr.strip() if result.stderr else ""
 
-                if result.stdout:
-                    print(f"  {result.stdout.strip()}")
-                if result.stderr:
-                    print_color(f"  {result.stderr.strip()}", Fore.RED)
+    # Special handling forLinux ARMv7 broken wheels
+    if (
+        current_platform == "Linux"
+        and current_arch == "armv7l"
+        and "This does not look like a platform wheel, no ELF executable" in error_msg
+    ):
+        print_color("  -> Deleting corrupted wheel", Fore.RED)
+        wheel.unlink(missing_ok=True)
+        return RepairOutcome(DELETED, "corrupted wheel (no ELF executable)")
+
+    # Check for non-critical errors (keep original wheel)
+    is_noncritical = (
+        "too-recent versioned symbols" in error_msg
+        # manylinux wheel can't find its libraries
+        # it means it was already properly repaired
+        or ("manylinux" in wheel.name and "could not be located" in error_msg)
+        # ARMv7 CI runs under QEMU; auditwheel may fail libc detection on abi3/native .so
+        or (
+            current_platform == "Linux"
+            and current_arch == "armv7l"
+            and ("InvalidLibc" in error_msg or "couldn't detect libc" in error_msg)
+        )
+    )
 
-                # Update wheel reference and error message for subsequent checks
-                wheel = Path(renamed_wheel)
-                error_msg = result.stderr.strip() if result.stderr else ""
+    has_error = (
+        any(
+            [
+                "ValueError:" in error_msg,
+                "FileNotFoundError:" in error_msg,
+                "Cannot repair wheel" in error_msg,
+                "could not be located" in error_msg,
+                "DelocationError:" in error_msg,
+            ]
+        )
+        and not is_noncritical
+    )
 
-        # Special handling forLinux ARMv7 broken wheels
-        if (
+    if is_noncritical:
+        # Non-critical error - keep the wheel
+        if "too-recent versioned symbols" in error_msg:
+            print_color("  -> Keeping original wheel (build issue: needs older toolchain)", Fore.YELLOW)
+        elif "manylinux" in wheel.name and "could not be located" in error_msg:
+            print_color("  -> Keeping original wheel (already bundled from PyPI)", Fore.GREEN)
+        elif (
             current_platform == "Linux"
             and current_arch == "armv7l"
-            and "This does not look like a platform wheel, no ELF executable" in error_msg
+            and ("InvalidLibc" in error_msg or "couldn't detect libc" in error_msg)
         ):
-            print_color("  -> Deleting corrupted wheel", Fore.RED)
+            print_color(
+                "  -> Keeping original wheel (auditwheel libc detection failed on ARMv7 runner; often QEMU)",
+                Fore.YELLOW,
+            )
+        return RepairOutcome(KEPT, wheel=wheel)
+
+    if has_error:
+        # Actual error occurred (even if a wheel was created, it may be broken)
+        # Clean up any partial wheel
+        for old_wheel in temp_dir.glob("*.whl"):
+            old_wheel.unlink()
+        print_color(f"  -> ERROR: {error_msg}", Fore.RED)
+        return RepairOutcome(ERROR, f"{wheel.name}: {error_msg}")
+
+    # Check if a repaired wheel was created
+    repaired = next(temp_dir.glob("*.whl"), None)
+
+    if repaired:
+        # A repaired wheel was created successfully
+        if repaired.name != wheel.name:
+            wheel.unlink(missing_ok=True)  # Remove original
+            final_path = wheel.parent / repaired.name
+            repaired.rename(final_path)
+            print_color(f"  -> Replaced with repaired wheel: {repaired.name}", Fore.GREEN)
+        else:
+            # Name unchanged
             wheel.unlink(missing_ok=True)
-            deleted_count += 1
-            continue
+            repaired.rename(wheel)
+            final_path = wheel
+            print_color(f"  -> Repaired successfully: {repaired.name}", Fore.GREEN)
+        if not wheel_archive_is_readable(final_path):
+            print_color("  -> Deleting repaired output (not a valid / readable zip archive)", Fore.RED)
+            final_path.unlink(missing_ok=True)
+            return RepairOutcome(DELETED, "repaired output not a valid / readable zip archive")
+        return RepairOutcome(REPAIRED, wheel=final_path)
+
+    if result.returncode == 0:
+        # No repaired wheel created, but command succeeded (already compatible)
+        print_color("  -> Keeping original wheel (already compatible)", Fore.GREEN)
+        return RepairOutcome(KEPT, wheel=wheel)
+
+    # Command failed and no wheel created
+    print_color(f"  -> ERROR: {error_msg}", Fore.RED)
+    return RepairOutcome(ERROR, f"{wheel.name}: {error_msg}")
+
+
+def _repair_in_scratch_dir(
+    wheel: Path,
+    temp_root: Path,
+    current_platform: str,
+    current_arch: str,
+    cache: Optional[RepairCache] = None,
+    prescan: bool = True,
+) -> RepairOutcome:
+    """repair_wheel with a new scratch directory under temp_root, removed afterwards."""
+    scratch_dir = Path(tempfile.mkdtemp(prefix="repair-", dir=temp_root))
+    try:
+        return repair_wheel(wheel, scratch_dir, current_platform, current_arch, cache, prescan)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+class RepairResult(NamedTuple):
+    outcome: RepairOutcome
+    output: str  # everything the repair printed
+    records: List[Dict[str, Any]]  # measurements of the repair tools (build_report.json)
+
+
+def _repair_worker(
+    wheel: Path, temp_root: Path, current_platform: str, current_arch: str, cache: Optional[RepairCache], prescan: bool
+) -> RepairResult:
+    """Repair one wheel in a worker process; output and measurements are returned to the main process."""
+    telemetry = get_telemetry()
+    first_record = len(telemetry.records)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        outcome = _repair_in_scratch_dir(wheel, temp_root, current_platform, current_arch, cache, prescan)
+    return RepairResult(outcome, output.getvalue(), telemetry.records[first_record:])
+
+
+def repair_wheels(
+    wheels: List[Path],
+    temp_root: Path,
+    current_platform: str,
+    current_arch: str,
+    jobs: int = 1,
+    cache: Optional[RepairCache] = None,
+    prescan: bool = True,
+) -> List[RepairOutcome]:
+    """Repair all wheels, each in its own scratch directory under temp_root; outcomes in the order of wheels.
+
+    With jobs > 1 the wheels are repaired in a process pool. The output of every wheel is printed as one block
+    in the order of wheels, the measurements of the workers are merged into this process's telemetry.
+    """
+    if jobs <= 1 or len(wheels) <= 1:
+        return [
+            _repair_in_scratch_dir(wheel, temp_root, current_platform, current_arch, cache, prescan) for wheel in wheels
+        ]
+
+    outcomes: List[RepairOutcome] = []
+    with ProcessPoolExecutor(max_workers=min(jobs, len(wheels))) as executor:
+        futures = [
+            executor.submit(_repair_worker, wheel, temp_root, current_platform, current_arch, cache, prescan)
+            for wheel in wheels
+        ]
+        for future in futures:
+            result = future.result()
+            sys.stdout.write(result.output)
+            sys.stdout.flush()
+            get_telemetry().add_records(result.records)
+            outcomes.append(result.outcome)
+    return outcomes
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Repair wheels in downloaded_wheels with the platform repair tool.")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=default_jobs(),
+        help="number of wheels repaired in parallel (default: number of CPU cores)",
+    )
+    parser.add_argument(
+        "--no-repair-cache",
+        action="store_true",
+        help="do not replay outcomes from or record outcomes into the persistent repair cache",
+    )
+    parser.add_argument(
+        "--no-prescan",
+        action="store_true",
+        help="run auditwheel also for wheels whose outcome is known from the prescan of their binaries",
+    )
+    return parser.parse_args(argv)
 
-        # Check for non-critical errors (keep original wheel)
-        is_noncritical = (
-            "too-recent versioned symbols" in error_msg
-            # manylinux wheel can't find its libraries
-            # it means it was already properly repaired
-            or ("manylinux" in wheel.name and "could not be located" in error_msg)
-            # ARMv7 CI runs under QEMU; auditwheel may fail libc detection on abi3/native .so
-            or (
-                current_platform == "Linux"
-                and current_arch == "armv7l"
-                and ("InvalidLibc" in error_msg or "couldn't detect libc" in error_msg)
-            )
-        )
 
-        has_error = (
-            any(
-                [
-                    "ValueError:" in error_msg,
-                    "FileNotFoundError:" in error_msg,
-                    "Cannot repair wheel" in error_msg,
-                    "could not be located" in error_msg,
-                    "DelocationError:" in error_msg,
-                ]
-            )
-            and not is_noncritical
-        )
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    wheels_dir: Path = Path("./downloaded_wheels")
+    temp_dir: Path = Path("./temp_repair")
+    temp_dir.mkdir(exist_ok=True)
 
-        if is_noncritical:
-            # Non-critical error - keep the wheel
-            if "too-recent versioned symbols" in error_msg:
-                print_color("  -> Keeping original wheel (build issue: needs older toolchain)", Fore.YELLOW)
-            elif "manylinux" in wheel.name and "could not be located" in error_msg:
-                print_color("  -> Keeping original wheel (already bundled from PyPI)", Fore.GREEN)
-            elif (
-                current_platform == "Linux"
-                and current_arch == "armv7l"
-                and ("InvalidLibc" in error_msg or "couldn't detect libc" in error_msg)
-            ):
-                print_color(
-                    "  -> Keeping original wheel (auditwheel libc detection failed on ARMv7 runner; often QEMU)",
-                    Fore.YELLOW,
-                )
-            skipped_count += 1
-        elif has_error:
-            # Actual error occurred (even if a wheel was created, it may be broken)
-            # Clean up any partial wheel
-            for old_wheel in temp_dir.glob("*.whl"):
-                old_wheel.unlink()
-            print_color(f"  -> ERROR: {error_msg}", Fore.RED)
-            errors.append(f"{wheel.name}: {error_msg}")
-            error_count += 1
-        else:
-            # Check if a repaired wheel was created
-            repaired = next(temp_dir.glob("*.whl"), None)
-
-            if repaired:
-                # A repaired wheel was created successfully
-                if repaired.name != wheel.name:
-                    wheel.unlink(missing_ok=True)  # Remove original
-                    final_path = wheel.parent / repaired.name
-                    repaired.rename(final_path)
-                    print_color(f"  -> Replaced with repaired wheel: {repaired.name}", Fore.GREEN)
-                else:
-                    # Name unchanged
-                    wheel.unlink(missing_ok=True)
-                    repaired.rename(wheel)
-                    final_path = wheel
-                    print_color(f"  -> Repaired successfully: {repaired.name}", Fore.GREEN)
-                if not wheel_archive_is_readable(final_path):
-                    print_color("  -> Deleting repaired output (not a valid / readable zip archive)", Fore.RED)
-                    final_path.unlink(missing_ok=True)
-                    deleted_count += 1
-                else:
-                    repaired_count += 1
-            elif result.returncode == 0:
-                # No repaired wheel created, but command succeeded (already compatible)
-                print_color("  -> Keeping original wheel (already compatible)", Fore.GREEN)
-                skipped_count += 1
-            else:
-                # Command failed and no wheel created
-                print_color(f"  -> ERROR: {error_msg}", Fore.RED)
-                errors.append(f"{wheel.name}: {error_msg}")
-                error_count += 1
+    # Find all wheel files (dedupe: same inode can appear twice via symlinks / layout quirks)
+    wheels: list[Path] = _dedupe_wheel_paths(wheels_dir)
+
+    if not wheels:
+        print_color(f"No wheels found in {wheels_dir} - nothing to repair", Fore.YELLOW)
+        print("Exiting successfully (no wheels to process)")
+        return
+
+    print_color(f"Found {len(wheels)} wheels\n")
+
+    current_platform: str = get_platform()
+    current_arch: str = platform.machine()
+
+    # Repair each wheel
+    cache = None if args.no_repair_cache else RepairCache()
+    outcomes = repair_wheels(
+        wheels, temp_dir, current_platform, current_arch, jobs=args.jobs, cache=cache, prescan=not args.no_prescan
+    )
+    if cache is not None:
+        cache.evict()
+
+    repaired_count: int = sum(outcome.status == REPAIRED for outcome in outcomes)
+    skipped_count: int = sum(outcome.status == KEPT for outcome in outcomes)
+    deleted_count: int = sum(outcome.status == DELETED for outcome in outcomes)
+    error_count: int = sum(outcome.status == ERROR for outcome in outcomes)
+    cached_count: int = sum(outcome.cached for outcome in outcomes)
+    prescanned_count: int = sum(outcome.prescanned for outcome in outcomes)
+    errors: list[str] = [outcome.detail for outcome in outcomes if outcome.status == ERROR and outcome.detail]
 
     print_color("---------- STATISTICS ----------")
     print_color(f"Total wheels: {len(wheels)}")
@@ -392,6 +605,13 @@ def main() -> None:
     print_color(f"Kept wheels: {skipped_count}")
     print_color(f"Repaired wheels: {repaired_count}", Fore.GREEN)
     print_color(f"Errors: {error_count}", Fore.RED)
+    if not args.no_prescan and current_platform == "Linux":
+        print_color(f"Classified by prescan: {prescanned_count}")
+    if cache is not None:
+        print_color(f"Replayed from repair cache: {cached_count} ({cache.directory})")
+
+    get_telemetry().print_slowest()
+    get_telemetry().write_report("repair_wheels.py")
 
     if errors:
         print_color("---------- ERRORS ----------", Fore.RED)
@@ -5,28 +5,86 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 #
+import json
 import os
+import subprocess
 import sys
+import tempfile
+import threading
+import time
 import unittest
 
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 from pathlib import Path
+from typing import Dict
+from typing import List
 from typing import Optional
 from unittest.mock import patch
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from colorama import Fore
 from packaging.requirements import Requirement
+from packaging.version import Version
 
 from _helper_functions import current_interpreter_satisfies_requires_python
 from _helper_functions import filter_requirements_by_pypi_requires_python
+from _helper_functions import find_installable_release
 from _helper_functions import get_no_binary_args
 from _helper_functions import merge_requirements
+from _helper_functions import print_color
+from _helper_functions import pypi_requires_python_preflight
 from _helper_functions import pypi_requires_python_preflight_skip
+from build_cache import BuildCache
+from build_scheduler import ResolvedDistribution
+from build_scheduler import WheelBuildTask
+from build_scheduler import count_results
+from build_scheduler import parse_install_report
+from build_scheduler import plan_dependency_builds
+from build_scheduler import run_batched_wheel_builds
+from build_scheduler import run_wheel_builds
+from build_telemetry import BuildTelemetry
+from build_telemetry import ProcessMeasurement
+from build_telemetry import run_measured
+from build_wheels import ESPTOOL_PYPROJECT_URL
+from build_wheels import IDF_CONSTRAINTS_URL
+from build_wheels import IDF_RESOURCES_URL
 from build_wheels import _add_into_requirements
+from build_wheels import assemble_requirements
+from build_wheels import exclude_from_requirements
+from build_wheels import get_python_dependent_wheels
+from build_wheels import get_python_dependent_wheels_with_reasons
 from build_wheels import get_used_idf_branches
+from marker_minimizer import simplify_requirement
+from pypi_metadata_cache import ProjectMetadata
+from pypi_metadata_cache import PyPIMetadataCache
+from pypi_metadata_cache import ReleaseMetadata
+from remote_fetch import HTTPCache
+from remote_fetch import fetch
+from remote_fetch import fetch_many
+from remote_fetch import set_http_cache
+from remote_snapshot import Snapshot
+from remote_snapshot import SnapshotMissError
+from remote_snapshot import set_snapshot
 from yaml_list_adapter import YAMLListAdapter
 
+_module_cleanups: list = []
+
+
+def setUpModule():
+    """Keep the persistent caches (e.g. compiled YAML lists of every adapter) in a temporary cache root."""
+    cache_root = tempfile.TemporaryDirectory()
+    patcher = patch.dict(os.environ, {"IDF_PYTHON_WHEELS_CACHE_DIR": cache_root.name})
+    patcher.start()
+    _module_cleanups.extend([cache_root.cleanup, patcher.stop])
+
+
+def tearDownModule():
+    while _module_cleanups:
+        _module_cleanups.pop()()
+
 
 def requirement_exact_pin_version(req: Requirement) -> Optional[str]:
     """Mirror of former production helper: single non-wildcard ``==`` pin only (used by tests)."""
@@ -42,6 +100,51 @@ def requirement_exact_pin_version(req: Requirement) -> Optional[str]:
     return ver
 
 
+def legacy_exclude_from_requirements(
+    assembled_requirements: set, exclude_list: set, print_requirements: bool = True
+) -> set:
+    """Mirror of the former O(N x M) ``exclude_from_requirements`` (equivalence tests and benchmarks.py)."""
+    from packaging.utils import canonicalize_name
+
+    new_assembled_requirements = set()
+    not_in_exclude = []
+    if print_requirements:
+        print_color("---------- REQUIREMENTS ----------")
+
+    for requirement in assembled_requirements:
+        printed = False
+        for req_to_exclude in exclude_list:
+            if canonicalize_name(req_to_exclude.name) != canonicalize_name(requirement.name):
+                not_in_exclude.append(True)
+            else:
+                if not req_to_exclude.specifier and not req_to_exclude.marker:
+                    if print_requirements:
+                        print_color(f"-- {requirement}", Fore.RED)
+                    continue
+
+                # merged as by the current implementation, only the loop is the former one
+                new_requirement = simplify_requirement(merge_requirements(requirement, req_to_exclude))
+                new_assembled_requirements.add(new_requirement)
+
+                if print_requirements:
+                    if not printed:
+                        print_color(f"-- {requirement}", Fore.RED)
+                        printed = True
+                    print_color(f"++ {new_requirement}", Fore.GREEN)
+
+        if len(not_in_exclude) == len(exclude_list):
+            if print_requirements:
+                print(str(requirement))
+            new_assembled_requirements.add(requirement)
+
+        not_in_exclude.clear()
+
+    if print_requirements:
+        print_color("---------- END OF REQUIREMENTS ----------")
+
+    return new_assembled_requirements
+
+
 class TestChangeSpecifierLogic(unittest.TestCase):
     """Test the _change_specifier_logic method."""
 
@@ -178,6 +281,192 @@ class TestYAMLListAdapterIntegration(unittest.TestCase):
             self.skipTest("exclude_list.yaml not found")
 
 
+class TestYAMLListCache(unittest.TestCase):
+    """Test the cache of compiled YAML lists in YAMLListAdapter."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.cache_root = self._tmp.name
+        patcher = patch.dict(os.environ, {"IDF_PYTHON_WHEELS_CACHE_DIR": self.cache_root})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.yaml_file = os.path.join(self.cache_root, "list.yaml")
+        Path(self.yaml_file).write_text(Path("exclude_list.yaml").read_text())
+
+    def _entries(self) -> list:
+        return sorted(Path(self.cache_root, "yaml_lists").glob("*.json"))
+
+    @patch("yaml_list_adapter.print_color")
+    def test_unchanged_list_is_loaded_from_cache(self, _mock_print):
+        for exclude, platform in ((False, None), (True, None), (True, "linux_arm64")):
+            cold = YAMLListAdapter(self.yaml_file, exclude=exclude, current_platform=platform)
+            with patch("yaml_list_adapter.yaml.load") as yaml_load:
+                warm = YAMLListAdapter(self.yaml_file, exclude=exclude, current_platform=platform)
+            yaml_load.assert_not_called()
+            uncached = YAMLListAdapter(self.yaml_file, exclude=exclude, current_platform=platform, use_cache=False)
+            self.assertEqual(warm.requirements, cold.requirements)
+            self.assertEqual(warm.requirements, uncached.requirements)
+        # one entry per exclude flag and platform
+        self.assertEqual(len(self._entries()), 3)
+
+    @patch("yaml_list_adapter.print_color")
+    def test_changed_or_broken_entry_is_compiled_again(self, _mock_print):
+        import yaml
+
+        YAMLListAdapter(self.yaml_file, exclude=True)
+        with open(self.yaml_file, "a") as f:
+            f.write("\n- package_name: 'added-package'\n")
+        changed = YAMLListAdapter(self.yaml_file, exclude=True)
+        self.assertIn("added-package", {requirement.name for requirement in changed.requirements})
+        self.assertEqual(len(self._entries()), 2)
+
+        for entry in self._entries():
+            entry.write_text("{broken")
+        with patch.object(yaml, "load", wraps=yaml.load) as yaml_load:
+            self.assertEqual(YAMLListAdapter(self.yaml_file, exclude=True).requirements, changed.requirements)
+        yaml_load.assert_called_once()
+
+    @patch("yaml_list_adapter.print_color")
+    def test_disabled_by_environment(self, _mock_print):
+        with patch.dict(os.environ, {"IDF_PYTHON_WHEELS_YAML_CACHE": "0"}):
+            YAMLListAdapter(self.yaml_file)
+        self.assertEqual(self._entries(), [])
+
+
+class TestAssembleRequirementsDuplicates(unittest.TestCase):
+    """The single-pass duplicate assembly gives the same requirements as the former quadratic one."""
+
+    def _assert_equivalent(self, yaml_file: str, **kwargs) -> None:
+        with patch.object(
+            YAMLListAdapter, "_assemble_requirements_duplicates", legacy_assemble_requirements_duplicates
+        ):
+            legacy = YAMLListAdapter(yaml_file, use_cache=False, **kwargs)
+        current = YAMLListAdapter(yaml_file, use_cache=False, **kwargs)
+        # the former set of duplicates was merged in arbitrary order: compare what the markers evaluate to
+        self.assertEqual(_marker_truth(current.requirements), _marker_truth(legacy.requirements), kwargs)
+
+    @patch("yaml_list_adapter.print_color")
+    def test_exclude_list(self, _mock_print):
+        for exclude in (False, True):
+            for platform in (None, "linux_x86_64", "linux_arm64", "windows", "macos_arm64"):
+                self._assert_equivalent("exclude_list.yaml", exclude=exclude, current_platform=platform)
+
+    @patch("yaml_list_adapter.print_color")
+    def test_random_lists(self, _mock_print):
+        import random
+
+        import yaml
+
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as tmp:
+            yaml_file = os.path.join(tmp, "list.yaml")
+            for count in (1, 5, 20, 60):
+                for _ in range(5):
+                    Path(yaml_file).write_text(yaml.safe_dump(random_yaml_list(rng, count, max(1, count // 4))))
+                    for exclude in (False, True):
+                        self._assert_equivalent(yaml_file, exclude=exclude)
+
+    @patch("yaml_list_adapter.print_color")
+    def test_duplicates(self, _mock_print):
+        import yaml
+
+        entries = [
+            {"package_name": "a", "platform": "win32"},
+            {"package_name": "a", "platform": "darwin", "python": ">3.11"},
+            {"package_name": "a", "version": "<2"},
+            {"package_name": "a", "platform": "win32"},
+            {"package_name": "b"},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            yaml_file = os.path.join(tmp, "list.yaml")
+            Path(yaml_file).write_text(yaml.safe_dump(entries))
+            adapter = YAMLListAdapter(yaml_file)
+            self.assertEqual(adapter._yaml_list, [entries[0], entries[2], entries[3], entries[4]])
+            adapter._yaml_list = list(entries)
+            self.assertEqual(
+                adapter._assemble_requirements_duplicates(),
+                {"a": [Requirement("a; sys_platform == 'darwin' and python_version > '3.11'")]},
+            )
+
+    @patch("yaml_list_adapter.print_color")
+    def test_duplicates_in_yaml_order(self, _mock_print):
+        import yaml
+
+        platforms = ["linux", "darwin", "freebsd", "cygwin", "aix", "emscripten", "wasi"]
+        entries = [{"package_name": "a", "platform": "win32"}]
+        entries += [{"package_name": "a", "platform": platform} for platform in platforms]
+        entries.append({"package_name": "a", "platform": "linux"})  # repeated duplicate
+        with tempfile.TemporaryDirectory() as tmp:
+            yaml_file = os.path.join(tmp, "list.yaml")
+            Path(yaml_file).write_text(yaml.safe_dump(entries))
+            adapter = YAMLListAdapter(yaml_file, use_cache=False)
+            adapter._yaml_list = list(entries)
+            duplicates = adapter._assemble_requirements_duplicates()["a"]
+        self.assertEqual(
+            [str(duplicate.marker) for duplicate in duplicates], [f'sys_platform == "{p}"' for p in platforms]
+        )
+
+
+def _marker_truth(requirements) -> set:
+    """Requirements with their marker as the environments (sys_platform, python_version) where it is true."""
+    environments = [
+        {"sys_platform": platform, "python_version": f"3.{minor}"}
+        for platform in ("linux", "win32", "darwin", "freebsd")
+        for minor in range(6, 16)
+    ]
+    return {
+        (
+            requirement.name,
+            str(requirement.specifier),
+            frozenset(
+                (env["sys_platform"], env["python_version"])
+                for env in environments
+                if requirement.marker is None or requirement.marker.evaluate(env)
+            ),
+        )
+        for requirement in requirements
+    }
+
+
+def legacy_assemble_requirements_duplicates(adapter: YAMLListAdapter) -> dict:
+    """Mirror of the former quadratic ``YAMLListAdapter._assemble_requirements_duplicates`` (equivalence tests and
+    benchmarks.py)."""
+    duplicates_dict: Dict[str, set] = {}
+    for i, requirement in enumerate(adapter._yaml_list):
+        package_name = requirement["package_name"]
+
+        for next_requirement in adapter._yaml_list[i + 1 :]:
+            if next_requirement["package_name"] == package_name and next_requirement != requirement:
+                if package_name not in duplicates_dict:
+                    duplicates_dict[package_name] = set()
+
+                if "version" in next_requirement:
+                    continue
+
+                duplicates_dict[package_name].add(
+                    list(adapter._yaml_to_requirement([next_requirement.copy()], adapter.exclude))[0]
+                )
+                adapter._yaml_list.remove(next_requirement)
+
+    return duplicates_dict
+
+
+def random_yaml_list(rng, count: int, names_count: int) -> list:
+    """Distinct random exclude_list.yaml entries of ``names_count`` packages (many duplicates of each name)."""
+    versions = ["<1.20", ">=2.0", "==1.5", ["<3", "!=2.5"]]
+    platforms = ["win32", "linux", "darwin", "linux_arm64", "macos_x86_64", ["win32", "darwin"], ["linux", "win32"]]
+    pythons = [">=3.10", "<3.9", "==3.12", [">=3.8", "<3.11"]]
+    entries: dict = {}
+    while len(entries) < count:
+        entry = {"package_name": f"package-{rng.randrange(names_count)}"}
+        for key, values in (("version", versions), ("platform", platforms), ("python", pythons)):
+            if rng.random() < 0.4:
+                entry[key] = rng.choice(values)
+        entries.setdefault(json.dumps(entry, sort_keys=True), entry)
+    return list(entries.values())
+
+
 def _current_platform_wheel_tag():
     """Return a wheel platform tag matching the current OS for is_wheel_compatible tests."""
     if sys.platform == "win32":
@@ -314,6 +603,224 @@ class TestShouldExcludeWheel(unittest.TestCase):
         self.assertFalse(result)
 
 
+def legacy_should_exclude_wheel_s3(wheel_name: str, exclude_requirements: set, supported_python_versions=None) -> tuple:
+    """Mirror of the former ``should_exclude_wheel_s3`` without compiled markers (tests and benchmarks.py)."""
+    from packaging.utils import canonicalize_name
+    from packaging.version import Version
+
+    from _helper_functions import get_wheel_python_version
+    from _helper_functions import get_wheel_sys_platforms
+    from _helper_functions import parse_wheel_name
+
+    parsed = parse_wheel_name(wheel_name)
+    if not parsed:
+        return False, ""
+    pkg_name, wheel_version = parsed
+    canonical_name = canonicalize_name(pkg_name)
+    wheel_python = get_wheel_python_version(wheel_name)
+    wheel_sys_platforms = get_wheel_sys_platforms(wheel_name)
+    python_versions_to_try: list = []
+    if wheel_python is not None:
+        python_versions_to_try.append(wheel_python)
+    elif supported_python_versions:
+        python_versions_to_try.extend(supported_python_versions)
+    else:
+        python_versions_to_try.append(None)
+
+    for req in exclude_requirements:
+        if canonicalize_name(req.name) != canonical_name:
+            continue
+        if req.marker:
+            if "sys_platform" in str(req.marker):
+                if not wheel_sys_platforms:
+                    continue
+                marker_matches = False
+                for sys_plat in wheel_sys_platforms:
+                    for pv in python_versions_to_try:
+                        env = {"sys_platform": sys_plat}
+                        if pv is not None:
+                            env["python_version"] = pv
+                        if req.marker.evaluate(environment=env):
+                            marker_matches = True
+                            break
+                    if marker_matches:
+                        break
+                if not marker_matches:
+                    continue
+            else:
+                marker_matches = False
+                for pv in python_versions_to_try:
+                    env = {"python_version": pv} if pv is not None else {}
+                    if req.marker.evaluate(environment=env if env else None):
+                        marker_matches = True
+                        break
+                if not marker_matches:
+                    continue
+        if req.specifier and wheel_version:
+            try:
+                if Version(wheel_version) not in req.specifier:
+                    continue
+            except Exception:
+                pass
+        return True, f"matches exclude rule: {req}"
+    return False, ""
+
+
+SUPPORTED_PYTHONS = ["3.8", "3.9", "3.10", "3.11", "3.12", "3.13", "3.14"]
+
+
+def exclude_list_wheel_names(requirements: set) -> list:
+    """Wheel file names of every package in the rules: versions around each specifier, all Pythons and platforms."""
+    from packaging.utils import canonicalize_name
+
+    versions: dict = {}
+    for req in requirements:
+        package_versions = versions.setdefault(canonicalize_name(req.name).replace("-", "_"), {"0.1", "999.0"})
+        package_versions.update(spec.version.replace(".*", "") for spec in req.specifier)
+    tags = ["py3-none-any", "cp38-abi3-manylinux_2_17_x86_64", "cp311-cp311-unknown_platform"]
+    for python in SUPPORTED_PYTHONS:
+        cp = f"cp{python.replace('.', '')}"
+        tags += [f"{cp}-{cp}-{plat}" for plat in ("win_amd64", "manylinux_2_17_aarch64", "macosx_11_0_arm64")]
+    return [
+        f"{name}-{version}-{tag}.whl" for name in sorted(versions) for version in sorted(versions[name]) for tag in tags
+    ]
+
+
+class TestCompiledMarkers(unittest.TestCase):
+    """Test the compiled markers and exclude rules (compiled_markers.py) used by the wheel exclusion checks."""
+
+    def test_variables_and_memoized_evaluation(self):
+        from packaging.markers import Marker
+
+        from compiled_markers import CompiledMarker
+
+        compiled = CompiledMarker(
+            Marker("(sys_platform != 'darwin' and python_version <= '3.11') or sys_platform == 'win32'")
+        )
+        self.assertEqual(compiled.variables, ("python_version", "sys_platform"))
+        self.assertFalse(compiled.references("platform_machine"))
+        with patch.object(Marker, "evaluate", autospec=True, side_effect=Marker.evaluate) as evaluate:
+            for _ in range(3):
+                self.assertTrue(compiled.evaluate({"sys_platform": "linux", "python_version": "3.9"}))
+                # variables the marker does not reference do not split the cache
+                self.assertTrue(compiled.evaluate({"sys_platform": "linux", "python_version": "3.9", "os_name": "x"}))
+                self.assertFalse(compiled.evaluate({"sys_platform": "darwin", "python_version": "3.9"}))
+        self.assertEqual(evaluate.call_count, 2)
+
+    def test_equal_markers_share_compiled_marker(self):
+        from compiled_markers import compile_marker
+
+        first = Requirement("a; sys_platform == 'linux'").marker
+        second = Requirement("b; sys_platform == 'linux'").marker
+        self.assertIs(compile_marker(first), compile_marker(second))
+
+    @patch("yaml_list_adapter.print_color")
+    def test_should_exclude_wheel_s3_matches_legacy_on_exclude_list(self, _mock_print):
+        from _helper_functions import should_exclude_wheel_s3
+        from compiled_markers import ExcludeRules
+
+        requirements = YAMLListAdapter("exclude_list.yaml", exclude=False).requirements
+        rules = ExcludeRules(requirements)
+        wheels = exclude_list_wheel_names(requirements)
+        self.assertGreater(len(wheels), 1000)
+        for wheel in wheels:
+            for supported in (SUPPORTED_PYTHONS, None):
+                expected = legacy_should_exclude_wheel_s3(wheel, requirements, supported)[0]
+                self.assertEqual(should_exclude_wheel_s3(wheel, rules, supported)[0], expected, wheel)
+                self.assertEqual(should_exclude_wheel_s3(wheel, requirements, supported)[0], expected, wheel)
+
+    @patch("yaml_list_adapter.print_color")
+    def test_should_exclude_wheel_matches_per_rule_evaluation(self, _mock_print):
+        from packaging.utils import canonicalize_name
+        from packaging.version import Version
+
+        from _helper_functions import parse_wheel_name
+        from _helper_functions import should_exclude_wheel
+        from compiled_markers import ExcludeRules
+
+        for platform in ("linux_x86_64", "windows", "macos_arm64"):
+            requirements = YAMLListAdapter("exclude_list.yaml", exclude=True, current_platform=platform).requirements
+            rules = ExcludeRules(requirements)
+            for wheel in exclude_list_wheel_names(requirements):
+                name, version = parse_wheel_name(wheel)
+                expected = any(
+                    canonicalize_name(req.name) == name
+                    and not (req.marker and req.marker.evaluate())
+                    and not (req.specifier and Version(version) in req.specifier)
+                    for req in requirements
+                )
+                self.assertEqual(should_exclude_wheel(wheel, rules)[0], expected, wheel)
+
+
+class TestDecisionTable(unittest.TestCase):
+    """Test the exclude rule decision table (compiled_markers.DecisionTable) against the marker evaluation."""
+
+    @patch("yaml_list_adapter.print_color")
+    def test_should_exclude_wheel_s3_matches_legacy_on_exclude_list(self, _mock_print):
+        from _helper_functions import should_exclude_wheel_s3
+        from compiled_markers import CompiledMarker
+
+        adapter = YAMLListAdapter("exclude_list.yaml", exclude=False)
+        table = adapter.compile_decision_table(SUPPORTED_PYTHONS)
+        # cp37 is outside of the grid and falls back to evaluating the markers
+        wheels = exclude_list_wheel_names(adapter.requirements) + ["cffi-1.0-cp37-cp37m-win_amd64.whl"]
+        for wheel in wheels:
+            for supported in (SUPPORTED_PYTHONS, None):
+                expected = legacy_should_exclude_wheel_s3(wheel, adapter.requirements, supported)
+                self.assertEqual(should_exclude_wheel_s3(wheel, table, supported), expected, wheel)
+
+        # answers inside of the grid are table lookups, no marker is evaluated
+        with patch.object(CompiledMarker, "evaluate") as evaluate:
+            for wheel in exclude_list_wheel_names(adapter.requirements):
+                should_exclude_wheel_s3(wheel, table, SUPPORTED_PYTHONS)
+        evaluate.assert_not_called()
+
+    @patch("yaml_list_adapter.print_color")
+    def test_should_exclude_wheel_matches_compiled_rules(self, _mock_print):
+        from _helper_functions import should_exclude_wheel
+        from compiled_markers import ExcludeRules
+
+        python = f"{sys.version_info.major}.{sys.version_info.minor}"
+        for platform in ("linux_x86_64", "windows", "macos_arm64"):
+            adapter = YAMLListAdapter("exclude_list.yaml", exclude=True, current_platform=platform)
+            rules = ExcludeRules(adapter.requirements)
+            table = adapter.compile_decision_table([python], [sys.platform])
+            for wheel in exclude_list_wheel_names(adapter.requirements):
+                self.assertEqual(should_exclude_wheel(wheel, table), should_exclude_wheel(wheel, rules), wheel)
+
+    def test_lookup(self):
+        from compiled_markers import DecisionTable
+        from compiled_markers import ExcludeRules
+
+        rules = ExcludeRules(
+            {
+                Requirement("a; sys_platform == 'win32'"),
+                Requirement("a<2; python_version < '3.10'"),
+                Requirement("b; platform_machine == 'x86_64'"),
+            }
+        )
+        table = DecisionTable(rules, ["3.9", "3.12"])
+        self.assertEqual(
+            [str(r.requirement) for r in table.lookup("a", ["win32"], ["3.12"])], ['a; sys_platform == "win32"']
+        )
+        self.assertEqual(
+            [str(r.requirement) for r in table.lookup("a", ["linux", "win32"], ["3.9"])],
+            ['a; sys_platform == "win32"', 'a<2; python_version < "3.10"'],
+        )
+        # unknown platform: only rules without sys_platform apply
+        self.assertEqual([str(r.requirement) for r in table.lookup("a", [None], ["3.12"])], [])
+        self.assertEqual(table.lookup("unknown", ["linux"], ["3.9"]), [])
+        # outside of the grid, or variables the table does not tabulate
+        self.assertIsNone(table.lookup("a", ["linux"], ["3.7"]))
+        self.assertIsNone(table.lookup("a", ["cygwin"], ["3.9"]))
+        self.assertIsNone(table.lookup("b", ["linux"], ["3.9"]))
+
+        inverted = DecisionTable(rules, ["3.9"], inverted=True)
+        self.assertEqual(
+            [str(r.requirement) for r in inverted.lookup("a", ["linux"], ["3.9"])], ['a; sys_platform == "win32"']
+        )
+
+
 class TestGetUsedIdfBranches(unittest.TestCase):
     """Test the get_used_idf_branches function."""
 
@@ -398,6 +905,156 @@ class TestAddIntoRequirements(unittest.TestCase):
         self.assertEqual(len(result), 2)
 
 
+def legacy_get_python_dependent_wheels(wheel_dir: str, requirements: set) -> set:
+    """Mirror of the former regex-based, O(W x R) ``get_python_dependent_wheels`` (tests and benchmarks.py)."""
+    import re
+
+    dependent_wheels_set = set()
+    dependent_requirements_set = set()
+    for wheel in os.listdir(wheel_dir):
+        match = re.compile(r"([^ -]*)-(\d+(\.\d+)*).*?(cp\d+)").search(wheel)
+        if match is not None:
+            dependent_wheels_set.add((match.group(1), match.group(2), match.group(3)))
+    for name, version, _ in dependent_wheels_set:
+        for requirement in requirements:
+            if requirement.marker:
+                if "python_version" in str(requirement.marker):
+                    dependent_requirements_set.add(requirement)
+            if name.lower() == requirement.name.lower():
+                dependent_requirements_set.add(requirement)
+            else:
+                dependent_requirements_set.add(Requirement(f"{name}=={version}"))
+    return dependent_requirements_set
+
+
+class TestGetPythonDependentWheels(unittest.TestCase):
+    """Test selection of Python version dependent requirements from built wheels."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.wheel_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _wheels(self, *names):
+        for name in names:
+            Path(self.wheel_dir, name).write_bytes(b"")
+
+    def test_dependent_requirements_and_reasons(self):
+        self._wheels(
+            "cryptography-42.0.0-cp39-abi3-manylinux_2_28_x86_64.whl",
+            "cffi-1.17.1-cp311-cp311-manylinux_2_17_x86_64.whl",
+            "ruamel_yaml_clib-0.2.12-cp311-cp311-manylinux_2_17_x86_64.whl",
+            "pyyaml-6.0.2rc1-cp311-cp311-linux_x86_64.whl",
+            "click-8.1.7-py3-none-any.whl",
+            "requirements.txt",
+        )
+        requirements = {
+            Requirement("cryptography>=40"),
+            Requirement("ruamel.yaml.clib>=0.2"),
+            Requirement("click"),
+            Requirement("numpy<2; python_version < '3.9'"),
+            Requirement("gdbgui; sys_platform != 'win32'"),
+        }
+        reasons = get_python_dependent_wheels_with_reasons(self.wheel_dir, requirements)
+        self.assertEqual(
+            set(reasons),
+            {
+                Requirement("cryptography>=40"),
+                Requirement("ruamel.yaml.clib>=0.2"),
+                Requirement("cffi==1.17.1"),
+                Requirement("pyyaml==6.0.2rc1"),
+                Requirement("numpy<2; python_version < '3.9'"),
+            },
+        )
+        self.assertEqual(
+            reasons[Requirement("cffi==1.17.1")],
+            "CPython-specific dependency wheel cffi-1.17.1-cp311-cp311-manylinux_2_17_x86_64.whl",
+        )
+        self.assertEqual(
+            reasons[Requirement("cryptography>=40")],
+            "CPython-specific wheel cryptography-42.0.0-cp39-abi3-manylinux_2_28_x86_64.whl",
+        )
+        self.assertIn("python version marker", reasons[Requirement("numpy<2; python_version < '3.9'")])
+        self.assertEqual(get_python_dependent_wheels(self.wheel_dir, requirements), set(reasons))
+
+    def test_no_dependent_wheels(self):
+        self._wheels("click-8.1.7-py3-none-any.whl")
+        requirements = {Requirement("numpy<2; python_version < '3.9'")}
+        self.assertEqual(get_python_dependent_wheels(self.wheel_dir, requirements), set())
+
+    def test_subset_of_former_selection(self):
+        self._wheels(
+            "cffi-1.17.1-cp311-cp311-manylinux_2_17_x86_64.whl",
+            "bitarray-2.9.2-cp311-cp311-win_amd64.whl",
+            "click-8.1.7-py3-none-any.whl",
+        )
+        requirements = {Requirement("cffi>=1.15"), Requirement("click"), Requirement("pkg; python_version >= '3.10'")}
+        current = get_python_dependent_wheels(self.wheel_dir, requirements)
+        legacy = legacy_get_python_dependent_wheels(self.wheel_dir, requirements)
+        self.assertLess(current, legacy)
+        # the former selection also pinned cffi although the requirement for cffi is taken
+        self.assertEqual(legacy - current, {Requirement("cffi==1.17.1")})
+
+
+class TestExcludeFromRequirements(unittest.TestCase):
+    """Indexed ``exclude_from_requirements`` gives the same result and output as the former nested loop."""
+
+    def _run_both(self, requirements: set, exclude_list: set):
+        outputs = []
+        for implementation in (legacy_exclude_from_requirements, exclude_from_requirements):
+            printed = []
+
+            def _record(text, *args):
+                printed.append((text,) + args)
+
+            with patch("build_wheels.print_color", side_effect=_record), patch("builtins.print", side_effect=_record):
+                with patch(f"{__name__}.print_color", side_effect=_record):
+                    result = implementation(requirements, exclude_list)
+            outputs.append((result, printed))
+        return outputs
+
+    def test_equivalent_on_exclude_list_yaml(self):
+        exclude_list = YAMLListAdapter("exclude_list.yaml", exclude=True, current_platform="linux_x86_64").requirements
+        requirements = {Requirement(f"{rule.name}>=1.0") for rule in exclude_list}
+        requirements |= {
+            Requirement(f"{rule.name.upper().replace('-', '_')}; python_version < '3.12'") for rule in exclude_list
+        }
+        requirements |= {Requirement("not-excluded==2.0"), Requirement("ruamel.yaml.clib")}
+        (legacy, legacy_printed), (indexed, indexed_printed) = self._run_both(requirements, exclude_list)
+        self.assertEqual(indexed, legacy)
+        self.assertEqual(indexed_printed, legacy_printed)
+
+    def test_equivalent_on_random_lists(self):
+        import random
+
+        rng = random.Random(7)
+        names = [f"pkg-{i}" for i in range(40)] + ["Pkg.0", "pkg_1"]
+        specifiers = ["", ">=1.0", "<2", "==1.5", "!=1.2"]
+        markers = ["", "sys_platform != 'win32'", "python_version >= '3.9'"]
+        for _ in range(20):
+            requirements = {
+                Requirement(
+                    f"{rng.choice(names)}{rng.choice(specifiers)}" + (f"; {m}" if (m := rng.choice(markers)) else "")
+                )
+                for _ in range(30)
+            }
+            exclude_list = {
+                Requirement(
+                    f"{rng.choice(names)}{rng.choice(specifiers)}" + (f"; {m}" if (m := rng.choice(markers)) else "")
+                )
+                for _ in range(15)
+            }
+            (legacy, legacy_printed), (indexed, indexed_printed) = self._run_both(requirements, exclude_list)
+            self.assertEqual(indexed, legacy)
+            self.assertEqual(indexed_printed, legacy_printed)
+
+    def test_empty_exclude_list_keeps_all(self):
+        requirements = {Requirement("a>=1"), Requirement("b")}
+        self.assertEqual(exclude_from_requirements(requirements, set(), print_requirements=False), requirements)
+
+
 class TestMergeRequirements(unittest.TestCase):
     """Test the merge_requirements function."""
 
@@ -427,6 +1084,132 @@ class TestMergeRequirements(unittest.TestCase):
         self.assertEqual(result.name, "requests")
 
 
+# platforms and Python versions beyond the ones compared in the tested markers
+MINIMIZER_PLATFORMS = ["linux", "win32", "darwin", "cygwin", "freebsd"]
+MINIMIZER_PYTHONS = ["2.7"] + [f"3.{minor}" for minor in range(0, 21)] + ["4.0"]
+
+
+def random_marker(rng, depth: int = 3) -> str:
+    """Random nested and/or marker of sys_platform and python_version comparisons."""
+    if depth == 0 or rng.random() < 0.3:
+        if rng.random() < 0.5:
+            return f"sys_platform {rng.choice(['==', '!='])} '{rng.choice(['linux', 'win32', 'darwin', 'cygwin'])}'"
+        op = rng.choice(["<", "<=", ">", ">=", "==", "!="])
+        return f"python_version {op} '3.{rng.randrange(7, 16)}'"
+    return f"({random_marker(rng, depth - 1)}) {rng.choice(['and', 'or'])} ({random_marker(rng, depth - 1)})"
+
+
+class TestMarkerMinimizer(unittest.TestCase):
+    """Minimized markers and simplified specifiers (marker_minimizer.py) are equivalent to the originals."""
+
+    def assertEquivalentMarkers(self, original, minimized):
+        from packaging.markers import Marker
+
+        original = Marker(str(original))
+        for platform in MINIMIZER_PLATFORMS:
+            for python in MINIMIZER_PYTHONS:
+                environment = {"sys_platform": platform, "python_version": python}
+                expected = original.evaluate(environment)
+                actual = True if minimized is None else minimized.evaluate(environment)
+                self.assertEqual(actual, expected, f"{original} -> {minimized} on {environment}")
+
+    def test_random_markers(self):
+        import random
+
+        from packaging.markers import Marker
+
+        from marker_minimizer import minimize_marker
+
+        rng = random.Random(0)
+        for _ in range(150):
+            marker = Marker(random_marker(rng))
+            minimized = minimize_marker(marker)
+            self.assertEquivalentMarkers(marker, minimized)
+            self.assertLessEqual(len(str(minimized or "")), len(str(marker)))
+
+    @patch("yaml_list_adapter.print_color")
+    def test_merged_exclude_list_markers(self, _mock_print):
+        from marker_minimizer import minimize_marker
+
+        shorter = 0
+        for exclude in (False, True):
+            for platform in (None, "linux_x86_64", "windows", "macos_arm64"):
+                # requirements as merged before (nested markers)
+                with patch("yaml_list_adapter.simplify_requirement", side_effect=lambda requirement: requirement):
+                    adapter = YAMLListAdapter(
+                        "exclude_list.yaml", exclude=exclude, current_platform=platform, use_cache=False
+                    )
+                for requirement in adapter.requirements:
+                    if requirement.marker is None:
+                        continue
+                    minimized = minimize_marker(requirement.marker)
+                    self.assertEquivalentMarkers(requirement.marker, minimized)
+                    shorter += len(str(minimized or "")) < len(str(requirement.marker or ""))
+        self.assertGreater(shorter, 0)
+
+    def test_always_true_and_unsupported_markers(self):
+        from packaging.markers import Marker
+
+        from marker_minimizer import minimize_marker
+
+        self.assertIsNone(minimize_marker(Marker("sys_platform == 'win32' or sys_platform != 'win32'")))
+        self.assertEqual(
+            str(minimize_marker(Marker("(python_version <= '3.8') and (python_version <= '3.10')"))),
+            'python_version < "3.9"',
+        )
+        for text in ("platform_machine == 'x86_64' and sys_platform == 'linux'", "python_version >= '3'"):
+            self.assertEqual(str(minimize_marker(Marker(text))), str(Marker(text)))
+
+    def test_simplify_specifier(self):
+        import random
+
+        from packaging.specifiers import SpecifierSet
+
+        from marker_minimizer import simplify_specifier
+
+        self.assertEqual(str(simplify_specifier(SpecifierSet(">=1.0,>1.5,<3,<=2.0,!=0.5,!=1.7"))), "!=1.7,<=2.0,>1.5")
+        self.assertEqual(str(simplify_specifier(SpecifierSet("==1.5,>=1.0,!=1.2"))), "==1.5")
+        self.assertEqual(str(simplify_specifier(SpecifierSet("==1.*,>=1.2"))), "==1.*,>=1.2")
+        # >1.0 excludes the post-releases of 1.0 which >=1.0.post1 allows
+        self.assertEqual(str(simplify_specifier(SpecifierSet(">1.0,>=1.0.post1"))), ">1.0,>=1.0.post1")
+        self.assertEqual(str(simplify_specifier(SpecifierSet(">1.0,>=1.1"))), ">=1.1")
+
+        versions = [
+            f"{major}.{minor}{suffix}"
+            for major in range(4)
+            for minor in range(0, 10, 3)
+            for suffix in ("", "rc1", ".post1", ".post2", "+local")
+        ]
+        specifiers = [
+            ">=1.0",
+            ">1.3",
+            "<3",
+            "<=2.6",
+            "!=1.6",
+            "!=0.3",
+            "==1.3",
+            "==2.*",
+            "~=1.3",
+            ">=2.0rc1",
+            ">1.0",
+            ">=1.0.post1",
+            ">1.0.post1",
+            "<3.0.post1",
+        ]
+        rng = random.Random(0)
+        for _ in range(1000):
+            specifier = SpecifierSet(",".join(rng.sample(specifiers, rng.randrange(1, 5))))
+            simplified = simplify_specifier(specifier)
+            self.assertLessEqual(len(simplified), len(specifier))
+            for version in versions:
+                for prereleases in (None, True):
+                    self.assertEqual(
+                        simplified.contains(version, prereleases=prereleases),
+                        specifier.contains(version, prereleases=prereleases),
+                        f"{specifier} -> {simplified}: {version}",
+                    )
+
+
 class TestGetNoBinaryArgs(unittest.TestCase):
     """Test the get_no_binary_args function."""
 
@@ -461,6 +1244,30 @@ class TestGetNoBinaryArgs(unittest.TestCase):
         self.assertEqual(result, [])
 
 
+def legacy_find_installable_release(project_name: str, candidates: List[str]) -> Optional[str]:
+    """Mirror of the former linear newest-to-oldest candidate scan of the preflight (tests and benchmarks.py)."""
+    import _helper_functions
+
+    for ver_str in candidates:
+        requires_python = _helper_functions.fetch_pypi_release_requires_python(project_name, ver_str)
+        if current_interpreter_satisfies_requires_python(requires_python):
+            return ver_str
+    return None
+
+
+def release_history(count: int, installable_from: int) -> Dict[str, str]:
+    """Monotonic Requires-Python history ``{version: requires_python}``: releases ``< installable_from`` install."""
+    py_next = f"{sys.version_info.major}.{sys.version_info.minor + 1}"
+    history = {}
+    for i in range(count):
+        history[f"1.{i}"] = (
+            f">={sys.version_info.major}.{min(i, sys.version_info.minor)}"
+            if i < installable_from
+            else f">={py_next}.{i}"
+        )
+    return history
+
+
 class TestPypiRequiresPythonPreflight(unittest.TestCase):
     """PyPI Requires-Python preflight (specifier + project index)."""
 
@@ -538,6 +1345,53 @@ class TestPypiRequiresPythonPreflight(unittest.TestCase):
         skip, _ = pypi_requires_python_preflight_skip(Requirement("somepkg==1.0.0"))
         self.assertFalse(skip)
 
+    def _search(self, history: dict, search):
+        fetched = []
+
+        def _fetch(project_name, version):
+            fetched.append(version)
+            return history[version]
+
+        candidates = sorted(history, key=lambda v: Version(v), reverse=True)
+        with patch("_helper_functions.fetch_pypi_release_requires_python", side_effect=_fetch):
+            return search("pkg", candidates), fetched
+
+    def test_find_installable_release_bisects_monotonic_history(self):
+        for installable_from in (0, 1, 7, 150, 299, 300):
+            with self.subTest(installable_from=installable_from):
+                history = release_history(300, installable_from)
+                found, fetched = self._search(history, find_installable_release)
+                expected, _ = self._search(history, legacy_find_installable_release)
+                self.assertEqual(found is None, expected is None)
+                self.assertEqual(found, f"1.{installable_from - 1}" if installable_from else None)
+                # no installable release is only concluded after checking all of them
+                self.assertLessEqual(len(fetched), 11 if installable_from else len(history))
+                self.assertEqual(len(set(fetched)), len(fetched))
+
+    def test_find_installable_release_falls_back_to_linear_scan(self):
+        # an old release requires a newer Python than the ones after it, the bisection misses "1.6"
+        history = release_history(9, 0)
+        history["1.6"] = f">={sys.version_info.major}.0"
+        history["1.0"] = f">={sys.version_info.major + 1}.0"
+        found, fetched = self._search(history, find_installable_release)
+        self.assertEqual(found, "1.6")
+        self.assertEqual(fetched.count("1.6"), 1)
+
+    def test_find_installable_release_non_monotonic_history(self):
+        # "1.7" installs between releases which do not; the bisection finds none, the linear scan finds it
+        history = release_history(9, 0)
+        history["1.7"] = f">={sys.version_info.major}.0"
+        found, fetched = self._search(history, find_installable_release)
+        self.assertEqual(found, "1.7")
+        self.assertEqual(fetched, ["1.8", "1.4", "1.2", "1.1", "1.0", "1.7"])
+
+        # an installable release found by the bisection decides the preflight, newer ones may be jumped over
+        history["1.2"] = None
+        found, fetched = self._search(history, find_installable_release)
+        self.assertEqual((found, "1.7" in fetched), ("1.2", False))
+        expected, _ = self._search(history, legacy_find_installable_release)
+        self.assertEqual(expected, "1.7")
+
     @patch("_helper_functions.print_color")
     def test_filter_requirements_drops_one(self, _mock_print):
         r_bad = Requirement("idf-component-manager==3.0.0")
@@ -552,6 +1406,1462 @@ class TestPypiRequiresPythonPreflight(unittest.TestCase):
             out = filter_requirements_by_pypi_requires_python({r_bad, r_good})
         self.assertEqual(out, {r_good})
 
+    def test_preflight_runs_projects_concurrently(self):
+        requirements = [Requirement(r) for r in ("c<2", "a>=1", "b==1", "A<3; sys_platform == 'linux'")]
+        barrier = threading.Barrier(3, timeout=5)
+        order = []
+
+        def _skip(req):
+            if req.name != "A":
+                barrier.wait()  # the three projects are checked at the same time
+            order.append(str(req))
+            return (req.name == "b", "incompatible" if req.name == "b" else "")
+
+        with patch("_helper_functions.pypi_requires_python_preflight_skip", side_effect=_skip):
+            results = pypi_requires_python_preflight(requirements)
+        self.assertEqual(results, {r: (r.name == "b", "incompatible" if r.name == "b" else "") for r in requirements})
+        # requirements of one project are checked one after another in one worker
+        self.assertLess(order.index("a>=1"), order.index('A<3; sys_platform == "linux"'))
+
+    @patch("_helper_functions.print_color")
+    def test_filter_requirements_prints_skips_sorted(self, mock_print):
+        requirements = {Requirement(f"pkg-{i}==1") for i in (3, 1, 2)}
+
+        def _skip(req):
+            time.sleep(0.01 * (4 - int(req.name[-1])))  # finish in the reverse of the printed order
+            return (True, "incompatible")
+
+        with patch("_helper_functions.pypi_requires_python_preflight_skip", side_effect=_skip):
+            self.assertEqual(filter_requirements_by_pypi_requires_python(requirements), set())
+        skips = [c.args[0] for c in mock_print.call_args_list if c.args[0].startswith("-- skip")]
+        self.assertEqual(skips, [f"-- skip pkg-{i}==1 (incompatible)" for i in (1, 2, 3)])
+
+
+def _fake_pip_wheel(cmd, **kwargs):
+    """Stand-in for ``pip wheel``: writes ``<requirement>-1.0-py3-none-any.whl`` into ``--wheel-dir``."""
+    wheel_dir = cmd[cmd.index("--wheel-dir") + 1]
+    name = cmd[4]
+    Path(wheel_dir, f"{name}-1.0-py3-none-any.whl").write_bytes(b"wheel")
+    returncode = 1 if name.startswith("broken") else 0
+    return subprocess.CompletedProcess(cmd, returncode, stdout=f"built {name}".encode(), stderr=b"")
+
+
+def _measured(fake_run):
+    """Adapt a ``subprocess.run`` stand-in to ``build_telemetry.run_measured``."""
+
+    def _run_measured(cmd, **kwargs):
+        out = fake_run(cmd, **kwargs)
+        return out, ProcessMeasurement(0.01, 0.01, 0.0, 1024 * 1024, out.returncode)
+
+    return _run_measured
+
+
+class TestRunWheelBuilds(unittest.TestCase):
+    """Test the parallel wheel build engine in build_scheduler.py."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.wheel_dir = os.path.join(self._tmp.name, "downloaded_wheels")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_wheels_moved_into_shared_dir_and_counted(self, _mock_print, _mock_print_color):
+        tasks = [WheelBuildTask(name, [name]) for name in ("alpha", "beta", "broken")]
+        tasks.append(WheelBuildTask("untracked", ["untracked"], tracked=False))
+        with patch("build_scheduler.run_measured", side_effect=_measured(_fake_pip_wheel)):
+            results = run_wheel_builds(tasks, self.wheel_dir, jobs=4)
+
+        self.assertEqual([r.task for r in results], tasks)
+        self.assertEqual(results[0].wheels, ["alpha-1.0-py3-none-any.whl"])
+        self.assertEqual(
+            sorted(os.listdir(self.wheel_dir)),
+            [f"{n}-1.0-py3-none-any.whl" for n in ("alpha", "beta", "broken", "untracked")],
+        )
+        # staging directories are removed
+        self.assertEqual(os.listdir(self._tmp.name), ["downloaded_wheels"])
+        self.assertEqual(count_results(results), {"failed": 1, "succeeded": 2})
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_builds_run_concurrently(self, _mock_print, _mock_print_color):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def _concurrent_pip_wheel(cmd, **kwargs):
+            barrier.wait()  # raises BrokenBarrierError unless all three builds run at the same time
+            return _fake_pip_wheel(cmd, **kwargs)
+
+        tasks = [WheelBuildTask(name, [name]) for name in ("a", "b", "c")]
+        with patch("build_scheduler.run_measured", side_effect=_measured(_concurrent_pip_wheel)):
+            results = run_wheel_builds(tasks, self.wheel_dir, jobs=3)
+        self.assertEqual(count_results(results), {"failed": 0, "succeeded": 3})
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_build_output_printed_per_build(self, mock_print, _mock_print_color):
+        tasks = [WheelBuildTask(name, [name]) for name in ("a", "b")]
+        with patch("build_scheduler.run_measured", side_effect=_measured(_fake_pip_wheel)):
+            run_wheel_builds(tasks, self.wheel_dir, jobs=1)
+        self.assertEqual([c.args[0] for c in mock_print.call_args_list], ["built a", "built b"])
+
+
+def _fake_pip_wheel_batch(cmd, **kwargs):
+    """Stand-in for ``pip wheel -r``: builds every requirement of the file, fails if any of them is broken."""
+    if "-r" not in cmd:
+        return _fake_pip_wheel(cmd, **kwargs)
+    wheel_dir = cmd[cmd.index("--wheel-dir") + 1]
+    names = Path(cmd[cmd.index("-r") + 1]).read_text().split()
+    for name in names:
+        if not name.startswith("broken"):
+            Path(wheel_dir, f"{name}-1.0-py3-none-any.whl").write_bytes(b"wheel")
+    returncode = 1 if any(name.startswith("broken") for name in names) else 0
+    return subprocess.CompletedProcess(cmd, returncode, stdout=f"built {' '.join(names)}".encode(), stderr=b"")
+
+
+class TestBatchedWheelBuilds(unittest.TestCase):
+    """Test batched ``pip wheel -r`` builds with bisection of failing batches."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.wheel_dir = os.path.join(self._tmp.name, "downloaded_wheels")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_successful_batch_runs_pip_once(self, _mock_print, _mock_print_color):
+        tasks = [WheelBuildTask(name, [name, "--find-links", "x"]) for name in ("a", "b", "c", "d")]
+        with patch("build_scheduler.run_measured", side_effect=_measured(_fake_pip_wheel_batch)) as run:
+            results = run_batched_wheel_builds(tasks, self.wheel_dir, jobs=2)
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(count_results(results), {"failed": 0, "succeeded": 4})
+        self.assertEqual([r.wheels for r in results], [[f"{n}-1.0-py3-none-any.whl"] for n in "abcd"])
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_failing_batch_is_bisected(self, _mock_print, _mock_print_color):
+        names = ["a", "b", "broken1", "c", "d", "e", "broken2", "f"]
+        tasks = [WheelBuildTask(name, [name, "--find-links", "x"]) for name in names]
+        with patch("build_scheduler.run_measured", side_effect=_measured(_fake_pip_wheel_batch)) as run:
+            results = run_batched_wheel_builds(tasks, self.wheel_dir, jobs=4)
+        self.assertEqual(count_results(results), {"failed": 2, "succeeded": 6})
+        self.assertEqual([r.task for r in results], tasks)
+        self.assertEqual([r.task.requirement for r in results if r.returncode != 0], ["broken1", "broken2"])
+        # 8 -> 4 + 4 -> 2 + 2 + 2 + 2 (three fail) -> 1 + 1 + 1 + 1
+        self.assertEqual(run.call_count, 11)
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_batches_grouped_by_arguments(self, _mock_print, _mock_print_color):
+        tasks = [
+            WheelBuildTask("a", ["a", "--find-links", "x"]),
+            WheelBuildTask("b", ["b", "--find-links", "x", "--no-binary", "b"]),
+            WheelBuildTask("d", ["d", "--find-links", "x", "--no-binary", "b"]),
+            WheelBuildTask("c", ["c", "--find-links", "x"]),
+            WheelBuildTask("untracked", ["other", "--only-binary", "other"], tracked=False),
+        ]
+        with patch("build_scheduler.run_measured", side_effect=_measured(_fake_pip_wheel_batch)) as run:
+            results = run_batched_wheel_builds(tasks, self.wheel_dir, jobs=1)
+        self.assertEqual(count_results(results), {"failed": 0, "succeeded": 4})
+        commands = sorted(call.args[0][4:] for call in run.call_args_list)
+        self.assertEqual(len(commands), 3)
+        self.assertIn(["other", "--only-binary", "other"], [c[: c.index("--wheel-dir")] for c in commands])
+        self.assertIn(["--find-links", "x", "--no-binary", "b"], [c[2 : c.index("--wheel-dir")] for c in commands])
+
+
+class TestBuildTelemetry(unittest.TestCase):
+    """Test measurement of subprocesses and the build report (build_telemetry.py)."""
+
+    def test_run_measured(self):
+        code = (
+            "import sys; data = bytearray(64 * 1024 * 1024); print('out'); print('err', file=sys.stderr); sys.exit(3)"
+        )
+        out, measurement = run_measured([sys.executable, "-c", code], text=True)
+        self.assertEqual((out.returncode, out.stdout.strip(), out.stderr.strip()), (3, "out", "err"))
+        self.assertEqual(measurement.returncode, 3)
+        self.assertGreater(measurement.wall_time, 0)
+        if hasattr(os, "wait4"):
+            self.assertGreaterEqual(measurement.max_rss, 64 * 1024 * 1024)
+            self.assertGreater(measurement.user_time + measurement.system_time, 0)
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_builds_recorded(self, _mock_print, _mock_print_color):
+        telemetry = BuildTelemetry()
+        with tempfile.TemporaryDirectory() as tmp, patch("build_scheduler.get_telemetry", return_value=telemetry):
+            with patch("build_scheduler.run_measured", side_effect=_measured(_fake_pip_wheel)):
+                run_wheel_builds([WheelBuildTask(n, [n]) for n in ("a", "broken")], os.path.join(tmp, "w"), jobs=1)
+        records = sorted(telemetry.records, key=lambda r: r["label"])
+        self.assertEqual(
+            [(r["kind"], r["label"], r["returncode"]) for r in records],
+            [("pip wheel", "a", 0), ("pip wheel", "broken", 1)],
+        )
+        self.assertEqual(records[0]["wheels"], ["a-1.0-py3-none-any.whl"])
+        self.assertEqual(records[0]["wheel_bytes"], len(b"wheel"))
+
+    @patch("build_telemetry.print_color")
+    @patch("builtins.print")
+    def test_report_appended_and_slowest_sorted(self, mock_print, _mock_print_color):
+        telemetry = BuildTelemetry()
+        for i in range(25):
+            telemetry.record("pip wheel", f"pkg{i}", ProcessMeasurement(float(i), 1.0, 0.5, 2048, 0), [], 10)
+        self.assertEqual([r["label"] for r in telemetry.slowest()][:3], ["pkg24", "pkg23", "pkg22"])
+        self.assertEqual(len(telemetry.slowest()), 20)
+        telemetry.print_slowest()
+        self.assertEqual(len(mock_print.call_args_list), 21)  # header + 20 rows
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "build_report.json")
+            telemetry.write_report("build_wheels.py", path)
+            BuildTelemetry().write_report("repair_wheels.py", path)
+            report = json.loads(Path(path).read_text())
+        self.assertEqual([run["script"] for run in report["runs"]], ["build_wheels.py", "repair_wheels.py"])
+        self.assertEqual(report["runs"][0]["totals"]["processes"], 25)
+        self.assertEqual(report["runs"][0]["totals"]["wheel_bytes"], 250)
+
+
+_FAKE_AUDITWHEEL = """\
+import shutil
+import sys
+from pathlib import Path
+
+wheel, out_dir = Path(sys.argv[2]), Path(sys.argv[4])
+if "broken" in wheel.name:
+    sys.exit("ValueError: Cannot repair " + wheel.name)
+if "crashing" in wheel.name:
+    sys.exit(139)
+if "bundled" in wheel.name:
+    shutil.copy(wheel, out_dir / wheel.name.replace("linux_x86_64", "manylinux_2_17_x86_64"))
+    print("Fixed-up wheel written")
+"""
+
+
+def _make_wheel(directory: Path, name: str) -> Path:
+    import zipfile
+
+    path = directory / name
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(zipfile.ZipInfo("pkg/__init__.py", date_time=(2026, 1, 1, 0, 0, 0)), "")
+    return path
+
+
+@unittest.skipUnless(os.name == "posix", "fake auditwheel is an executable script")
+class TestRepairWheels(unittest.TestCase):
+    """Test the parallel repair of wheels (repair_wheels.py) with a fake auditwheel."""
+
+    WHEELS = [
+        *(f"bundled{i}-1.0-cp311-cp311-linux_x86_64.whl" for i in range(4)),
+        *(f"compatible{i}-1.0-cp311-cp311-linux_x86_64.whl" for i in range(2)),
+        "broken-1.0-cp311-cp311-linux_x86_64.whl",
+        "other-1.0-cp311-cp311-linux_aarch64.whl",
+        "pure-1.0-py3-none-any.whl",
+    ]
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        bin_dir = Path(self._tmp.name, "bin")
+        bin_dir.mkdir()
+        auditwheel = bin_dir / "auditwheel"
+        auditwheel.write_text(f"#!{sys.executable}\n{_FAKE_AUDITWHEEL}")
+        auditwheel.chmod(0o755)
+        path = patch.dict(os.environ, {"PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}"})
+        path.start()
+        self.addCleanup(path.stop)
+
+    def _repair(self, jobs: int, run: str = "", cache=None):
+        import contextlib
+        import io
+
+        from repair_wheels import repair_wheels
+
+        root = Path(self._tmp.name, f"jobs{jobs}{run}")
+        wheels_dir, temp_root = root / "wheels", root / "temp"
+        wheels_dir.mkdir(parents=True)
+        temp_root.mkdir()
+        wheels = [_make_wheel(wheels_dir, name) for name in self.WHEELS]
+        telemetry = BuildTelemetry()
+        output = io.StringIO()
+        with patch("repair_wheels.get_telemetry", return_value=telemetry), contextlib.redirect_stdout(output):
+            outcomes = repair_wheels(wheels, temp_root, "Linux", "x86_64", jobs=jobs, cache=cache)
+        self.assertEqual(list(temp_root.iterdir()), [])  # scratch directories removed
+        return outcomes, sorted(p.name for p in wheels_dir.iterdir()), output.getvalue(), telemetry.records
+
+    def test_outcomes(self):
+        outcomes, wheels, _, records = self._repair(jobs=1)
+        self.assertEqual(
+            [outcome.status for outcome in outcomes], ["repaired"] * 4 + ["kept"] * 2 + ["error", "kept", "kept"]
+        )
+        self.assertEqual(
+            [outcome.detail for outcome in outcomes if outcome.detail],
+            [
+                "broken-1.0-cp311-cp311-linux_x86_64.whl: ValueError: Cannot repair broken-1.0-cp311-cp311-linux_x86_64.whl"
+            ],
+        )
+        self.assertIn("bundled0-1.0-cp311-cp311-manylinux_2_17_x86_64.whl", wheels)
+        self.assertNotIn("bundled0-1.0-cp311-cp311-linux_x86_64.whl", wheels)
+        self.assertEqual(len(records), 7)  # one auditwheel run per Linux x86_64 wheel
+
+    def test_parallel_same_as_sequential(self):
+        outcomes, wheels, output, records = self._repair(jobs=1)
+        parallel_outcomes, parallel_wheels, parallel_output, parallel_records = self._repair(jobs=4)
+        self.assertEqual([(o.status, o.detail) for o in parallel_outcomes], [(o.status, o.detail) for o in outcomes])
+        self.assertEqual(parallel_wheels, wheels)
+        # output of each wheel is printed as one block in the order of the wheels
+        self.assertEqual(parallel_output, output)
+        self.assertEqual(
+            [(r["label"], r["wheels"]) for r in parallel_records], [(r["label"], r["wheels"]) for r in records]
+        )
+
+    def test_unrecognised_tool_failure(self):
+        import contextlib
+        import io
+
+        from repair_wheels import repair_wheel
+
+        wheel = _make_wheel(Path(self._tmp.name), "crashing-1.0-cp311-cp311-linux_x86_64.whl")
+        temp_dir = Path(self._tmp.name, "temp")
+        temp_dir.mkdir()
+        with patch("repair_wheels.get_telemetry", return_value=BuildTelemetry()):
+            with contextlib.redirect_stdout(io.StringIO()):
+                outcome = repair_wheel(wheel, temp_dir, "Linux", "x86_64", prescan=False)
+        self.assertEqual((outcome.status, outcome.detail), ("error", f"{wheel.name}: "))
+        self.assertTrue(wheel.exists())
+
+    @patch("repair_cache.tool_version", return_value="6.1.0")
+    def test_cache_replays_outcomes(self, _mock_version):
+        from repair_cache import RepairCache
+
+        cache = RepairCache(Path(self._tmp.name, "cache"), max_size=10 * 1024 * 1024)
+        outcomes, wheels, _, records = self._repair(jobs=1, cache=cache)
+        self.assertEqual(len(records), 7)
+        self.assertFalse(any(outcome.cached for outcome in outcomes))
+
+        # same input wheels again: auditwheel runs only for the failed repair, same result
+        cached_outcomes, cached_wheels, output, cached_records = self._repair(jobs=1, run="again", cache=cache)
+        self.assertEqual([r["label"] for r in cached_records], ["broken-1.0-cp311-cp311-linux_x86_64.whl"])
+        self.assertEqual(cached_wheels, wheels)
+        self.assertEqual([o.status for o in cached_outcomes], [o.status for o in outcomes])
+        # replayed: repaired and already compatible wheels; failed repairs and skipped wheels are not cached
+        self.assertEqual([o.cached for o in cached_outcomes], [True] * 6 + [False] * 3)
+        self.assertIn("Replaced with wheel from the repair cache", output)
+        self.assertIn("broken-1.0-cp311-cp311-linux_x86_64.whl: ValueError", cached_outcomes[6].detail)
+
+    @patch("repair_cache.tool_version", return_value="6.1.0")
+    def test_cache_key(self, mock_version):
+        from repair_cache import RepairCache
+
+        cache = RepairCache(Path(self._tmp.name, "cache"))
+        wheel = _make_wheel(Path(self._tmp.name), "alpha-1.0-cp311-cp311-linux_x86_64.whl")
+        key = cache.key_for(wheel, "auditwheel")
+        self.assertEqual(cache.key_for(wheel, "auditwheel"), key)
+        mock_version.return_value = "6.2.0"
+        self.assertNotEqual(cache.key_for(wheel, "auditwheel"), key)
+        mock_version.return_value = "6.1.0"
+        wheel.write_bytes(wheel.read_bytes() + b"\0")
+        self.assertNotEqual(cache.key_for(wheel, "auditwheel"), key)
+        mock_version.return_value = None
+        self.assertIsNone(cache.key_for(wheel, "auditwheel"))
+
+    @patch("repair_cache.tool_version", return_value="6.1.0")
+    def test_corrupt_cache_entry_is_a_miss(self, _mock_version):
+        from repair_cache import RepairCache
+
+        cache = RepairCache(Path(self._tmp.name, "cache"))
+        self._repair(jobs=1, cache=cache)
+        for cached_wheel in cache.directory.glob("*/*/*.whl"):
+            cached_wheel.write_bytes(b"corrupt")
+        outcomes, wheels, _, records = self._repair(jobs=1, run="again", cache=cache)
+        self.assertEqual(len(records), 5)  # bundled wheels repaired again
+        self.assertEqual([o.cached for o in outcomes[:6]], [False] * 4 + [True] * 2)
+        self.assertIn("bundled0-1.0-cp311-cp311-manylinux_2_17_x86_64.whl", wheels)
+
+
+def _elf(machine=62, needed=(), glibc=(), code=0, debug=0):
+    """Minimal little endian ELF64 shared library with DT_NEEDED entries and GLIBC_x.y version needs.
+
+    ``code`` bytes are placed before the dynamic segment (as the code of a real library), ``debug`` bytes after it.
+    """
+    import struct
+
+    base = 0x1000  # virtual address of the loaded file
+    strings = b"\0"
+    offsets = {}
+    for name in (*needed, "libc.so.6", *(f"GLIBC_{version}" for version in glibc)):
+        offsets[name] = len(strings)
+        strings += name.encode() + b"\0"
+    verneed = struct.pack("<HHIII", 1, len(glibc), offsets["libc.so.6"], 16, 0) + b"".join(
+        struct.pack("<IHHII", 0, 0, 2 + i, offsets[f"GLIBC_{version}"], 16 if i < len(glibc) - 1 else 0)
+        for i, version in enumerate(glibc)
+    )
+    strings_offset = 64 + 2 * 56
+    verneed_offset = strings_offset + len(strings)
+    dynamic_offset = verneed_offset + len(verneed) + code
+    entries = [(1, offsets[name]) for name in needed] + [(5, base + strings_offset), (10, len(strings))]
+    if glibc:
+        entries += [(0x6FFFFFFE, base + verneed_offset), (0x6FFFFFFF, 1)]
+    dynamic = b"".join(struct.pack("<qQ", tag, value) for tag, value in [*entries, (0, 0)])
+    loaded = dynamic_offset + len(dynamic)
+    header = b"\x7fELF" + bytes([2, 1, 1]) + bytes(9)
+    header += struct.pack("<HHIQQQIHHHHHH", 3, machine, 1, 0, 64, 0, 0, 64, 56, 2, 64, 0, 0)
+    segments = struct.pack("<IIQQQQQQ", 1, 5, 0, base, base, loaded, loaded, 0x1000)
+    segments += struct.pack("<IIQQQQQQ", 2, 6, dynamic_offset, base + dynamic_offset, 0, len(dynamic), 0, 8)
+    return header + segments + strings + verneed + bytes(code) + dynamic + bytes(debug)
+
+
+def _make_binary_wheel(directory: Path, name: str, members: dict, compression: int = 0) -> Path:
+    import zipfile
+
+    path = directory / name
+    with zipfile.ZipFile(path, "w", compression) as archive:
+        archive.writestr("pkg/__init__.py", "")
+        archive.writestr(f"{name.split('-')[0]}-1.0.dist-info/RECORD", "")
+        for member, data in members.items():
+            archive.writestr(member, data)
+    return path
+
+
+class TestWheelPrescan(unittest.TestCase):
+    """Test the prescan of native binaries in wheels (wheel_prescan.py)."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+
+    def test_elf(self):
+        from wheel_prescan import BinaryInfo
+        from wheel_prescan import prescan_wheel
+
+        elf = _elf(needed=("libfoo.so.1", "libm.so.6", "libc.so.6"), glibc=("2.17", "2.28", "2.3.4"))
+        wheel = _make_binary_wheel(self.root, "alpha-1.0-cp311-cp311-linux_x86_64.whl", {"alpha/_core.so": elf})
+        scan = prescan_wheel(wheel)
+        self.assertEqual(
+            scan.binaries,
+            (BinaryInfo("alpha/_core.so", "elf", ("x86_64",), ("libfoo.so.1", "libm.so.6", "libc.so.6"), (2, 28)),),
+        )
+        self.assertEqual(scan.external_libraries(), ["libfoo.so.1"])
+        self.assertEqual(scan.max_glibc, (2, 28))
+
+    def test_elf_reads_only_the_dynamic_ranges(self):
+        import zipfile
+
+        from wheel_prescan import prescan_wheel
+
+        elf = _elf(needed=("libfoo.so.1",), glibc=("2.28",), code=3 * 1024 * 1024, debug=8 * 1024 * 1024)
+        for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            wheel = _make_binary_wheel(
+                self.root, f"alpha{compression}-1.0-cp311-cp311-linux_x86_64.whl", {"alpha/_core.so": elf}, compression
+            )
+            read = zipfile.ZipExtFile.read
+            returned = []
+
+            def _read(member, *args):
+                data = read(member, *args)
+                returned.append(len(data))
+                return data
+
+            with patch.object(zipfile.ZipExtFile, "read", _read):
+                (binary,) = prescan_wheel(wheel).binaries
+            self.assertEqual((binary.needed, binary.glibc), (("libfoo.so.1",), (2, 28)))
+            # nothing after the dynamic segment is read
+            self.assertLessEqual(sum(returned), len(elf) - 8 * 1024 * 1024)
+
+    def test_bundled_library_is_not_external(self):
+        from wheel_prescan import prescan_wheel
+
+        members = {"alpha/_core.so": _elf(needed=("libfoo-1a2b3c.so.1",)), "alpha.libs/libfoo-1a2b3c.so.1": _elf()}
+        scan = prescan_wheel(_make_binary_wheel(self.root, "alpha-1.0-cp311-cp311-linux_x86_64.whl", members))
+        self.assertEqual(len(scan.binaries), 2)
+        self.assertEqual(scan.external_libraries(), [])
+
+    def test_macho_pe_and_non_binaries(self):
+        import struct
+
+        from wheel_prescan import prescan_wheel
+
+        universal = b"\xca\xfe\xba\xbe" + struct.pack(">I", 2)
+        universal += struct.pack(">iiIII", 0x01000007, 3, 4096, 4096, 12) + struct.pack(
+            ">iiIII", 0x0100000C, 0, 0, 0, 14
+        )
+        thin = b"\xcf\xfa\xed\xfe" + struct.pack("<i", 0x0100000C) + bytes(24)
+        pe = b"MZ" + bytes(0x3A) + struct.pack("<I", 0x40) + b"PE\0\0" + struct.pack("<H", 0x8664) + bytes(18)
+        members = {
+            "alpha/_universal.so": universal + bytes(64),
+            "alpha/_thin.so": thin,
+            "alpha/_core.pyd": pe,
+            "alpha/data.bin": _elf(),  # not a candidate name
+            "alpha/README": b"text",
+        }
+        scan = prescan_wheel(_make_binary_wheel(self.root, "alpha-1.0-cp311-cp311-win_amd64.whl", members))
+        self.assertEqual(
+            {binary.path: (binary.format, binary.archs) for binary in scan.binaries},
+            {
+                "alpha/_universal.so": ("mach-o", ("x86_64", "arm64")),
+                "alpha/_thin.so": ("mach-o", ("arm64",)),
+                "alpha/_core.pyd": ("pe", ("AMD64",)),
+            },
+        )
+
+    def test_linux_repair_verdict(self):
+        from wheel_prescan import NO_REPAIR_NEEDED
+        from wheel_prescan import TOO_RECENT_SYMBOLS
+        from wheel_prescan import linux_repair_verdict
+        from wheel_prescan import prescan_wheel
+
+        policy = ((2, 34), "x86_64")
+
+        def _verdict(name, elf, arch="x86_64", target=policy):
+            scan = prescan_wheel(_make_binary_wheel(self.root, name, {"alpha/_core.so": elf}))
+            return linux_repair_verdict(scan, name, arch, target)
+
+        manylinux = "alpha-1.0-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl"
+        self.assertEqual(_verdict(manylinux, _elf(needed=("libm.so.6",), glibc=("2.17",))), NO_REPAIR_NEEDED)
+        self.assertEqual(_verdict(manylinux, _elf(glibc=("2.35",))), TOO_RECENT_SYMBOLS)
+        # auditwheel decides: external library, linux_ tag to be retagged, tag older than the symbols,
+        # other architecture, unknown target policy
+        self.assertIsNone(_verdict(manylinux, _elf(needed=("libfoo.so.1",))))
+        self.assertIsNone(_verdict("alpha-1.0-cp311-cp311-linux_x86_64.whl", _elf()))
+        self.assertIsNone(_verdict(manylinux, _elf(glibc=("2.28",))))
+        self.assertIsNone(_verdict(manylinux, _elf(machine=183)))
+        self.assertIsNone(_verdict(manylinux, _elf(), target=None))
+
+    @unittest.skipUnless(os.name == "posix", "fake auditwheel is an executable script")
+    def test_repair_skips_auditwheel(self):
+        import contextlib
+        import io
+
+        from repair_wheels import repair_wheels
+
+        bin_dir = self.root / "bin"
+        bin_dir.mkdir()
+        (bin_dir / "auditwheel").write_text(f"#!{sys.executable}\n{_FAKE_AUDITWHEEL}")
+        (bin_dir / "auditwheel").chmod(0o755)
+        wheels_dir = self.root / "wheels"
+        wheels_dir.mkdir()
+        wheels = [
+            _make_binary_wheel(wheels_dir, "compliant-1.0-cp311-cp311-manylinux_2_17_x86_64.whl", {"c/_c.so": _elf()}),
+            _make_binary_wheel(
+                wheels_dir, "recent-1.0-cp311-cp311-linux_x86_64.whl", {"r/_r.so": _elf(glibc=("2.39",))}
+            ),
+            _make_binary_wheel(wheels_dir, "bundled-1.0-cp311-cp311-linux_x86_64.whl", {"b/_b.so": _elf()}),
+        ]
+        environment = {"PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}", "AUDITWHEEL_PLAT": "manylinux_2_34_x86_64"}
+        telemetry = BuildTelemetry()
+        with patch.dict(os.environ, environment), patch("repair_wheels.get_telemetry", return_value=telemetry):
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                outcomes = repair_wheels(wheels, self.root, "Linux", "x86_64")
+        self.assertEqual(
+            [(o.status, o.prescanned) for o in outcomes], [("kept", True), ("kept", True), ("repaired", False)]
+        )
+        self.assertEqual([r["label"] for r in telemetry.records], ["bundled-1.0-cp311-cp311-linux_x86_64.whl"])
+        self.assertIn("requires GLIBC 2.39, target policy allows 2.34", output.getvalue())
+
+
+def _moto_available() -> bool:
+    try:
+        import moto  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@unittest.skipUnless(_moto_available(), "moto (local S3 stand-in) is not installed")
+class TestUploadWheels(unittest.TestCase):
+    """Test the incremental, concurrent upload of upload_wheels.py against moto."""
+
+    def setUp(self):
+        import boto3
+        import moto
+
+        from upload_wheels import make_client
+
+        environment = patch.dict(
+            os.environ,
+            {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing", "AWS_DEFAULT_REGION": "us-east-1"},
+        )
+        environment.start()
+        self.addCleanup(environment.stop)
+        mock = moto.mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        self.client = make_client(jobs=4)
+        self.client.create_bucket(Bucket="wheels")
+        self.bucket = boto3.resource("s3").Bucket("wheels")
+
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.wheels_dir = Path(self._tmp.name)
+
+    def _wheel(self, name: str, data: bytes, subdir: str = "") -> None:
+        directory = self.wheels_dir / subdir
+        directory.mkdir(exist_ok=True)
+        (directory / name).write_bytes(data)
+
+    @patch("upload_wheels.print_color")
+    @patch("builtins.print")
+    def _upload(self, _mock_print, _mock_print_color, force=False, jobs=4, listed=True, **kwargs):
+        from upload_wheels import collect_wheel_paths
+        from upload_wheels import get_existing_wheels
+        from upload_wheels import upload_wheels
+
+        with patch.object(self.client, "upload_file", wraps=self.client.upload_file) as mock_upload:
+            stats = upload_wheels(
+                self.client,
+                "wheels",
+                collect_wheel_paths(str(self.wheels_dir)),
+                get_existing_wheels(self.client, "wheels") if listed else None,
+                force,
+                jobs=jobs,
+                **kwargs,
+            )
+        return stats, sorted(call.args[2] for call in mock_upload.call_args_list)
+
+    def test_incremental_upload(self):
+        large = os.urandom(9 * 1024 * 1024)  # above the multipart threshold
+        self._wheel("Foo_Bar-1.0-py3-none-any.whl", b"foo")
+        self._wheel("large-2.0-cp311-cp311-linux_x86_64.whl", large, subdir="nested")
+        stats, uploaded = self._upload()
+        self.assertEqual((stats.new, stats.updated, stats.skipped), (2, 0, 0))
+        self.assertEqual(
+            uploaded,
+            ["pypi/foo-bar/Foo_Bar-1.0-py3-none-any.whl", "pypi/large/large-2.0-cp311-cp311-linux_x86_64.whl"],
+        )
+        self.assertEqual(stats.bytes_uploaded, 3 + len(large))
+
+        # unchanged wheels are skipped (single part and multipart ETag), changed and new ones uploaded
+        self._wheel("Foo_Bar-1.0-py3-none-any.whl", b"foo2")
+        self._wheel("baz-0.1-py3-none-any.whl", b"baz")
+        stats, uploaded = self._upload()
+        self.assertEqual((stats.new, stats.updated, stats.skipped), (1, 1, 1))
+        self.assertEqual(uploaded, ["pypi/baz/baz-0.1-py3-none-any.whl", "pypi/foo-bar/Foo_Bar-1.0-py3-none-any.whl"])
+        self.assertEqual((stats.bytes_uploaded, stats.bytes_skipped), (7, len(large)))
+        self.assertEqual(self.bucket.Object("pypi/foo-bar/Foo_Bar-1.0-py3-none-any.whl").get()["Body"].read(), b"foo2")
+
+        stats, uploaded = self._upload(force=True)
+        self.assertEqual((stats.updated, stats.skipped), (3, 0))
+
+    def test_multipart_upload_with_other_part_size(self):
+        import hashlib
+
+        from upload_wheels import transfer_config
+
+        data = os.urandom(12 * 1024 * 1024)
+        self._wheel("large-2.0-cp311-cp311-linux_x86_64.whl", data)
+        key = "pypi/large/large-2.0-cp311-cp311-linux_x86_64.whl"
+        config = transfer_config(chunk_size=5 * 1024 * 1024, multipart_threshold=5 * 1024 * 1024)
+        path = str(self.wheels_dir / "large-2.0-cp311-cp311-linux_x86_64.whl")
+        # ETag of 5 MiB parts does not match the default 8 MiB parts; the sha256 metadata decides
+        self.bucket.upload_file(path, key, Config=config, ExtraArgs={"Metadata": {"sha256": "0" * 64}})
+        stats, uploaded = self._upload()
+        self.assertEqual(uploaded, [key])
+        self.bucket.upload_file(
+            path, key, Config=config, ExtraArgs={"Metadata": {"sha256": hashlib.sha256(data).hexdigest()}}
+        )
+        stats, uploaded = self._upload()
+        self.assertEqual((uploaded, stats.skipped), ([], 1))
+        # uploaded with the same part size: the ETag matches
+        stats, uploaded = self._upload(config=config)
+        self.assertEqual((uploaded, stats.skipped), ([], 1))
+
+    def test_concurrent_upload_same_as_serial(self):
+        for i in range(12):
+            self._wheel(f"pkg{i}-1.0-py3-none-any.whl", os.urandom(1024 * (i + 1)), subdir=f"dir{i % 3}")
+        stats, uploaded = self._upload(jobs=1)
+        serial = {obj.key: obj.e_tag for obj in self.bucket.objects.all()}
+        self.client.delete_objects(Bucket="wheels", Delete={"Objects": [{"Key": key} for key in serial]})
+
+        parallel_stats, parallel_uploaded = self._upload(jobs=8)
+        self.assertEqual(parallel_uploaded, uploaded)
+        self.assertEqual({obj.key: obj.e_tag for obj in self.bucket.objects.all()}, serial)
+        self.assertEqual((parallel_stats.new, parallel_stats.bytes_uploaded), (stats.new, stats.bytes_uploaded))
+
+    @patch("upload_wheels.RETRY_BACKOFF", 0)
+    def test_failed_upload_retried(self):
+        self._wheel("alpha-1.0-py3-none-any.whl", b"alpha")
+        self._wheel("broken-1.0-py3-none-any.whl", b"broken")
+        upload_file = self.client.upload_file
+        attempts = {"alpha": 0, "broken": 0}
+
+        def _flaky_upload(path, bucket, key, **kwargs):
+            name = key.split("/")[1]
+            attempts[name] += 1
+            if name == "broken" or attempts[name] == 1:
+                raise OSError(f"connection reset ({name})")
+            return upload_file(path, bucket, key, **kwargs)
+
+        with patch.object(self.client, "upload_file", side_effect=_flaky_upload):
+            stats, _ = self._upload(retries=2)
+        self.assertEqual(attempts, {"alpha": 2, "broken": 3})
+        self.assertEqual((stats.new, stats.retried), (1, 3))
+        self.assertEqual(stats.failed, ["pypi/broken/broken-1.0-py3-none-any.whl: connection reset (broken)"])
+
+    @patch("upload_wheels.RETRY_BACKOFF", 0)
+    def test_failed_lookup_retried(self):
+        from botocore.exceptions import ClientError
+
+        self._wheel("alpha-1.0-py3-none-any.whl", b"alpha")
+        self._wheel("broken-1.0-py3-none-any.whl", b"broken")
+        self._wheel("flaky-1.0-py3-none-any.whl", b"flaky")
+        head_object = self.client.head_object
+        lookups = {"alpha": 0, "broken": 0, "flaky": 0}
+
+        def _throttled_head(**kwargs):
+            name = kwargs["Key"].split("/")[1]
+            lookups[name] += 1
+            if name == "broken" or (name == "flaky" and lookups[name] == 1):
+                raise ClientError({"Error": {"Code": "SlowDown", "Message": "Reduce your request rate"}}, "HeadObject")
+            return head_object(**kwargs)
+
+        # a failed lookup (not found is not a failure) neither aborts the run nor the other uploads
+        with patch.object(self.client, "head_object", side_effect=_throttled_head):
+            stats, uploaded = self._upload(listed=False, retries=2)
+        self.assertEqual(lookups, {"alpha": 1, "broken": 3, "flaky": 2})
+        self.assertEqual(uploaded, ["pypi/alpha/alpha-1.0-py3-none-any.whl", "pypi/flaky/flaky-1.0-py3-none-any.whl"])
+        self.assertEqual((stats.new, stats.retried), (2, 3))
+        self.assertEqual(len(stats.failed), 1)
+        self.assertIn("pypi/broken/broken-1.0-py3-none-any.whl: ", stats.failed[0])
+        self.assertIn("SlowDown", stats.failed[0])
+
+    def _interrupted_run(self, journal_file):
+        """Upload with a journal; the upload of ``broken`` fails, so the run does not finish."""
+        from upload_wheels import UploadJournal
+
+        self._wheel("alpha-1.0-py3-none-any.whl", b"alpha")
+        self._wheel("broken-1.0-py3-none-any.whl", b"broken")
+        # nested layout: the same file name in two directories
+        self._wheel("dup-1.0-py3-none-any.whl", b"dup", subdir="linux")
+        self._wheel("dup-1.0-py3-none-any.whl", b"dup", subdir="macos")
+        upload_file = self.client.upload_file
+
+        def _failing_upload(path, bucket, key, **kwargs):
+            if "broken" in key:
+                raise OSError("connection reset")
+            return upload_file(path, bucket, key, **kwargs)
+
+        journal = UploadJournal(journal_file)
+        self.assertFalse(journal.start("wheels"))
+        with patch.object(self.client, "upload_file", side_effect=_failing_upload):
+            stats, _ = self._upload(retries=0, journal=journal)
+        self.assertEqual((stats.new, len(stats.failed)), (3, 1))
+        return journal
+
+    def test_interrupted_upload_resumed_from_journal(self):
+        from upload_wheels import UploadJournal
+        from upload_wheels import journal_path
+
+        journal_file = self.wheels_dir.parent / f"{self.wheels_dir.name}-journal.jsonl"
+        self.addCleanup(journal_file.unlink, missing_ok=True)
+        first = self._interrupted_run(journal_file)
+
+        journal = UploadJournal(journal_file)
+        self.assertTrue(journal.start("wheels"))
+        self.assertEqual(journal.run, first.run)
+        completed = ["alpha-1.0-py3-none-any.whl", "linux/dup-1.0-py3-none-any.whl", "macos/dup-1.0-py3-none-any.whl"]
+        self.assertEqual(sorted(journal.completed), [journal_path(str(self.wheels_dir / path)) for path in completed])
+        self.assertEqual(journal.verify_tail(self.client, "wheels"), [])
+        stats, uploaded = self._upload(listed=False, journal=journal)
+        self.assertEqual(uploaded, ["pypi/broken/broken-1.0-py3-none-any.whl"])
+        self.assertEqual((stats.new, stats.journaled, stats.skipped), (1, 3, 0))
+
+        # the resumed run finished: the next one starts anew (and records unchanged wheels as skipped)
+        journal = UploadJournal(journal_file)
+        self.assertFalse(journal.start("wheels"))
+        self.assertNotEqual(journal.run, first.run)
+        stats, uploaded = self._upload(journal=journal)
+        self.assertEqual((uploaded, stats.skipped), ([], 4))
+        entries = [json.loads(line) for line in journal_file.read_text().splitlines()]
+        actions = [entry["action"] for entry in entries if entry.get("run") == journal.run and "path" in entry]
+        self.assertEqual(actions, ["skipped"] * 4)
+        self.assertEqual(sum("finished" in entry for entry in entries), 2)
+
+    def test_journal_tail_verified_and_truncated_line_ignored(self):
+        from upload_wheels import UploadJournal
+
+        journal_file = self.wheels_dir.parent / f"{self.wheels_dir.name}-journal.jsonl"
+        self.addCleanup(journal_file.unlink, missing_ok=True)
+        self._interrupted_run(journal_file)
+        # object of a journaled wheel lost, journal cut off while writing
+        self.client.delete_object(Bucket="wheels", Key="pypi/alpha/alpha-1.0-py3-none-any.whl")
+        with open(journal_file, "a") as f:
+            f.write('{"run": "cut off", "pa')
+
+        journal = UploadJournal(journal_file)
+        self.assertTrue(journal.start("wheels"))
+        self.assertEqual(len(journal.completed), 3)
+        self.assertEqual(journal.verify_tail(self.client, "wheels"), ["pypi/alpha/alpha-1.0-py3-none-any.whl"])
+        stats, uploaded = self._upload(listed=False, journal=journal)
+        self.assertEqual(uploaded, ["pypi/alpha/alpha-1.0-py3-none-any.whl", "pypi/broken/broken-1.0-py3-none-any.whl"])
+        self.assertEqual((stats.new, stats.journaled), (2, 2))
+        # the truncated line did not swallow the entries appended after it
+        self.assertFalse(UploadJournal(journal_file).start("wheels"))
+
+
+def _report_item(name, version, requires=(), requested=False):
+    return {"metadata": {"name": name, "version": version, "requires_dist": list(requires)}, "requested": requested}
+
+
+class TestDependencyPlan(unittest.TestCase):
+    """Test dependency graph planning in build_scheduler.py."""
+
+    def test_parse_install_report(self):
+        report = {
+            "install": [
+                _report_item("cryptography", "42.0.0", ["cffi>=1.12; platform_python_implementation != 'PyPy'"], True),
+                _report_item("cffi", "1.17.1", ["pycparser"]),
+                _report_item("pycparser", "2.22", ["pytest; extra == 'test'"]),
+            ]
+        }
+        dists = {d.name: d for d in parse_install_report(report)}
+        self.assertEqual(dists["cryptography"].requires, frozenset({"cffi"}))
+        self.assertTrue(dists["cryptography"].requested)
+        self.assertEqual(dists["cffi"].requires, frozenset({"pycparser"}))
+        # dependencies which are not part of the resolution are ignored
+        self.assertEqual(dists["pycparser"].requires, frozenset())
+
+    def test_shared_dependency_built_once_leaves_first(self):
+        crypto = WheelBuildTask("cryptography", ["cryptography"])
+        nacl = WheelBuildTask("pynacl", ["pynacl"])
+        click = WheelBuildTask("click", ["click"])
+        shared = [_report_item("cffi", "1.17.1", ["pycparser"]), _report_item("pycparser", "2.22")]
+        resolutions = {
+            id(crypto): parse_install_report(
+                {"install": [_report_item("cryptography", "42", ["cffi"], True)] + shared}
+            ),
+            id(nacl): parse_install_report({"install": [_report_item("pynacl", "1.5", ["cffi"], True)] + shared}),
+            id(click): parse_install_report({"install": [_report_item("click", "8.1", requested=True)]}),
+        }
+        planned = plan_dependency_builds(
+            [crypto, nacl, click], resolutions, lambda name, version: WheelBuildTask(f"{name}=={version}", [])
+        )
+        labels = [t.requirement for t in planned]
+        self.assertEqual(labels, ["pycparser==2.22", "cffi==1.17.1", "cryptography", "pynacl", "click"])
+        pycparser, cffi = planned[0], planned[1]
+        self.assertEqual(cffi.dependencies, [pycparser])
+        self.assertEqual(set(map(id, crypto.dependencies)), {id(cffi), id(pycparser)})
+        self.assertEqual(click.dependencies, [])
+
+    def test_requested_requirement_provides_dependency(self):
+        cffi = WheelBuildTask("cffi", ["cffi"])
+        crypto = WheelBuildTask("cryptography", ["cryptography"])
+        resolutions = {
+            id(cffi): parse_install_report({"install": [_report_item("cffi", "1.17.1", requested=True)]}),
+            id(crypto): parse_install_report(
+                {"install": [_report_item("cryptography", "42", ["cffi"], True), _report_item("cffi", "1.17.1")]}
+            ),
+        }
+        planned = plan_dependency_builds([cffi, crypto], resolutions, lambda n, v: WheelBuildTask(n, []))
+        self.assertEqual(planned, [cffi, crypto])
+        self.assertEqual(crypto.dependencies, [cffi])
+
+    def test_dependency_cycle_is_broken(self):
+        a = WheelBuildTask("a", ["a"])
+        b = WheelBuildTask("b", ["b"])
+        resolutions = {
+            id(a): parse_install_report(
+                {"install": [_report_item("a", "1", ["b"], True), _report_item("b", "1", ["a"])]}
+            ),
+            id(b): parse_install_report(
+                {"install": [_report_item("b", "1", ["a"], True), _report_item("a", "1", ["b"])]}
+            ),
+        }
+        plan_dependency_builds([a, b], resolutions, lambda n, v: WheelBuildTask(n, []))
+        self.assertEqual(a.dependencies, [b])
+        self.assertEqual(b.dependencies, [])
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_dependencies_finish_before_dependents_start(self, _mock_print, _mock_print_color):
+        started = []
+
+        def _record_pip_wheel(cmd, **kwargs):
+            started.append(cmd[4])
+            return _fake_pip_wheel(cmd, **kwargs)
+
+        leaf = WheelBuildTask("leaf", ["leaf"], tracked=False)
+        top = [WheelBuildTask(name, [name]) for name in ("top1", "top2")]
+        for task in top:
+            task.dependencies.append(leaf)
+        with tempfile.TemporaryDirectory() as tmp, patch(
+            "build_scheduler.run_measured", side_effect=_measured(_record_pip_wheel)
+        ):
+            results = run_wheel_builds(top + [leaf], os.path.join(tmp, "wheels"), jobs=4)
+        self.assertEqual(started[0], "leaf")
+        self.assertEqual(count_results(results), {"failed": 0, "succeeded": 2})
+
+
+class TestBuildCache(unittest.TestCase):
+    """Test the persistent build cache in build_cache.py."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.cache = BuildCache(self.root / "cache", max_size=10 * 1024)
+        self.wheel_dir = str(self.root / "downloaded_wheels")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _resolved_task(self, name, version="1.0"):
+        task = WheelBuildTask(name, [name])
+        task.resolution = [ResolvedDistribution(name, version, frozenset(), True)]
+        return task
+
+    def test_key_requires_resolution(self):
+        self.assertIsNone(self.cache.key_for(WheelBuildTask("alpha", ["alpha"])))
+        self.assertNotEqual(
+            self.cache.key_for(self._resolved_task("alpha", "1.0")),
+            self.cache.key_for(self._resolved_task("alpha", "1.1")),
+        )
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_second_build_restored_from_cache(self, _mock_print, _mock_print_color):
+        with patch("build_scheduler.run_measured", side_effect=_measured(_fake_pip_wheel)) as mock_run:
+            run_wheel_builds([self._resolved_task("alpha")], self.wheel_dir, jobs=1, cache=self.cache)
+            self.assertEqual(mock_run.call_count, 1)
+            os.unlink(os.path.join(self.wheel_dir, "alpha-1.0-py3-none-any.whl"))
+
+            results = run_wheel_builds([self._resolved_task("alpha")], self.wheel_dir, jobs=1, cache=self.cache)
+            self.assertEqual(mock_run.call_count, 1)  # no pip wheel subprocess for the cache hit
+
+        self.assertEqual(results[0].returncode, 0)
+        self.assertEqual(results[0].wheels, ["alpha-1.0-py3-none-any.whl"])
+        self.assertTrue(os.path.isfile(os.path.join(self.wheel_dir, "alpha-1.0-py3-none-any.whl")))
+        self.assertEqual((self.cache.stats.hits, self.cache.stats.misses, self.cache.stats.stored), (1, 1, 1))
+        self.assertEqual(self.cache.stats.bytes_saved, len(b"wheel"))
+
+    @patch("build_scheduler.print_color")
+    @patch("builtins.print")
+    def test_failed_build_not_cached(self, _mock_print, _mock_print_color):
+        with patch("build_scheduler.run_measured", side_effect=_measured(_fake_pip_wheel)):
+            run_wheel_builds([self._resolved_task("broken")], self.wheel_dir, jobs=1, cache=self.cache)
+        self.assertEqual(self.cache.stats.stored, 0)
+
+    def test_evict_least_recently_used(self):
+        source = self.root / "src"
+        source.mkdir()
+        keys = []
+        for i, name in enumerate(("old", "used", "new")):
+            (source / f"{name}.whl").write_bytes(b"x" * 4096)
+            key = f"{i:02d}" + name
+            self.cache.store(key, str(source), [f"{name}.whl"])
+            os.utime(self.cache._entry_dir(key) / "entry.json", (1000 + i, 1000 + i))
+            keys.append(key)
+        # "old" is used now, so "used" becomes the least recently used entry
+        self.assertIsNotNone(self.cache.restore(keys[0], str(source)))
+        self.cache.max_size = 2 * 4096
+        self.cache.evict()
+        self.assertTrue(self.cache._entry_dir(keys[0]).exists())
+        self.assertFalse(self.cache._entry_dir(keys[1]).exists())
+        self.assertTrue(self.cache._entry_dir(keys[2]).exists())
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, text: str = ""):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode()
+        self.headers: dict = {}
+
+
+class TestConcurrentFetch(unittest.TestCase):
+    """Test concurrent fetching of remote build inputs (remote_fetch.py) and the requirement assembly."""
+
+    def test_fetch_many_keeps_order_and_deduplicates(self):
+        fetched = []
+        barrier = threading.Barrier(3, timeout=5)
+
+        def _fetch(url, headers=None, timeout=None):
+            barrier.wait()  # raises BrokenBarrierError unless the downloads run at the same time
+            fetched.append(url)
+            return _FakeResponse(200, url)
+
+        urls = ["https://a/3", "https://a/1", "https://a/2", "https://a/1"]
+        with patch("remote_fetch.fetch", side_effect=_fetch):
+            responses = fetch_many(urls, jobs=4)
+        self.assertEqual([r.text for r in responses], urls)
+        self.assertEqual(sorted(fetched), ["https://a/1", "https://a/2", "https://a/3"])
+
+    def test_concurrent_requests_limited_per_host(self):
+        import remote_fetch
+
+        active = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+        lock = threading.Lock()
+
+        def _get(url, headers=None, timeout=None):
+            host = url.split("/")[2]
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            return _FakeResponse(200, url)
+
+        urls = [f"https://{host}/{i}" for i in range(6) for host in ("a", "b")]
+        with patch.dict(os.environ, {"IDF_PYTHON_WHEELS_FETCH_HOST_JOBS": "2"}), patch.dict(
+            remote_fetch._HOST_SLOTS, clear=True
+        ):
+            with patch("remote_fetch.get_session") as session:
+                session.return_value.get.side_effect = _get
+                responses = fetch_many(urls, jobs=8)
+        self.assertEqual([r.text for r in responses], urls)
+        self.assertEqual(peak, {"a": 2, "b": 2})
+
+    @patch("build_wheels.print_color")
+    @patch("builtins.print")
+    def test_assemble_requirements_deterministic_order(self, _mock_print, _mock_print_color):
+        features = {
+            "features": [
+                {"name": "core", "requirement_path": "core.txt"},
+                {"name": "gdb", "requirement_path": "gdb.txt"},
+            ]
+        }
+        files = {
+            f"{IDF_RESOURCES_URL}master/tools/requirements.json": json.dumps(features),
+            f"{IDF_RESOURCES_URL}release/v5.0/tools/requirements.json": json.dumps(features),
+            f"{IDF_RESOURCES_URL}master/core.txt": "core-master",
+            f"{IDF_RESOURCES_URL}master/gdb.txt": "gdb-master",
+            f"{IDF_RESOURCES_URL}release/v5.0/core.txt": "core-v50",
+            f"{IDF_RESOURCES_URL}release/v5.0/gdb.txt": "gdb-v50",
+            f"{IDF_CONSTRAINTS_URL}v5.0.txt": "constraint-v50",
+            f"{IDF_CONSTRAINTS_URL}v6.0.txt": "constraint-v60",
+            ESPTOOL_PYPROJECT_URL: '[project]\ndependencies = ["esptool-dep"]',
+        }
+
+        def _fetch(url, headers=None, timeout=None):
+            # the shortest file arrives last
+            time.sleep(0.05 / len(files[url]))
+            return _FakeResponse(200, files[url]) if url in files else _FakeResponse(404)
+
+        with patch("remote_fetch.fetch", side_effect=_fetch):
+            with patch("build_wheels._add_into_requirements", side_effect=lambda lines: lines):
+                lines = assemble_requirements(["release/v5.0", "master"], ["v5.0", "v6.0"])
+        self.assertEqual(
+            lines,
+            ["core-v50", "gdb-v50", "constraint-v50", "core-master", "gdb-master", "constraint-v60", "esptool-dep"],
+        )
+
+    @patch("build_wheels.print_color")
+    @patch("builtins.print")
+    def test_assemble_requirements_skips_branch_without_json(self, _mock_print, _mock_print_color):
+        def _fetch(url, headers=None, timeout=None):
+            if url.endswith("requirements.json") or url == ESPTOOL_PYPROJECT_URL:
+                return _FakeResponse(404)
+            return _FakeResponse(200, "constraint")
+
+        with patch("remote_fetch.fetch", side_effect=_fetch):
+            with patch("build_wheels._add_into_requirements", side_effect=lambda lines: lines):
+                self.assertEqual(assemble_requirements(["master"], ["v6.0"]), [])
+
+
+class _ConditionalHandler(BaseHTTPRequestHandler):
+    """Local stand-in for raw.githubusercontent.com / dl.espressif.com: ETag and Last-Modified validators."""
+
+    files = {
+        "/etag.txt": ("etag-body", '"v1"', None),
+        "/modified.txt": ("modified-body", None, "Wed, 21 Oct 2015 07:28:00 GMT"),
+        "/plain.txt": ("plain-body", None, None),
+    }
+    requests_seen: list = []
+
+    def do_GET(self):
+        body, etag, last_modified = self.files[self.path]
+        self.requests_seen.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        if (etag and self.headers.get("If-None-Match") == etag) or (
+            last_modified and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHTTPCache(unittest.TestCase):
+    """Test the on-disk conditional HTTP cache in remote_fetch.py against a local HTTP server."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        _ConditionalHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ConditionalHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        set_http_cache(None)
+        self.server.shutdown()
+        self.server.server_close()
+        self._tmp.cleanup()
+
+    def _run(self):
+        # a new cache object simulates a new run on the same cache directory
+        cache = HTTPCache(Path(self._tmp.name))
+        set_http_cache(cache)
+        urls = [f"{self.base}{path}" for path in ("/etag.txt", "/modified.txt", "/plain.txt")]
+        return cache, [r.text for r in fetch_many(urls, headers={"authorization": "Bearer x"}, jobs=3)]
+
+    def test_second_run_sends_only_conditional_requests(self):
+        cache, first = self._run()
+        self.assertEqual(first, ["etag-body", "modified-body", "plain-body"])
+        self.assertEqual((cache.stats.downloaded, cache.stats.not_modified, cache.stats.uncached), (2, 0, 1))
+        self.assertTrue(all(seen[1:] == (None, None) for seen in _ConditionalHandler.requests_seen))
+
+        _ConditionalHandler.requests_seen = []
+        cache, second = self._run()
+        self.assertEqual(second, first)
+        self.assertEqual((cache.stats.downloaded, cache.stats.not_modified, cache.stats.uncached), (0, 2, 1))
+        seen = {path: validators for path, *validators in _ConditionalHandler.requests_seen}
+        self.assertEqual(seen["/etag.txt"], ['"v1"', None])
+        self.assertEqual(seen["/modified.txt"], [None, "Wed, 21 Oct 2015 07:28:00 GMT"])
+        # a file served without validators cannot be revalidated
+        self.assertEqual(seen["/plain.txt"], [None, None])
+
+    def test_changed_file_is_downloaded_again(self):
+        self._run()
+        with patch.dict(_ConditionalHandler.files, {"/etag.txt": ("etag-body-2", '"v2"', None)}):
+            cache = HTTPCache(Path(self._tmp.name))
+            set_http_cache(cache)
+            self.assertEqual(fetch(f"{self.base}/etag.txt").text, "etag-body-2")
+            self.assertEqual(cache.stats.downloaded, 1)
+            self.assertEqual(fetch(f"{self.base}/etag.txt").text, "etag-body-2")
+            self.assertEqual(cache.stats.not_modified, 1)
+
+
+class TestSnapshotRecordReplay(unittest.TestCase):
+    """Test recording and replaying of remote inputs (remote_snapshot.py)."""
+
+    def setUp(self):
+        import _helper_functions
+
+        self._helpers = _helper_functions
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "snapshot.tar")
+        self._clear_pypi_caches()
+
+    def tearDown(self):
+        set_snapshot(None)
+        self._clear_pypi_caches()
+        self._tmp.cleanup()
+
+    def _clear_pypi_caches(self):
+        self._helpers._PYPI_REQUIRES_PYTHON_CACHE.clear()
+        self._helpers._PYPI_PROJECT_JSON_CACHE.clear()
+
+    def _fetch_inputs(self):
+        files = [r.text for r in fetch_many(["https://a/1", "https://a/missing"])]
+        project = self._helpers.fetch_pypi_project_json("Foo_Bar")
+        requires_python = self._helpers.fetch_pypi_release_requires_python("foo-bar", "2.0")
+        unknown = self._helpers.fetch_pypi_project_json("unknown")
+        return files, project, requires_python, unknown
+
+    @staticmethod
+    def _fetch(url, headers=None, timeout=None):
+        responses = {
+            "https://a/1": "one",
+            "https://pypi.org/pypi/foo-bar/json": json.dumps({"releases": {"2.0": []}}),
+            "https://pypi.org/pypi/foo-bar/2.0/json": json.dumps({"info": {"requires_python": ">=3.8"}}),
+        }
+        return _FakeResponse(200, responses[url]) if url in responses else _FakeResponse(404, "")
+
+    def test_replay_without_network(self):
+        snapshot = Snapshot()
+        set_snapshot(snapshot)
+        with patch("remote_fetch.get_session") as session:
+            session.return_value.get.side_effect = self._fetch
+            recorded = self._fetch_inputs()
+        snapshot.save(self.path)
+        self.assertEqual(recorded, (["one", ""], {"releases": {"2.0": {"yanked": False}}}, ">=3.8", None))
+
+        self._clear_pypi_caches()
+        set_snapshot(Snapshot.load(self.path))
+        with patch("remote_fetch.get_session", side_effect=AssertionError("network used")):
+            replayed = self._fetch_inputs()
+        self.assertEqual(replayed, recorded)
+
+    def test_replay_miss_raises(self):
+        set_snapshot(Snapshot(replay=True))
+        with self.assertRaises(SnapshotMissError):
+            fetch("https://a/not-recorded")
+        # PyPI queries fail as on a network error
+        self.assertIsNone(self._helpers.fetch_pypi_project_json("not-recorded"))
+        self.assertIsNone(self._helpers.fetch_pypi_release_requires_python("not-recorded", "1.0"))
+
+    @patch("_helper_functions.print_color")
+    def test_replay_preflight_on_other_interpreter(self, _mock_print):
+        from types import SimpleNamespace
+
+        def _interpreter(minor):
+            return SimpleNamespace(version_info=SimpleNamespace(major=3, minor=minor, micro=0), platform=sys.platform)
+
+        requires_python = {"3.0": ">=3.99", "2.0": ">=3.11", "1.0": ">=3.8"}
+        responses = {"https://pypi.org/pypi/foo/json": json.dumps({"releases": {v: [] for v in requires_python}})}
+        for version, specifier in requires_python.items():
+            responses[f"https://pypi.org/pypi/foo/{version}/json"] = json.dumps(
+                {"info": {"requires_python": specifier}}
+            )
+        requirements = {Requirement("foo"), Requirement("foo>=3")}
+
+        # recorded on Python 3.12: releases 3.0 and 2.0 are probed
+        snapshot = Snapshot()
+        set_snapshot(snapshot)
+        with patch("remote_fetch.get_session") as session, patch("_helper_functions.sys", _interpreter(12)):
+            session.return_value.get.side_effect = lambda url, **kwargs: _FakeResponse(200, responses[url])
+            recorded = self._helpers.filter_requirements_by_pypi_requires_python(requirements)
+        self.assertEqual(recorded, {Requirement("foo")})
+        self.assertNotIn("https://pypi.org/pypi/foo/1.0/json", snapshot.entries)
+
+        # replayed on Python 3.9: release 1.0 is not in the snapshot, its Requires-Python counts as unknown
+        snapshot.save(self.path)
+        self._clear_pypi_caches()
+        set_snapshot(Snapshot.load(self.path))
+        with patch("remote_fetch.get_session", side_effect=AssertionError("network used")):
+            with patch("_helper_functions.sys", _interpreter(9)):
+                replayed = self._helpers.filter_requirements_by_pypi_requires_python(requirements)
+        self.assertEqual(replayed, {Requirement("foo")})
+
+    def test_snapshot_archive_is_deterministic(self):
+        archives = []
+        for order in (("https://b", "https://a"), ("https://a", "https://b")):
+            snapshot = Snapshot()
+            for url in order:
+                snapshot.record(url, 200, url.encode(), {"ETag": "x", "Date": "today"})
+            snapshot.save(self.path)
+            archives.append(Path(self.path).read_bytes())
+        self.assertEqual(archives[0], archives[1])
+        self.assertEqual(Snapshot.load(self.path).lookup("https://a").headers, {"ETag": "x"})
+
+
+class TestPyPIMetadataCache(unittest.TestCase):
+    """Test the persistent PyPI metadata cache (pypi_metadata_cache.py) and its use by the fetch functions."""
+
+    def setUp(self):
+        import _helper_functions
+
+        self._helpers = _helper_functions
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "pypi" / "metadata.sqlite3"
+        self._clear_memory_caches()
+
+    def tearDown(self):
+        self._helpers.set_pypi_metadata_cache(None)
+        set_snapshot(None)
+        self._clear_memory_caches()
+        self._tmp.cleanup()
+
+    def _clear_memory_caches(self):
+        self._helpers._PYPI_REQUIRES_PYTHON_CACHE.clear()
+        self._helpers._PYPI_PROJECT_JSON_CACHE.clear()
+
+    def _cache(self, **kwargs):
+        cache = PyPIMetadataCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    @staticmethod
+    def _pypi(url, headers=None, timeout=None):
+        if url == "https://pypi.org/pypi/foo/json":
+            files = {"1.0": [{"yanked": True}], "2.0": [{"yanked": False}, {"yanked": True}]}
+            return _FakeResponse(200, json.dumps({"info": {}, "releases": files, "urls": ["large"]}))
+        if url == "https://pypi.org/pypi/foo/2.0/json":
+            return _FakeResponse(200, json.dumps({"info": {"requires_python": " >=3.9 "}}))
+        return _FakeResponse(404, "")
+
+    def test_compact_entries_survive_reopen(self):
+        cache = self._cache()
+        cache.put_project("foo", ProjectMetadata(True, {"1.0": True, "2.0": False}))
+        cache.put_release("foo", "2.0", ReleaseMetadata(True, ">=3.9", False))
+        cache.close()
+
+        reopened = self._cache()
+        self.assertEqual(reopened.get_project("foo"), ProjectMetadata(True, {"1.0": True, "2.0": False}))
+        self.assertEqual(reopened.get_release("foo", "2.0"), ReleaseMetadata(True, ">=3.9", False))
+        self.assertIsNone(reopened.get_release("foo", "3.0"))
+        self.assertEqual((reopened.hits, reopened.misses), (2, 1))
+
+    def test_ttl_and_negative_ttl(self):
+        cache = self._cache(ttl=100, negative_ttl=10)
+        with patch("pypi_metadata_cache.time.time", return_value=1000.0):
+            cache.put_project("found", ProjectMetadata(True, {}))
+            cache.put_project("missing", ProjectMetadata(False, {}))
+        with patch("pypi_metadata_cache.time.time", return_value=1050.0):
+            self.assertIsNotNone(cache.get_project("found"))
+            self.assertIsNone(cache.get_project("missing"))
+        with patch("pypi_metadata_cache.time.time", return_value=1200.0):
+            self.assertIsNone(cache.get_project("found"))
+            self.assertEqual(cache.evict(), 2)
+
+    def test_size_cap_evicts_oldest(self):
+        cache = self._cache(max_size=40)
+        for i in range(4):
+            with patch("pypi_metadata_cache.time.time", return_value=time.time() + i):
+                cache.put_release(f"package-{i}", "1.0", ReleaseMetadata(True, ">=3.8", False))
+        self.assertEqual(cache.evict(), 2)
+        self.assertIsNone(cache.get_release("package-0", "1.0"))
+        self.assertIsNone(cache.get_release("package-1", "1.0"))
+        self.assertIsNotNone(cache.get_release("package-3", "1.0"))
+
+    def test_fetch_functions_use_persistent_cache(self):
+        self._helpers.set_pypi_metadata_cache(self._cache())
+        with patch("remote_fetch.get_session") as session:
+            session.return_value.get.side_effect = self._pypi
+            project = self._helpers.fetch_pypi_project_json("Foo")
+            requires_python = self._helpers.fetch_pypi_release_requires_python("foo", "2.0")
+            missing = self._helpers.fetch_pypi_release_requires_python("foo", "3.0")
+        self.assertEqual(project, {"releases": {"1.0": {"yanked": True}, "2.0": {"yanked": False}}})
+        self.assertEqual((requires_python, missing), (">=3.9", None))
+
+        # a new run (empty in-memory caches) is served from the database, 404 included
+        self._clear_memory_caches()
+        with patch("remote_fetch.get_session", side_effect=AssertionError("network used")):
+            self.assertEqual(self._helpers.fetch_pypi_project_json("foo"), project)
+            self.assertEqual(self._helpers.fetch_pypi_release_requires_python("foo", "2.0"), ">=3.9")
+            self.assertIsNone(self._helpers.fetch_pypi_release_requires_python("foo", "3.0"))
+
+    def test_network_errors_are_not_persisted(self):
+        import requests
+
+        cache = self._cache()
+        self._helpers.set_pypi_metadata_cache(cache)
+        with patch("remote_fetch.get_session") as session:
+            session.return_value.get.side_effect = requests.ConnectionError("offline")
+            self.assertIsNone(self._helpers.fetch_pypi_project_json("foo"))
+        self.assertIsNone(cache.get_project("foo"))
+
+    def test_bypassed_while_recording_snapshot(self):
+        cache = self._cache()
+        cache.put_release("foo", "2.0", ReleaseMetadata(True, ">=3.12", False))
+        self._helpers.set_pypi_metadata_cache(cache)
+        set_snapshot(Snapshot())
+        with patch("remote_fetch.get_session") as session:
+            session.return_value.get.side_effect = self._pypi
+            self.assertEqual(self._helpers.fetch_pypi_release_requires_python("foo", "2.0"), ">=3.9")
+        self.assertEqual(cache.get_release("foo", "2.0").requires_python, ">=3.12")
+
+
+def _simple_file(filename: str, requires_python: Optional[str] = None, yanked=False) -> dict:
+    return {
+        "filename": filename,
+        "url": f"files/{filename}",
+        "hashes": {},
+        "requires-python": requires_python,
+        "yanked": yanked,
+    }
+
+
+class _SimpleIndexHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a PEP 691 JSON simple index (pypi.org/simple/)."""
+
+    projects = {
+        "foo": {
+            "meta": {"api-version": "1.1"},
+            "name": "foo",
+            "versions": ["1.0", "2.0", "3.0", "4.0rc1"],
+            "files": [
+                _simple_file("foo-1.0.tar.gz", ">=3.6"),
+                _simple_file("foo-2.0-py3-none-any.whl", ">=3.7"),
+                _simple_file("foo-2.0.tar.gz", ">=3.7"),
+                _simple_file("foo-3.0-py3-none-any.whl", ">=3.99"),
+                _simple_file("foo-4.0rc1-py3-none-any.whl", ">=3.99", yanked="broken"),
+                _simple_file("foo-0.1-py2.7.egg"),
+            ],
+        },
+    }
+    requests_seen: list = []
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get("Accept")))
+        name = self.path.strip("/").split("/")[-1]
+        if not self.path.startswith("/simple/") or name not in self.projects:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps(self.projects[name]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.pypi.simple.v1+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestPyPISimpleBackend(unittest.TestCase):
+    """Test the PEP 691 JSON simple index backend of the preflight against a local index."""
+
+    def setUp(self):
+        import _helper_functions
+
+        self._helpers = _helper_functions
+        _SimpleIndexHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _SimpleIndexHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        environ = {
+            "IDF_PYTHON_WHEELS_PYPI_BACKEND": "simple",
+            "IDF_PYTHON_WHEELS_PYPI_SIMPLE_URL": f"http://127.0.0.1:{self.server.server_address[1]}/simple/",
+        }
+        self._environ = patch.dict(os.environ, environ)
+        self._environ.start()
+        os.environ.pop("SKIP_PYPI_REQUIRES_PYTHON_CHECK", None)
+        self._clear_memory_caches()
+
+    def tearDown(self):
+        self._environ.stop()
+        self._clear_memory_caches()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _clear_memory_caches(self):
+        self._helpers._PYPI_REQUIRES_PYTHON_CACHE.clear()
+        self._helpers._PYPI_PROJECT_JSON_CACHE.clear()
+        self._helpers._PYPI_SIMPLE_PAGES_FETCHED.clear()
+
+    def test_simple_metadata_from_json(self):
+        from pypi_metadata_cache import simple_metadata_from_json
+
+        project, releases = simple_metadata_from_json(_SimpleIndexHandler.projects["foo"])
+        self.assertEqual(project, ProjectMetadata(True, {"1.0": False, "2.0": False, "3.0": False, "4.0rc1": True}))
+        self.assertEqual(releases["2.0"], ReleaseMetadata(True, ">=3.7", False))
+        self.assertEqual(releases["4.0rc1"], ReleaseMetadata(True, ">=3.99", True))
+        self.assertNotIn("0.1", releases)
+
+    def test_preflight_needs_one_request_per_project(self):
+        skip, _ = pypi_requires_python_preflight_skip(Requirement("foo>=1"))
+        self.assertFalse(skip)
+        skip, reason = pypi_requires_python_preflight_skip(Requirement("foo>=3"))
+        self.assertTrue(skip)
+        self.assertIn("requires Python '>=3.99'", reason)
+        self.assertEqual(_SimpleIndexHandler.requests_seen, [("/simple/foo/", "application/vnd.pypi.simple.v1+json")])
+
+    def test_release_lookup_without_project_lookup(self):
+        self.assertEqual(self._helpers.fetch_pypi_release_requires_python("Foo", "1.0"), ">=3.6")
+        self.assertIsNone(self._helpers.fetch_pypi_release_requires_python("foo", "9.9"))
+        self.assertEqual(len(_SimpleIndexHandler.requests_seen), 1)
+
+    def test_unknown_project_does_not_skip(self):
+        self.assertIsNone(self._helpers.fetch_pypi_project_json("missing"))
+        self.assertEqual(pypi_requires_python_preflight_skip(Requirement("missing==1.0")), (False, ""))
+
+    def test_invalid_backend(self):
+        with patch.dict(os.environ, {"IDF_PYTHON_WHEELS_PYPI_BACKEND": "xml"}):
+            with self.assertRaises(ValueError):
+                self._helpers.fetch_pypi_project_json("foo")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -179,7 +179,7 @@ def main() -> int:
     # Load exclude list for current platform (exclude=True for runtime filtering)
     exclude_requirements = YAMLListAdapter(
         EXCLUDE_LIST_PATH, exclude=True, current_platform=get_current_platform()
-    ).requirements
+    ).compile_decision_table([python_version], [sys.platform])
     print(f"Loaded {len(exclude_requirements)} exclude requirements from {EXCLUDE_LIST_PATH}\n")
 
     # Find compatible wheels
@@ -5,57 +5,282 @@
 #
 """This script uploads wheel files from the downloaded wheels directory to S3 bucket.
 - argument S3 bucket
+
+Uploads are incremental: a wheel which is already in the bucket with the same content is skipped. The content
+is compared by size and MD5 against the listed object's ``ETag`` (for multipart uploads the ETag is computed from
+the MD5 of every part), otherwise against the ``sha256`` metadata this script stores with every upload.
+``--force`` uploads every wheel again.
+
+Wheels are uploaded by a pool of threads (``--jobs``) over one shared S3 client whose connection pool fits all
+of them. Large wheels are uploaded in parts (``--chunk-size``, ``--multipart-threshold``, ``--max-concurrency``
+parts of one wheel at once). A failed upload is retried (``--retries``) with backoff; wheels which still fail are
+listed at the end and make the script fail.
+
+Every completed upload (and every wheel found unchanged) is appended to a journal (``--journal``, default
+``upload/<bucket>.jsonl`` under ``get_cache_dir()``) with its key and checksums; it is the audit record of the
+uploads. A run which did not finish (interrupted or with failed uploads) is resumed by the next one: wheels
+journaled with the same sha256 are not looked at again, the others are checked one by one in the bucket (no full
+listing). The last ``--verify-tail`` journal entries are verified in the bucket first, entries whose object is
+missing or differs are uploaded again.
 """
 
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
 import os
 import re
-import sys
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
 
 import boto3
 
+from boto3.exceptions import Boto3Error
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError
+from botocore.exceptions import ClientError
 from colorama import Fore
 
+from _helper_functions import get_cache_dir
 from _helper_functions import print_color
 
-s3 = boto3.resource("s3")
-try:
-    BUCKET = s3.Bucket(sys.argv[1])
-except IndexError:
-    raise SystemExit("Error: S3 bucket name not provided.")
-
 WHEELS_DIR = f"{os.path.curdir}{(os.sep)}downloaded_wheels"
-if not os.path.exists(WHEELS_DIR):
-    raise SystemExit(f"Error: The wheels directory {WHEELS_DIR} not found.")
+KEY_PREFIX = "pypi/"
+# user metadata (x-amz-meta-sha256) with the sha256 of the uploaded wheel
+SHA256_METADATA = "sha256"
+MIB = 1024 * 1024
+# part size of multipart uploads (boto3 default), needed to compute their ETags
+MULTIPART_CHUNKSIZE = TransferConfig().multipart_chunksize
+MULTIPART_THRESHOLD = TransferConfig().multipart_threshold
+DEFAULT_JOBS = 8
+# parts of one wheel uploaded at once
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 1.0
+# journal entries verified in the bucket when a run is resumed
+DEFAULT_VERIFY_TAIL = 10
 
 
-def normalize(name):
-    return re.sub(r"[-_.]+", "-", name).lower()
+class RemoteWheel(NamedTuple):
+    size: int
+    etag: str  # without quotes
 
 
-def get_existing_wheels():
-    """Get set of S3 keys for wheels currently on server."""
-    existing = set()
-    for obj in BUCKET.objects.filter(Prefix="pypi/"):
-        if obj.key.endswith(".whl"):
-            existing.add(obj.key)
-    return existing
+class LocalWheel(NamedTuple):
+    path: str
+    key: str
+    size: int
+    md5: str
+    sha256: str
+    multipart_etag: str  # ETag of the object when uploaded in MULTIPART_CHUNKSIZE parts
+
+
+# actions of upload_wheel
+NEW = "new"
+UPDATED = "updated"
+SKIPPED = "skipped"
+JOURNALED = "journaled"  # completed by the interrupted run this one resumes
+FAILED = "failed"
+
+
+class UploadResult(NamedTuple):
+    local: LocalWheel
+    action: str  # NEW, UPDATED, SKIPPED, JOURNALED or FAILED
+    seconds: float  # duration of the upload (all attempts)
+    attempts: int
+    error: Optional[str] = None
+
+
+class UploadStats:
+    def __init__(self) -> None:
+        self.new = 0
+        self.updated = 0
+        self.skipped = 0
+        self.journaled = 0
+        self.bytes_uploaded = 0
+        self.bytes_skipped = 0
+        self.retried = 0
+        self.failed: List[str] = []
+        self.seconds = 0.0  # wall time of all uploads
+
+    def add(self, result: UploadResult) -> None:
+        if result.action in (SKIPPED, JOURNALED):
+            if result.action == SKIPPED:
+                self.skipped += 1
+            else:
+                self.journaled += 1
+            self.bytes_skipped += result.local.size
+            return
+        self.retried += result.attempts - 1
+        if result.action == FAILED:
+            self.failed.append(f"{result.local.key}: {result.error}")
+            return
+        self.bytes_uploaded += result.local.size
+        if result.action == NEW:
+            self.new += 1
+        else:
+            self.updated += 1
 
+    @property
+    def throughput(self) -> float:
+        """Uploaded MiB per second of wall time."""
+        return self.bytes_uploaded / MIB / self.seconds if self.seconds else 0.0
 
-print_color("---------- UPLOAD WHEELS TO S3 ----------")
 
-existing_wheels = get_existing_wheels()
-print(f"Found {len(existing_wheels)} existing wheels on S3\n")
+class UploadJournal:
+    """Append-only journal of completed uploads, one JSON object per line (see module docstring).
 
-print_color("---------- UPLOADING WHEELS ----------")
+    A run starts with ``{"run", "bucket", "started"}``, every completed wheel adds ``{"run", "path", "key",
+    "size", "md5", "sha256", "action", "time"}`` and a run without failures ends with ``{"run", "finished"}``.
+    Every line is flushed to disk when written; a line cut off by an interruption is ignored.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.run: Optional[str] = None
+        self.resumed = False
+        # entries of the resumed run by journal_path(), in the order they were written
+        self.completed: Dict[str, dict] = {}
+
+    def _read(self) -> List[dict]:
+        try:
+            lines = self.path.read_text().splitlines()
+        except OSError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def _append(self, entry: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a+b") as f:
+            # a line cut off by an interruption must not swallow the next one
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write(json.dumps(entry, sort_keys=True).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, bucket_name: str) -> bool:
+        """Resume the last run for ``bucket_name`` when it did not finish, otherwise start a new one.
+
+        Returns True when a run is resumed.
+        """
+        entries = self._read()
+        runs = [entry["run"] for entry in entries if entry.get("bucket") == bucket_name and "started" in entry]
+        finished = {entry.get("run") for entry in entries if "finished" in entry}
+        if runs and runs[-1] not in finished:
+            self.run, self.resumed = runs[-1], True
+            self.completed = {
+                entry["path"]: entry for entry in entries if entry.get("run") == self.run and "path" in entry
+            }
+            return True
+        self.run, self.resumed, self.completed = uuid.uuid4().hex, False, {}
+        self._append({"run": self.run, "bucket": bucket_name, "started": time.time()})
+        return False
+
+    def sha256_of(self, full_path: str) -> Optional[str]:
+        entry = self.completed.get(journal_path(full_path))
+        return entry["sha256"] if entry else None
+
+    def record(self, result: UploadResult) -> None:
+        """Append a completed upload (or a wheel found unchanged) of this run."""
+        local = result.local
+        entry: Dict[str, Any] = {
+            "run": self.run,
+            "path": journal_path(local.path),
+            "key": local.key,
+            "size": local.size,
+            "md5": local.md5,
+            "sha256": local.sha256,
+            "action": result.action,
+            "time": time.time(),
+        }
+        self._append(entry)
+        self.completed[entry["path"]] = entry
+
+    def finish(self) -> None:
+        self._append({"run": self.run, "finished": time.time()})
 
+    def verify_tail(self, client, bucket_name: str, count: int = DEFAULT_VERIFY_TAIL) -> List[str]:
+        """Check the last ``count`` entries of the resumed run in the bucket; drop (and return) the wrong ones.
 
-def collect_wheel_paths():
-    """Collect (full_path, wheel_filename) for all .whl files in WHEELS_DIR.
+        An entry holds when the object has its size and either its MD5 as ETag or its sha256 as metadata.
+        """
+        dropped: List[str] = []
+        if count <= 0:
+            return dropped
+        for path, entry in list(self.completed.items())[-count:]:
+            try:
+                head = client.head_object(Bucket=bucket_name, Key=entry["key"])
+                holds = head["ContentLength"] == entry["size"] and (
+                    head["ETag"].strip('"') == entry["md5"]
+                    or head.get("Metadata", {}).get(SHA256_METADATA) == entry["sha256"]
+                )
+            except ClientError:
+                holds = False
+            if not holds:
+                del self.completed[path]
+                dropped.append(entry["key"])
+        return dropped
+
+
+def journal_path(full_path: str) -> str:
+    """Path of a wheel as written to the journal (normalized, with ``/``) - distinguishes nested wheels."""
+    return os.path.normpath(full_path).replace(os.sep, "/")
+
+
+def default_journal(bucket_name: str) -> Path:
+    return get_cache_dir("upload") / f"{bucket_name}.jsonl"
+
+
+def normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def wheel_key(wheel: str) -> Optional[str]:
+    """S3 key of a wheel file (``pypi/<normalized name>/<wheel>``); None when the name has no version."""
+    match = re.search(r"^(.+?)-(\d+)", wheel)
+    if not match:
+        return None
+    return f"{KEY_PREFIX}{normalize(match.group(1))}/{wheel}"
+
+
+def get_existing_wheels(client, bucket_name: str) -> Dict[str, RemoteWheel]:
+    """Get S3 keys with size and ETag of the wheels currently on server."""
+    existing = {}
+    for page in client.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=KEY_PREFIX):
+        for obj in page.get("Contents", []):
+            if obj["Key"].endswith(".whl"):
+                existing[obj["Key"]] = RemoteWheel(obj["Size"], obj["ETag"].strip('"'))
+    return existing
+
+
+def collect_wheel_paths(wheels_dir: str = WHEELS_DIR) -> List[Tuple[str, str]]:
+    """Collect (full_path, wheel_filename) for all .whl files in wheels_dir.
     Handles both flat layout (wheels directly in dir) and nested (wheels in subdirs).
     """
     collected = []
-    for item in os.listdir(WHEELS_DIR):
-        path = os.path.join(WHEELS_DIR, item)
+    for item in os.listdir(wheels_dir):
+        path = os.path.join(wheels_dir, item)
         if os.path.isfile(path) and item.endswith(".whl"):
             collected.append((path, item))
         elif os.path.isdir(path):
@@ -65,32 +290,288 @@ def collect_wheel_paths():
     return collected
 
 
-wheel_paths = collect_wheel_paths()
-new_wheels = 0
-existing_count = 0
+def local_wheel(path: str, key: str, chunksize: int = MULTIPART_CHUNKSIZE) -> LocalWheel:
+    """Size and checksums of a local wheel, read once in parts of the multipart chunk size."""
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    part_digests = []
+    size = 0
+    with open(path, "rb") as f:
+        for part in iter(lambda: f.read(chunksize), b""):
+            md5.update(part)
+            sha256.update(part)
+            part_digests.append(hashlib.md5(part).digest())
+            size += len(part)
+    multipart_etag = f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+    return LocalWheel(path, key, size, md5.hexdigest(), sha256.hexdigest(), multipart_etag)
 
-for full_path, wheel in wheel_paths:
-    pattern = re.compile(r"^(.+?)-(\d+)")
-    match = pattern.search(wheel)
-    if match:
-        wheel_name = match.group(1)
-        wheel_name = normalize(wheel_name)
 
-        is_new = f"pypi/{wheel_name}/{wheel}" not in existing_wheels
+def is_unchanged(client, bucket_name: str, local: LocalWheel, remote: RemoteWheel) -> bool:
+    """True when the object in the bucket has the content of the local wheel."""
+    if remote.size != local.size:
+        return False
+    if "-" not in remote.etag:
+        # single part upload: the ETag is the MD5 of the content
+        return remote.etag == local.md5
+    if remote.etag == local.multipart_etag:
+        return True
+    # multipart upload with another part size: compare the stored checksum
+    metadata = client.head_object(Bucket=bucket_name, Key=local.key).get("Metadata", {})
+    return bool(metadata.get(SHA256_METADATA) == local.sha256)
 
-        BUCKET.upload_file(full_path, f"pypi/{wheel_name}/{wheel}", ExtraArgs={"ACL": "public-read"})
 
-        if is_new:
-            new_wheels += 1
-            print_color(f"++ {wheel_name}/{wheel}", Fore.GREEN)
-        else:
-            existing_count += 1
-            print(f"  <- {wheel_name}/{wheel}")
+def make_client(jobs: int = DEFAULT_JOBS, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+    """S3 client shared by all upload threads, with a connection for every part uploaded at once."""
+    config = Config(max_pool_connections=max(10, jobs * max_concurrency), retries={"mode": "standard"})
+    return boto3.client("s3", config=config)
+
+
+def transfer_config(
+    chunk_size: int = MULTIPART_CHUNKSIZE,
+    multipart_threshold: int = MULTIPART_THRESHOLD,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> TransferConfig:
+    return TransferConfig(
+        multipart_threshold=multipart_threshold, multipart_chunksize=chunk_size, max_concurrency=max_concurrency
+    )
+
+
+def head_wheel(client, bucket_name: str, key: str) -> Optional[RemoteWheel]:
+    """Size and ETag of one object; None when it is not in the bucket."""
+    try:
+        head = client.head_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return RemoteWheel(head["ContentLength"], head["ETag"].strip('"'))
+
+
+def upload_wheel(
+    client,
+    bucket_name: str,
+    full_path: str,
+    key: str,
+    remote: Optional[RemoteWheel],
+    force: bool = False,
+    config: Optional[TransferConfig] = None,
+    retries: int = DEFAULT_RETRIES,
+    journaled: Optional[str] = None,
+    lookup: bool = False,
+) -> UploadResult:
+    """Upload one wheel unless the bucket has it unchanged; failed uploads are retried with backoff.
+
+    ``journaled`` is the sha256 recorded for the wheel by the resumed run; ``lookup`` asks the bucket for the
+    object (instead of ``remote`` from the listing). Reading the wheel and looking it up in the bucket are retried
+    like the upload, a wheel failing all attempts is returned as FAILED.
+    """
+    config = config or transfer_config()
+    local: Optional[LocalWheel] = None
+    action: Optional[str] = None
+    start = time.perf_counter()
+    error = ""
+    for attempt in range(1, retries + 2):
+        try:
+            if local is None:
+                local = local_wheel(full_path, key, config.multipart_chunksize)
+                if journaled == local.sha256:
+                    return UploadResult(local, JOURNALED, 0.0, 0)
+            if action is None:
+                if lookup:
+                    remote = head_wheel(client, bucket_name, key)
+                if remote is not None and not force and is_unchanged(client, bucket_name, local, remote):
+                    return UploadResult(local, SKIPPED, 0.0, 0)
+                action = NEW if remote is None else UPDATED
+                start = time.perf_counter()
+            client.upload_file(
+                full_path,
+                bucket_name,
+                key,
+                ExtraArgs={"ACL": "public-read", "Metadata": {SHA256_METADATA: local.sha256}},
+                Config=config,
+            )
+            return UploadResult(local, action, time.perf_counter() - start, attempt)
+        except (Boto3Error, BotoCoreError, ClientError, OSError) as e:
+            error = str(e)
+            if attempt <= retries:
+                time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+    if local is None:
+        # the wheel could not be read
+        local = LocalWheel(full_path, key, 0, "", "", "")
+    return UploadResult(local, FAILED, time.perf_counter() - start, retries + 1, error)
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / MIB:.1f} MiB"
+
+
+def _report(result: UploadResult, done: int, total: int) -> None:
+    display_name = result.local.key[len(KEY_PREFIX) :]
+    progress = f"[{done}/{total}]"
+    if result.action in (SKIPPED, JOURNALED):
+        print(f"{progress}   == {display_name}" + (" (journal)" if result.action == JOURNALED else ""))
+        return
+    if result.action == FAILED:
+        print_color(f"{progress} !! {display_name}: {result.error}", Fore.RED)
+        return
+    speed = result.local.size / MIB / result.seconds if result.seconds else 0.0
+    details = f"({_megabytes(result.local.size)}, {speed:.1f} MiB/s"
+    details += f", attempt {result.attempts})" if result.attempts > 1 else ")"
+    if result.action == NEW:
+        print_color(f"{progress} ++ {display_name} {details}", Fore.GREEN)
+    else:
+        print(f"{progress}   <- {display_name} {details}")
+
+
+def upload_wheels(
+    client,
+    bucket_name: str,
+    wheel_paths: List[Tuple[str, str]],
+    existing: Optional[Dict[str, RemoteWheel]],
+    force: bool = False,
+    jobs: int = DEFAULT_JOBS,
+    config: Optional[TransferConfig] = None,
+    retries: int = DEFAULT_RETRIES,
+    journal: Optional[UploadJournal] = None,
+) -> UploadStats:
+    """Upload the wheels which are not in the bucket with the same content (all with ``force``).
+
+    ``jobs`` wheels are uploaded at once; the progress is printed as the uploads finish. Without ``existing``
+    (bucket not listed) every wheel is looked up in the bucket on its own. Completed wheels are appended to the
+    ``journal``, wheels journaled by the resumed run are not uploaded again.
+    """
+    stats = UploadStats()
+    uploads = [(full_path, key) for full_path, key in ((path, wheel_key(wheel)) for path, wheel in wheel_paths) if key]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(uploads)))) as executor:
+        futures = [
+            executor.submit(
+                upload_wheel,
+                client,
+                bucket_name,
+                full_path,
+                key,
+                existing.get(key) if existing is not None else None,
+                force,
+                config,
+                retries,
+                journal.sha256_of(full_path) if journal is not None else None,
+                existing is None,
+            )
+            for full_path, key in uploads
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            stats.add(result)
+            if journal is not None and result.action not in (JOURNALED, FAILED):
+                journal.record(result)
+            _report(result, done, len(uploads))
+    stats.seconds = time.perf_counter() - start
+    if journal is not None and not stats.failed:
+        journal.finish()
+    return stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Upload the wheels in downloaded_wheels to an S3 bucket.")
+    parser.add_argument("bucket", help="S3 bucket name")
+    parser.add_argument(
+        "--force", action="store_true", help="upload every wheel, also the ones already in the bucket unchanged"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=DEFAULT_JOBS, help=f"wheels uploaded at once (default {DEFAULT_JOBS})"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=MULTIPART_CHUNKSIZE // MIB,
+        help=f"part size of multipart uploads in MiB (default {MULTIPART_CHUNKSIZE // MIB})",
+    )
+    parser.add_argument(
+        "--multipart-threshold",
+        type=int,
+        default=MULTIPART_THRESHOLD // MIB,
+        help=f"size in MiB from which wheels are uploaded in parts (default {MULTIPART_THRESHOLD // MIB})",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help=f"parts of one wheel uploaded at once (default {DEFAULT_MAX_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f"retries of a failed upload (default {DEFAULT_RETRIES})",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        help="journal of completed uploads, an unfinished run in it is resumed (default upload/<bucket>.jsonl "
+        "in the cache directory)",
+    )
+    parser.add_argument(
+        "--verify-tail",
+        type=int,
+        default=DEFAULT_VERIFY_TAIL,
+        help=f"last journal entries verified in the bucket when resuming (default {DEFAULT_VERIFY_TAIL})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if not os.path.exists(WHEELS_DIR):
+        raise SystemExit(f"Error: The wheels directory {WHEELS_DIR} not found.")
+    client = make_client(args.jobs, args.max_concurrency)
+    config = transfer_config(args.chunk_size * MIB, args.multipart_threshold * MIB, args.max_concurrency)
+
+    print_color("---------- UPLOAD WHEELS TO S3 ----------")
+
+    journal = UploadJournal(args.journal or default_journal(args.bucket))
+    existing_wheels: Optional[Dict[str, RemoteWheel]] = None
+    if journal.start(args.bucket):
+        print(f"Resuming run {journal.run} with {len(journal.completed)} completed wheels from {journal.path}")
+        dropped = journal.verify_tail(client, args.bucket, args.verify_tail)
+        for key in dropped:
+            print_color(f"Journaled wheel not in the bucket, uploading again: {key}", Fore.YELLOW)
+        print()
+    else:
+        existing_wheels = get_existing_wheels(client, args.bucket)
+        print(f"Found {len(existing_wheels)} existing wheels on S3\n")
+
+    print_color("---------- UPLOADING WHEELS ----------")
+    stats = upload_wheels(
+        client,
+        args.bucket,
+        collect_wheel_paths(),
+        existing_wheels,
+        force=args.force,
+        jobs=args.jobs,
+        config=config,
+        retries=args.retries,
+        journal=journal,
+    )
+    print_color("---------- END UPLOADING ----------")
+
+    print_color("---------- STATISTICS ----------")
+    print_color(f"New wheels: {stats.new}", Fore.GREEN)
+    print(f"Existing wheels (re-uploaded): {stats.updated}")
+    print(f"Existing wheels (unchanged, skipped): {stats.skipped}")
+    if journal.resumed:
+        print(f"Completed by the resumed run (journal): {stats.journaled}")
+    print(f"Total uploaded: {stats.new + stats.updated}")
+    print(f"Transferred: {_megabytes(stats.bytes_uploaded)}, skipped: {_megabytes(stats.bytes_skipped)}")
+    print(f"Time: {stats.seconds:.1f} s, throughput: {stats.throughput:.1f} MiB/s, retried uploads: {stats.retried}")
+    print_color("---------- END STATISTICS ----------")
+
+    if stats.failed:
+        print_color("---------- FAILED UPLOADS ----------", Fore.RED)
+        for i, failure in enumerate(stats.failed, start=1):
+            print_color(f"{i}. {failure}", Fore.RED)
+        raise SystemExit("One or more wheels failed to upload")
 
-print_color("---------- END UPLOADING ----------")
 
-print_color("---------- STATISTICS ----------")
-print_color(f"New wheels: {new_wheels}", Fore.GREEN)
-print(f"Existing wheels (re-uploaded): {existing_count}")
-print(f"Total uploaded: {new_wheels + existing_count}")
-print_color("---------- END STATISTICS ----------")
+if __name__ == "__main__":
+    main()
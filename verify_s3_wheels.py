@@ -98,7 +98,9 @@ def main():
     bucket = s3.Bucket(bucket_name)
 
     # Load exclude requirements (direct logic, no inversion)
-    exclude_requirements = YAMLListAdapter(EXCLUDE_LIST_PATH, exclude=False).requirements
+    exclude_requirements = YAMLListAdapter(EXCLUDE_LIST_PATH, exclude=False).compile_decision_table(
+        supported_python_versions
+    )
     print(f"Loaded {len(exclude_requirements)} exclude rules\n")
 
     # Get all wheels from S3
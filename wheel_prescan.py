@@ -0,0 +1,347 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+"""Prescan of the native binaries in a wheel, without the repair tools and without extracting the wheel.
+
+The zip central directory lists the members; only members which can be binaries (``.so``, ``.pyd``, ``.dll``,
+``.dylib``, ``.exe`` or no suffix) are read, and only the headers the scan needs:
+
+- ELF     ... architecture (``e_machine``), ``DT_NEEDED`` libraries and the ``GLIBC_x.y`` versions required by
+  its symbols (version needs), found through the program headers and the dynamic segment; the section headers at
+  the end of the file and the code, symbol and debug sections are not read
+- Mach-O  ... architectures (all slices of a universal binary)
+- PE      ... architecture (``Machine`` of the COFF header)
+
+``linux_repair_verdict`` uses the scan to classify Linux wheels which auditwheel would not change (no library
+outside of the manylinux policy, tag and symbol versions within the target policy) or which it would certainly
+refuse with "too-recent versioned symbols". Anything else is left to auditwheel.
+
+Ranges beyond the start of a member are read after seeking in it. Seeking in a deflated member (and in a stored
+one on older Pythons) still reads and decompresses the stream up to the dynamic segment, which follows the code;
+that part is discarded, never held in memory nor written out, and nothing after the dynamic segment is read.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import struct
+import zipfile
+
+from pathlib import Path
+from typing import IO
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from packaging.utils import InvalidWheelFilename
+from packaging.utils import parse_wheel_filename
+
+# Libraries every manylinux policy allows a wheel to link against (lib_whitelist of auditwheel's policies)
+MANYLINUX_WHITELIST = frozenset(
+    {
+        "libgcc_s.so.1",
+        "libstdc++.so.6",
+        "libm.so.6",
+        "libdl.so.2",
+        "librt.so.1",
+        "libc.so.6",
+        "libnsl.so.1",
+        "libutil.so.1",
+        "libpthread.so.0",
+        "libresolv.so.2",
+        "libX11.so.6",
+        "libXext.so.6",
+        "libXrender.so.1",
+        "libICE.so.6",
+        "libSM.so.6",
+        "libGL.so.1",
+        "libgobject-2.0.so.0",
+        "libgthread-2.0.so.0",
+        "libglib-2.0.so.0",
+    }
+)
+# glibc of the legacy manylinux tags
+LEGACY_MANYLINUX = {"manylinux1": (2, 5), "manylinux2010": (2, 12), "manylinux2014": (2, 17)}
+# target platform of auditwheel in the manylinux containers (e.g. manylinux_2_34_x86_64)
+AUDITWHEEL_PLAT_ENV = "AUDITWHEEL_PLAT"
+
+# verdicts of linux_repair_verdict
+NO_REPAIR_NEEDED = "no repair needed"
+TOO_RECENT_SYMBOLS = "too-recent versioned symbols"
+
+_BINARY_SUFFIXES = (".so", ".pyd", ".dll", ".dylib", ".exe")
+_HEADER_SIZE = 64
+_MANYLINUX_TAG = re.compile(r"^manylinux_(\d+)_(\d+)_(.+)$")
+_LEGACY_MANYLINUX_TAG = re.compile(r"^(manylinux1|manylinux2010|manylinux2014)_(.+)$")
+_GLIBC_VERSION = re.compile(r"^GLIBC_(\d+)\.(\d+)")
+
+# architecture names as in the platform tags / platform.machine()
+_ELF_MACHINES = {3: "i686", 8: "mips", 20: "ppc", 21: "ppc64", 22: "s390x", 40: "armv7l", 62: "x86_64", 183: "aarch64"}
+_MACHO_CPUS = {7: "i386", 0x01000007: "x86_64", 12: "arm", 0x0100000C: "arm64"}
+_PE_MACHINES = {0x14C: "x86", 0x8664: "AMD64", 0xAA64: "ARM64"}
+
+# start of an ELF member read at once
+_ELF_PREFIX_SIZE = 64 * 1024
+_PT_LOAD = 1
+_PT_DYNAMIC = 2
+_DT_NEEDED = 1
+_DT_STRTAB = 5
+_DT_STRSZ = 10
+_DT_VERNEED = 0x6FFFFFFE
+_DT_VERNEEDNUM = 0x6FFFFFFF
+
+
+class BinaryInfo(NamedTuple):
+    path: str  # member of the wheel
+    format: str  # "elf", "mach-o" or "pe"
+    archs: Tuple[str, ...]  # several for a universal Mach-O binary
+    needed: Tuple[str, ...] = ()  # DT_NEEDED (ELF)
+    glibc: Optional[Tuple[int, int]] = None  # highest required GLIBC_x.y symbol version (ELF)
+
+
+class WheelScan(NamedTuple):
+    binaries: Tuple[BinaryInfo, ...]
+    files: FrozenSet[str]  # base names of all members (libraries bundled in the wheel)
+
+    @property
+    def has_native(self) -> bool:
+        return bool(self.binaries)
+
+    @property
+    def archs(self) -> FrozenSet[str]:
+        return frozenset(arch for binary in self.binaries for arch in binary.archs)
+
+    @property
+    def max_glibc(self) -> Optional[Tuple[int, int]]:
+        return max((binary.glibc for binary in self.binaries if binary.glibc), default=None)
+
+    def external_libraries(self, whitelist: FrozenSet[str] = MANYLINUX_WHITELIST) -> List[str]:
+        """DT_NEEDED libraries neither bundled in the wheel nor allowed by the manylinux policy."""
+        needed = {library for binary in self.binaries for library in binary.needed}
+        return sorted(library for library in needed if library not in whitelist and library not in self.files)
+
+
+def _is_candidate(name: str) -> bool:
+    if name.endswith("/") or ".dist-info/" in name:
+        return False
+    base = name.rsplit("/", 1)[-1]
+    return base.endswith(_BINARY_SUFFIXES) or ".so." in base or "." not in base
+
+
+def _c_string(data: bytes, offset: int) -> str:
+    end = data.find(b"\0", offset)
+    return data[offset : end if end >= 0 else len(data)].decode("utf-8", errors="replace")
+
+
+class _MemberReader:
+    """Ranges of a zip member: served from its buffered start, or read after seeking (nothing else is loaded)."""
+
+    def __init__(self, member: IO[bytes], prefix: bytes) -> None:
+        self.member = member
+        self.prefix = prefix
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        if offset + size <= len(self.prefix):
+            return self.prefix[offset : offset + size]
+        self.member.seek(offset)
+        return self.member.read(size)
+
+
+def _parse_elf(path: str, reader: _MemberReader) -> Optional[BinaryInfo]:
+    """Architecture, DT_NEEDED and required GLIBC version from the dynamic segment of an ELF file.
+
+    Only the program headers, the dynamic segment, the dynamic string table and the version needs are read.
+    """
+    header = reader.read_at(0, _HEADER_SIZE)
+    if len(header) < 52 or header[4] not in (1, 2) or header[5] not in (1, 2):
+        return None
+    is_64 = header[4] == 2
+    endian = "<" if header[5] == 1 else ">"
+    machine = struct.unpack_from(endian + "H", header, 18)[0]
+    arch = _ELF_MACHINES.get(machine, f"elf-{machine}")
+    if arch == "ppc64" and endian == "<":
+        arch = "ppc64le"
+    if is_64:
+        phoff, (phentsize, phnum) = (
+            struct.unpack_from(endian + "Q", header, 32)[0],
+            struct.unpack_from(endian + "HH", header, 54),
+        )
+        segment_format, dyn_format = endian + "IIQQQQQQ", endian + "qQ"
+    else:
+        phoff, (phentsize, phnum) = (
+            struct.unpack_from(endian + "I", header, 28)[0],
+            struct.unpack_from(endian + "HH", header, 42),
+        )
+        segment_format, dyn_format = endian + "IIIIIIII", endian + "iI"
+
+    # (vaddr, offset, filesz) of the loaded segments and (offset, filesz) of the dynamic segment
+    loads: List[Tuple[int, int, int]] = []
+    dynamic: Optional[Tuple[int, int]] = None
+    table = reader.read_at(phoff, phnum * phentsize) if phoff and phentsize >= struct.calcsize(segment_format) else b""
+    for index in range(len(table) // phentsize if table else 0):
+        fields = struct.unpack_from(segment_format, table, index * phentsize)
+        if is_64:
+            segment_type, offset, vaddr, filesz = fields[0], fields[2], fields[3], fields[5]
+        else:
+            segment_type, offset, vaddr, filesz = fields[0], fields[1], fields[2], fields[4]
+        if segment_type == _PT_LOAD:
+            loads.append((vaddr, offset, filesz))
+        elif segment_type == _PT_DYNAMIC:
+            dynamic = (offset, filesz)
+    if dynamic is None:
+        # static binary or no program headers: only the architecture
+        return BinaryInfo(path, "elf", (arch,))
+
+    def _file_offset(address: int) -> Optional[int]:
+        for vaddr, offset, filesz in loads:
+            if vaddr <= address < vaddr + filesz:
+                return address - vaddr + offset
+        return None
+
+    needed_names: List[int] = []
+    tags: Dict[int, int] = {}
+    data = reader.read_at(*dynamic)
+    dyn_size = struct.calcsize(dyn_format)
+    for entry in range(0, len(data) - dyn_size + 1, dyn_size):
+        tag, value = struct.unpack_from(dyn_format, data, entry)
+        if tag == 0:
+            break
+        if tag == _DT_NEEDED:
+            needed_names.append(value)
+        elif tag in (_DT_STRTAB, _DT_STRSZ, _DT_VERNEED, _DT_VERNEEDNUM):
+            tags[tag] = value
+
+    strtab = _file_offset(tags.get(_DT_STRTAB, -1))
+    strings = reader.read_at(strtab, tags.get(_DT_STRSZ, 0)) if strtab is not None else b""
+    needed = tuple(_c_string(strings, name) for name in needed_names)
+
+    glibc: Optional[Tuple[int, int]] = None
+    verneed = _file_offset(tags.get(_DT_VERNEED, -1))
+    for _ in range(tags.get(_DT_VERNEEDNUM, 0)):
+        need = reader.read_at(verneed, 16) if verneed is not None else b""
+        if verneed is None or len(need) < 16:
+            break
+        _, count, _, aux, next_verneed = struct.unpack_from(endian + "HHIII", need)
+        vernaux = verneed + aux
+        for _ in range(count):
+            aux_entry = reader.read_at(vernaux, 16)
+            if len(aux_entry) < 16:
+                break
+            _, _, _, name, next_vernaux = struct.unpack_from(endian + "IHHII", aux_entry)
+            match = _GLIBC_VERSION.match(_c_string(strings, name))
+            if match:
+                glibc = max(glibc or (0, 0), (int(match.group(1)), int(match.group(2))))
+            vernaux += next_vernaux
+        if not next_verneed:
+            break
+        verneed += next_verneed
+    return BinaryInfo(path, "elf", (arch,), needed, glibc)
+
+
+def _parse_macho(path: str, header: bytes) -> Optional[BinaryInfo]:
+    magic = header[:4]
+    if magic == b"\xca\xfe\xba\xbe":
+        # universal binary (big endian); Java class files share the magic but have a version >= 45 here
+        count = struct.unpack_from(">I", header, 4)[0]
+        if not 0 < count < 45:
+            return None
+        cpus = [struct.unpack_from(">i", header, 8 + 20 * i)[0] for i in range(min(count, (len(header) - 8) // 20))]
+    elif magic in (b"\xfe\xed\xfa\xce", b"\xfe\xed\xfa\xcf"):
+        cpus = [struct.unpack_from(">i", header, 4)[0]]
+    elif magic in (b"\xce\xfa\xed\xfe", b"\xcf\xfa\xed\xfe"):
+        cpus = [struct.unpack_from("<i", header, 4)[0]]
+    else:
+        return None
+    return BinaryInfo(path, "mach-o", tuple(_MACHO_CPUS.get(cpu, f"mach-o-{cpu:#x}") for cpu in cpus))
+
+
+def _parse_pe(path: str, member, header: bytes) -> Optional[BinaryInfo]:
+    pe_offset = struct.unpack_from("<I", header, 0x3C)[0]
+    data = header + member.read(max(0, pe_offset + 6 - len(header)))
+    if data[pe_offset : pe_offset + 4] != b"PE\0\0":
+        return None
+    machine = struct.unpack_from("<H", data, pe_offset + 4)[0]
+    return BinaryInfo(path, "pe", (_PE_MACHINES.get(machine, f"pe-{machine:#x}"),))
+
+
+def _scan_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> Optional[BinaryInfo]:
+    with archive.open(info) as member:
+        header = member.read(_HEADER_SIZE)
+        if header[:4] == b"\x7fELF":
+            # the program headers, dynamic strings and version needs are usually at the start of the file
+            prefix = header + member.read(_ELF_PREFIX_SIZE - len(header))
+            return _parse_elf(info.filename, _MemberReader(member, prefix))
+        if header[:2] == b"MZ" and len(header) >= 0x40:
+            return _parse_pe(info.filename, member, header)
+        if len(header) >= 8:
+            return _parse_macho(info.filename, header)
+    return None
+
+
+def prescan_wheel(path: Path) -> WheelScan:
+    """Scan the native binaries of a wheel (see module docstring); raises zipfile.BadZipFile for broken wheels."""
+    binaries: List[BinaryInfo] = []
+    with zipfile.ZipFile(path) as archive:
+        infos = archive.infolist()
+        for info in infos:
+            if info.file_size and _is_candidate(info.filename):
+                binary = _scan_member(archive, info)
+                if binary is not None:
+                    binaries.append(binary)
+    return WheelScan(tuple(binaries), frozenset(info.filename.rsplit("/", 1)[-1] for info in infos))
+
+
+def manylinux_glibc(platform_tag: str) -> Optional[Tuple[Tuple[int, int], str]]:
+    """(glibc version, architecture) of a manylinux platform tag; None for other tags."""
+    match = _MANYLINUX_TAG.match(platform_tag)
+    if match:
+        return (int(match.group(1)), int(match.group(2))), match.group(3)
+    match = _LEGACY_MANYLINUX_TAG.match(platform_tag)
+    if match:
+        return LEGACY_MANYLINUX[match.group(1)], match.group(2)
+    return None
+
+
+def target_policy() -> Optional[Tuple[Tuple[int, int], str]]:
+    """(glibc version, architecture) of the manylinux policy auditwheel repairs to (``AUDITWHEEL_PLAT``)."""
+    return manylinux_glibc(os.environ.get(AUDITWHEEL_PLAT_ENV, "").strip())
+
+
+def _wheel_platform_tags(wheel_name: str) -> List[str]:
+    try:
+        return [tag.platform for tag in parse_wheel_filename(wheel_name)[3]]
+    except InvalidWheelFilename:
+        return []
+
+
+def linux_repair_verdict(
+    scan: WheelScan, wheel_name: str, current_arch: str, policy: Optional[Tuple[Tuple[int, int], str]]
+) -> Optional[str]:
+    """Outcome of auditwheel which is certain from the scan; None when auditwheel has to decide.
+
+    - TOO_RECENT_SYMBOLS ... a binary requires a newer glibc than the target policy allows
+    - NO_REPAIR_NEEDED   ... a manylinux wheel of this architecture within the target policy whose binaries
+      only need libraries of the policy or bundled in the wheel
+    """
+    if policy is None or not scan.has_native or scan.archs != {current_arch}:
+        return None
+    policy_glibc, _ = policy
+    max_glibc = scan.max_glibc
+    if max_glibc is not None and max_glibc > policy_glibc:
+        return TOO_RECENT_SYMBOLS
+    if scan.external_libraries():
+        return None
+    for tag in _wheel_platform_tags(wheel_name):
+        manylinux = manylinux_glibc(tag)
+        if manylinux is None:
+            continue
+        tag_glibc, tag_arch = manylinux
+        if tag_arch == current_arch and tag_glibc <= policy_glibc and (max_glibc or (0, 0)) <= tag_glibc:
+            return NO_REPAIR_NEEDED
+    return None
@@ -5,19 +5,34 @@
 #
 from __future__ import annotations
 
+import functools
+import hashlib
+import json
+import os
 import re
+import tempfile
 
+from pathlib import Path
+from typing import Dict
 from typing import Optional
+from typing import Sequence
 from typing import Set
 
+import packaging
 import yaml
 
 from colorama import Fore
+from packaging.requirements import InvalidRequirement
 from packaging.requirements import Requirement
 
 from _helper_functions import exclude_entry_applies_to_platform
+from _helper_functions import get_cache_dir
 from _helper_functions import merge_requirements
 from _helper_functions import print_color
+from compiled_markers import SYS_PLATFORMS
+from compiled_markers import DecisionTable
+from compiled_markers import ExcludeRules
+from marker_minimizer import simplify_requirement
 
 # Map runner platforms to sys.platform (pip markers only know win32/linux/darwin)
 SYS_PLATFORM_MAP = {
@@ -29,6 +44,25 @@ SYS_PLATFORM_MAP = {
 }
 
 
+# Compiled YAML lists are cached in ``yaml_lists`` under get_cache_dir(); "0" disables the cache
+YAML_CACHE_ENV = "IDF_PYTHON_WHEELS_YAML_CACHE"
+YAML_CACHE_ENTRIES = 64
+# libyaml based loader when PyYAML is built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=None)
+def _code_hash() -> str:
+    """Hash of the code which converts YAML lists to requirements, a change invalidates the cached lists."""
+    digest = hashlib.sha256(packaging.__version__.encode())
+    for module in (
+        Path(__file__),
+        *(Path(__file__).with_name(f) for f in ("_helper_functions.py", "marker_minimizer.py")),
+    ):
+        digest.update(module.read_bytes())
+    return digest.hexdigest()
+
+
 def _platform_for_marker(platform):
     """Normalize platform to sys_platform value for pip markers."""
     return SYS_PLATFORM_MAP.get(platform, platform)
@@ -83,14 +117,31 @@ class YAMLListAdapter:
     exclude: bool = False
     requirements: set = set()
 
-    def __init__(self, yaml_file: str, exclude: bool = False, current_platform: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        yaml_file: str,
+        exclude: bool = False,
+        current_platform: Optional[str] = None,
+        use_cache: Optional[bool] = None,
+    ) -> None:
+        content = None
         try:
-            with open(yaml_file, "r") as f:
-                self._yaml_list = yaml.load(f, yaml.Loader)
+            with open(yaml_file, "rb") as f:
+                content = f.read()
         except FileNotFoundError:
             print_color(f"File not found, please check the file: {yaml_file}", Fore.RED)
         self.exclude = exclude
 
+        # Unchanged lists are loaded from the cache of compiled lists (see _cache_path)
+        if use_cache is None:
+            use_cache = os.environ.get(YAML_CACHE_ENV, "1").strip() != "0"
+        cache_path = self._cache_path(content, current_platform) if use_cache and content is not None else None
+        if cache_path is not None and self._load_cached(cache_path):
+            return
+
+        if content is not None:
+            self._yaml_list = yaml.load(content, _YAML_LOADER)
+
         # When building wheels: only exclude entries that apply to this platform
         if current_platform and self._yaml_list:
             self._yaml_list = [e for e in self._yaml_list if exclude_entry_applies_to_platform(e, current_platform)]
@@ -103,6 +154,58 @@ class YAMLListAdapter:
         # into one requirement and replaces original requirements
         _combine_package_duplicates(self, _requirement_duplicates)
 
+        if cache_path is not None:
+            self._store_cached(cache_path)
+
+    def _cache_path(self, content: bytes, current_platform: Optional[str]) -> Path:
+        """Cache file of the compiled list, keyed by the YAML content, exclude, current_platform and the code."""
+        key = json.dumps(
+            [hashlib.sha256(content).hexdigest(), self.exclude, current_platform, _code_hash()], separators=(",", ":")
+        )
+        return get_cache_dir("yaml_lists") / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def _load_cached(self, cache_path: Path) -> bool:
+        """Load the YAML list and requirements from the cache; False when missing or unreadable."""
+        try:
+            cached = json.loads(cache_path.read_text())
+            self._yaml_list = cached["yaml_list"]
+            self.requirements = {Requirement(requirement) for requirement in cached["requirements"]}
+        except (OSError, ValueError, KeyError, TypeError, InvalidRequirement):
+            return False
+        return True
+
+    def _store_cached(self, cache_path: Path) -> None:
+        """Write the compiled list atomically (rename) and keep only the newest YAML_CACHE_ENTRIES lists."""
+        try:
+            data = json.dumps(
+                {"yaml_list": self._yaml_list, "requirements": sorted(str(r) for r in self.requirements)},
+                separators=(",", ":"),
+            )
+        except (TypeError, ValueError):
+            # YAML values without a JSON form (e.g. dates) are not cached
+            return
+        try:
+            fd, tmp_name = tempfile.mkstemp(prefix=".tmp-", dir=cache_path.parent)
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_name, cache_path)
+            entries = sorted(cache_path.parent.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+            for old_entry in entries[YAML_CACHE_ENTRIES:]:
+                old_entry.unlink()
+        except OSError:
+            return
+
+    def compile_decision_table(
+        self, python_versions: Sequence[str], sys_platforms: Sequence[str] = SYS_PLATFORMS
+    ) -> DecisionTable:
+        """Compile the requirements into a DecisionTable (compiled_markers.py) over sys_platforms x python_versions.
+
+        The table keeps the logic of this list (exclude=True rules apply where their marker is False). The YAML
+        ``platform`` architectures (``SYS_PLATFORM_MAP``) are already reduced to sys_platform in the markers,
+        architecture specific entries are selected by ``current_platform`` when the list is loaded.
+        """
+        return DecisionTable(ExcludeRules(self.requirements), python_versions, sys_platforms, inverted=self.exclude)
+
     def _change_specifier_logic(self, spec_with_text: str) -> tuple:
         """Change specifier logic to opposite
         e.g. "<1.20" will be ">=1.20"
@@ -319,7 +422,8 @@ class YAMLListAdapter:
 
     def _assemble_requirements_duplicates(self):
         """Creates dictionary of requirements with the same requirement/package name for further processing.
-        - key is the name of the requirement/package and value is a set of requirements (types Requirement)
+        - key is the name of the requirement/package and value is a list of requirements (types Requirement) in the
+          order of the YAML list, without repeats
         - different version of package is considered as another requirement, not duplicate which is combined
 
         -------------------------------------
@@ -338,30 +442,37 @@ class YAMLListAdapter:
         \tplatform: 'linux'
 
         #### -- will assemble following dictionary (exclude=True) -->
-        {'dbus-python': {<Requirement('dbus-python; sys_platform != "darwin" and python_version <= "3.11"')>,
-                        <Requirement('dbus-python; sys_platform != "linux"')>}}
+        {'dbus-python': [<Requirement('dbus-python; sys_platform != "darwin" and python_version <= "3.11"')>,
+                        <Requirement('dbus-python; sys_platform != "linux"')>]}
 
         #### - Also removes requirement/package from the YAML list except first occurrence
         """
-        duplicates_dict = {}
-        for i, requirement in enumerate(self._yaml_list):
-            package_name = requirement["package_name"]
-
-            for next_requirement in self._yaml_list[i + 1 :]:
-                if next_requirement["package_name"] == package_name and next_requirement != requirement:
-                    if package_name not in duplicates_dict:
-                        duplicates_dict[package_name] = set()
+        # insertion ordered dictionaries as ordered sets of the duplicates of every package
+        duplicates_dict: Dict[str, Dict[Requirement, None]] = {}
+        first_entries: Dict[str, dict] = {}
+        yaml_list = []
+        # one pass grouping by package name; an entry is a duplicate of the first entry with the same name
+        for entry in self._yaml_list:
+            package_name = entry["package_name"]
+            first_entry = first_entries.setdefault(package_name, entry)
+            if first_entry is entry or entry == first_entry:
+                # exact copies of the first entry give the same requirement, keep them as the first entry
+                yaml_list.append(entry)
+                continue
 
-                    if "version" in next_requirement:
-                        # Different version of package is not considered as duplicate, but new requirement
-                        continue
+            duplicates = duplicates_dict.setdefault(package_name, {})
+            if "version" in entry:
+                # Different version of package is not considered as duplicate, but new requirement
+                yaml_list.append(entry)
+                continue
 
-                    duplicates_dict[package_name].add(
-                        list(self._yaml_to_requirement([next_requirement.copy()], self.exclude))[0]
-                    )
-                    self._yaml_list.remove(next_requirement)
+            # an entry without version gives exactly one requirement; duplicates are kept in the order of the
+            # YAML list, which is the order they are merged in by _combine_package_duplicates
+            duplicate = next(iter(self._yaml_to_requirement([entry], self.exclude)))
+            duplicates.setdefault(duplicate, None)
+        self._yaml_list = yaml_list
 
-        return duplicates_dict
+        return {package_name: list(duplicates) for package_name, duplicates in duplicates_dict.items()}
 
 
 def _combine_package_duplicates(self, requirement_duplicates: dict):
@@ -385,14 +496,16 @@ def _combine_package_duplicates(self, requirement_duplicates: dict):
     \tplatform: 'linux'
 
     #### - Assembled duplicates dictionary (exclude=True)
-    {'dbus-python': {<Requirement('dbus-python; sys_platform != "darwin" and python_version <= "3.11"')>,
-                    <Requirement('dbus-python; sys_platform != "linux"')>}}
+    {'dbus-python': [<Requirement('dbus-python; sys_platform != "darwin" and python_version <= "3.11"')>,
+                    <Requirement('dbus-python; sys_platform != "linux"')>]}
 
     #### -- will replace original requirement with following (exclude=True) -->
     dbus-python;sys_platform == "linux" and (
         (sys_platform != "win32" and (
             sys_platform != "darwin" and python_version <= "3.11")) and sys_platform != "linux")
 
+    #### -- the merged marker is written back in its smallest equivalent form (marker_minimizer.py)
+
     #### - directly used with pip constraining the installation of dbus-python defined in exclude_list.yaml
     """
     new_requirements: set = set()
@@ -402,6 +515,8 @@ def _combine_package_duplicates(self, requirement_duplicates: dict):
             for duplicate in requirement_duplicates[requirement.name]:
                 # rewrite requirement to continuously merge any following duplicate
                 requirement = merge_requirements(requirement, duplicate)  # new_requirement
+            # the nested markers of the merged duplicates are written back in their smallest form
+            requirement = simplify_requirement(requirement)
         # add new requirement or unchanged requirement to the set of requirements
         new_requirements.add(requirement)
     # replace original requirements with new requirements